@@ -0,0 +1,51 @@
+"""Composite indexes for transaction access patterns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Listing, keyset pagination and the recent-transactions widget
+    op.create_index(
+        'ix_transactions_user_id_date',
+        'transactions',
+        ['user_id', sa.text('date DESC'), sa.text('id DESC')],
+        unique=False
+    )
+    # Income/expense totals and type filters
+    op.create_index(
+        'ix_transactions_user_id_type_date',
+        'transactions',
+        ['user_id', 'transaction_type', 'date'],
+        unique=False
+    )
+    # Category filters and per-category breakdowns
+    op.create_index(
+        'ix_transactions_user_id_category_id_date',
+        'transactions',
+        ['user_id', 'category_id', 'date'],
+        unique=False
+    )
+    # Foreign keys that are filtered on by every request
+    op.create_index(op.f('ix_categories_user_id'), 'categories', ['user_id'], unique=False)
+    op.create_index(op.f('ix_budgets_user_id'), 'budgets', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_budgets_user_id'), table_name='budgets')
+    op.drop_index(op.f('ix_categories_user_id'), table_name='categories')
+    op.drop_index('ix_transactions_user_id_category_id_date', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_type_date', table_name='transactions')
+    op.drop_index('ix_transactions_user_id_date', table_name='transactions')
@@ -0,0 +1,56 @@
+"""Monthly rollups of transaction totals
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'monthly_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('total_amount', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint(
+            'user_id', 'month', 'category_id', 'transaction_type',
+            name='uq_monthly_rollups_key',
+            postgresql_nulls_not_distinct=True
+        )
+    )
+    op.create_index(op.f('ix_monthly_rollups_id'), 'monthly_rollups', ['id'], unique=False)
+
+    # Backfill from existing transactions
+    op.execute(
+        """
+        INSERT INTO monthly_rollups
+            (user_id, month, category_id, transaction_type, total_amount, transaction_count)
+        SELECT user_id, date_trunc('month', date)::date, category_id, transaction_type,
+               SUM(amount), COUNT(id)
+        FROM transactions
+        GROUP BY user_id, date_trunc('month', date)::date, category_id, transaction_type
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_monthly_rollups_id'), table_name='monthly_rollups')
+    op.drop_table('monthly_rollups')
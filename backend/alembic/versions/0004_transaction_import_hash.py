@@ -0,0 +1,32 @@
+"""Content hash for deduplicating imported transactions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('import_hash', sa.String(length=64), nullable=True))
+    op.create_index(
+        'uq_transactions_user_id_import_hash',
+        'transactions',
+        ['user_id', 'import_hash'],
+        unique=True,
+        postgresql_where=sa.text('import_hash IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_transactions_user_id_import_hash', table_name='transactions')
+    op.drop_column('transactions', 'import_hash')
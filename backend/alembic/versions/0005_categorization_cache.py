@@ -0,0 +1,43 @@
+"""Persistent cache of LLM categorizations
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'categorization_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('normalized_description', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('suggested_category', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_categorization_cache_id'), 'categorization_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_categorization_cache_cache_key'), 'categorization_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_categorization_cache_expires_at'), 'categorization_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_categorization_cache_expires_at'), table_name='categorization_cache')
+    op.drop_index(op.f('ix_categorization_cache_cache_key'), table_name='categorization_cache')
+    op.drop_index(op.f('ix_categorization_cache_id'), table_name='categorization_cache')
+    op.drop_table('categorization_cache')
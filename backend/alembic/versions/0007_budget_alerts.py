@@ -0,0 +1,65 @@
+"""Running budget period totals and threshold alerts
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Totals are seeded lazily by the first write to each period, so no backfill
+    op.create_table(
+        'budget_period_totals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['budget_id'], ['budgets.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('budget_id', 'period_start', name='uq_budget_period_totals_key')
+    )
+    op.create_index(op.f('ix_budget_period_totals_id'), 'budget_period_totals', ['id'], unique=False)
+
+    op.create_table(
+        'budget_alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('threshold', sa.Integer(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['budget_id'], ['budgets.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('budget_id', 'period_start', 'threshold', name='uq_budget_alerts_key')
+    )
+    op.create_index(op.f('ix_budget_alerts_id'), 'budget_alerts', ['id'], unique=False)
+    op.create_index(
+        'ix_budget_alerts_user_id_id',
+        'budget_alerts',
+        ['user_id', sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_budget_alerts_user_id_id', table_name='budget_alerts')
+    op.drop_index(op.f('ix_budget_alerts_id'), table_name='budget_alerts')
+    op.drop_table('budget_alerts')
+    op.drop_index(op.f('ix_budget_period_totals_id'), table_name='budget_period_totals')
+    op.drop_table('budget_period_totals')
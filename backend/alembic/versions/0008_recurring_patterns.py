@@ -0,0 +1,60 @@
+"""Recurring transaction patterns and their scan watermark
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Patterns are built by the first scan of each user, so no backfill
+    op.create_table(
+        'recurring_patterns',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('merchant', sa.String(), nullable=False),
+        sa.Column('transaction_type', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('dates', sa.ARRAY(sa.Date()), nullable=False),
+        sa.Column('amounts', sa.ARRAY(sa.Float()), nullable=False),
+        sa.Column('cadence', sa.String(), nullable=True),
+        sa.Column('interval_days', sa.Float(), nullable=True),
+        sa.Column('amount', sa.Float(), nullable=True),
+        sa.Column('occurrences', sa.Integer(), nullable=False),
+        sa.Column('confidence', sa.Float(), nullable=False),
+        sa.Column('first_date', sa.Date(), nullable=True),
+        sa.Column('last_date', sa.Date(), nullable=True),
+        sa.Column('next_date', sa.Date(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'merchant', 'transaction_type', name='uq_recurring_patterns_key')
+    )
+    op.create_index(op.f('ix_recurring_patterns_id'), 'recurring_patterns', ['id'], unique=False)
+
+    op.create_table(
+        'recurring_scan_state',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('watermark', sa.Integer(), nullable=False),
+        sa.Column('scanned_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('recurring_scan_state')
+    op.drop_index(op.f('ix_recurring_patterns_id'), table_name='recurring_patterns')
+    op.drop_table('recurring_patterns')
@@ -1,20 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime
+from typing import List, Optional
 from pydantic import BaseModel
-import openai
 import json
+import logging
+import time
 
 from app.api.routers.auth import get_current_user
-from app.db.session import get_db
+from app.core.auth_cache import CurrentUser
+from app.db.session import SessionLocal, get_db
 from app.core.config import settings
-from app.db.models import User
+from app.core.llm import LLMError, llm_client
+from app.core.cache import response_cache
+from app.core.prompts import prompt_registry
+from app.db.models import CategorizationJob, Transaction
+from app.services.advice import advice_cache_key, advice_messages, gather_advice_inputs
+from app.services.categorization import (
+    EXPENSE_CATEGORIES, INCOME_CATEGORIES, PROMPT_VERSION, BatchItem, categorize_batch, strip_code_fence,
+    validate_categorization, write_back
+)
+from app.services.categorization_cache import (
+    Categorization, categorization_cache, normalize_description
+)
+from app.services.local_classifier import local_classifier
+from app.services.nl_parser import parse_natural_language
+from app.tasks.categorization import categorization_state
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Configure OpenAI
-if settings.OPENAI_API_KEY:
-    openai.api_key = settings.OPENAI_API_KEY
+ADVICE_UNAVAILABLE = "Unable to generate budgeting advice at this time. Please try again later."
 
 # Pydantic models
 class CategorizeRequest(BaseModel):
@@ -29,112 +47,138 @@ class CategorizeResponse(BaseModel):
     extracted_date: Optional[str] = None
     transaction_type: str  # "income" or "expense"
 
-# Predefined categories for AI to choose from
-EXPENSE_CATEGORIES = [
-    "Food & Dining", "Transportation", "Shopping", "Entertainment", 
-    "Healthcare", "Utilities", "Housing", "Education", "Travel", 
-    "Insurance", "Taxes", "Personal Care", "Gifts", "Subscriptions",
-    "Business", "Other"
-]
+class BatchCategorizeItem(BaseModel):
+    # Either an existing transaction or a free-standing description
+    transaction_id: Optional[int] = None
+    description: Optional[str] = None
+    amount: Optional[float] = None
+    transaction_type: Optional[str] = None
+
+class BatchCategorizeRequest(BaseModel):
+    items: List[BatchCategorizeItem]
+    write_back: bool = False
+    overwrite: bool = False  # Also replace categories chosen by hand
+
+class BatchCategorizeResult(BaseModel):
+    transaction_id: Optional[int] = None
+    suggested_category: str
+    confidence: float
+    transaction_type: str
+    source: str  # "model", "cache", "llm" or "fallback"
+
+class BatchCategorizeResponse(BaseModel):
+    results: List[BatchCategorizeResult]
+    updated: int = 0
+
+class CategorizationJobResponse(BaseModel):
+    id: int
+    status: str
+    attempts: int
+    processed: int
+    categorized: int
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+class CategorizationStatusResponse(BaseModel):
+    pending: int  # Uncategorized transactions waiting for the background job
+    queued: bool
+    running: bool
+    recent_jobs: List[CategorizationJobResponse]
 
-INCOME_CATEGORIES = [
-    "Salary", "Freelance", "Investment", "Business", "Gift", 
-    "Refund", "Other"
-]
+class ParseRequest(BaseModel):
+    text: str
+    today: Optional[date] = None  # The client's local date, for "yesterday" and weekdays
+
+class ParseResponse(BaseModel):
+    amount: Optional[float]
+    currency: Optional[str]
+    description: str
+    transaction_type: str  # "income" or "expense"
+    date: Optional[date]
+    confidence: float
+    source: str  # "rules" or "llm"
 
 @router.post("/categorize", response_model=CategorizeResponse)
 async def categorize_transaction(
     request: CategorizeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not settings.OPENAI_API_KEY:
+    # The user's own labels answer most repeat merchants without the LLM
+    if settings.LOCAL_CLASSIFIER_ENABLED:
+        local = await local_classifier.predict(db, current_user.id, request.description)
+        if local is not None and local.confidence >= settings.LOCAL_CLASSIFIER_CONFIDENCE:
+            categorization_cache.stats.increment("model_hits")
+            return CategorizeResponse(
+                suggested_category=local.category_name,
+                confidence=local.confidence,
+                extracted_amount=request.amount,
+                extracted_date=request.date,
+                transaction_type=local.transaction_type
+            )
+    
+    if not llm_client.configured:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="AI service is not configured"
         )
     
     try:
-        # Prepare the prompt for OpenAI
-        prompt = f"""
-        Analyze this transaction description and categorize it appropriately.
-        
-        Description: {request.description}
-        Amount: {request.amount if request.amount else 'Not specified'}
-        Date: {request.date if request.date else 'Not specified'}
-        
-        Please categorize this transaction and provide the following information in JSON format:
-        {{
-            "suggested_category": "category_name",
-            "confidence": 0.95,
-            "extracted_amount": null,
-            "extracted_date": null,
-            "transaction_type": "expense"
-        }}
-        
-        Available expense categories: {', '.join(EXPENSE_CATEGORIES)}
-        Available income categories: {', '.join(INCOME_CATEGORIES)}
+        # Identical merchants skip the LLM entirely
+        normalized = normalize_description(request.description)
+        if normalized:
+            cached = await categorization_cache.get(
+                db, normalized, PROMPT_VERSION, settings.OPENAI_MODEL
+            )
+            if cached is not None:
+                return CategorizeResponse(
+                    suggested_category=cached.suggested_category,
+                    confidence=cached.confidence,
+                    extracted_amount=request.amount,
+                    extracted_date=request.date,
+                    transaction_type=cached.transaction_type
+                )
         
-        Rules:
-        1. Choose the most appropriate category from the provided lists
-        2. Set confidence between 0.0 and 1.0 based on how certain you are
-        3. If amount is not provided but can be extracted from description, extract it
-        4. If date is not provided but can be extracted from description, extract it
-        5. Determine if this is income or expense based on the description
-        6. For expenses, use expense categories. For income, use income categories
-        7. Return only valid JSON, no additional text
-        """
+        # Prepare the prompt for OpenAI
+        messages = prompt_registry.get("categorize").render(
+            description=request.description,
+            amount=request.amount if request.amount else 'Not specified',
+            date=request.date if request.date else 'Not specified',
+            expense_categories=', '.join(EXPENSE_CATEGORIES),
+            income_categories=', '.join(INCOME_CATEGORIES)
+        )
         
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a financial transaction categorization assistant. Always respond with valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
+        # Call the LLM without blocking the event loop
+        started = time.perf_counter()
+        content = await llm_client.complete(
+            messages=messages,
             max_tokens=200,
             temperature=0.1
         )
-        
-        # Parse the response
-        content = response.choices[0].message.content.strip()
+        categorization_cache.stats.observe_llm_call(time.perf_counter() - started)
         
         # Try to extract JSON from the response
         try:
             # Remove any markdown formatting if present
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            
-            result = json.loads(content)
+            result = validate_categorization(json.loads(strip_code_fence(content)))
             
-            # Validate the response
-            if not isinstance(result, dict):
-                raise ValueError("Invalid response format")
-            
-            # Ensure required fields are present
-            if "suggested_category" not in result:
-                raise ValueError("Missing suggested_category")
-            if "confidence" not in result:
-                raise ValueError("Missing confidence")
-            if "transaction_type" not in result:
-                raise ValueError("Missing transaction_type")
-            
-            # Validate category
-            if result["transaction_type"] == "expense":
-                if result["suggested_category"] not in EXPENSE_CATEGORIES:
-                    result["suggested_category"] = "Other"
-            elif result["transaction_type"] == "income":
-                if result["suggested_category"] not in INCOME_CATEGORIES:
-                    result["suggested_category"] = "Other"
-            else:
-                result["transaction_type"] = "expense"
-                result["suggested_category"] = "Other"
-            
-            # Validate confidence
-            if not isinstance(result["confidence"], (int, float)) or result["confidence"] < 0 or result["confidence"] > 1:
-                result["confidence"] = 0.5
+            if normalized:
+                await categorization_cache.set(
+                    db,
+                    normalized,
+                    PROMPT_VERSION,
+                    settings.OPENAI_MODEL,
+                    Categorization(
+                        suggested_category=result["suggested_category"],
+                        transaction_type=result["transaction_type"],
+                        confidence=float(result["confidence"])
+                    )
+                )
+                await db.commit()
             
             return CategorizeResponse(
                 suggested_category=result["suggested_category"],
@@ -154,9 +198,8 @@ async def categorize_transaction(
                 transaction_type="expense"
             )
     
-    except Exception as e:
-        # Log the error for debugging
-        pass
+    except Exception:
+        logger.exception("Transaction categorization failed")
         
         # Return fallback response
         return CategorizeResponse(
@@ -167,6 +210,225 @@ async def categorize_transaction(
             transaction_type="expense"
         )
 
+@router.post("/categorize/batch", response_model=BatchCategorizeResponse)
+async def categorize_transactions_batch(
+    request: BatchCategorizeRequest,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if not llm_client.configured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is not configured"
+        )
+    
+    if len(request.items) > settings.AI_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AI_BATCH_MAX_ITEMS} items per batch"
+        )
+    
+    # Fill in stored transactions
+    transaction_ids = {item.transaction_id for item in request.items if item.transaction_id is not None}
+    transactions = {}
+    if transaction_ids:
+        rows = await db.execute(
+            select(Transaction.id, Transaction.description, Transaction.amount, Transaction.transaction_type)
+            .where(Transaction.user_id == current_user.id, Transaction.id.in_(transaction_ids))
+        )
+        transactions = {row.id: row for row in rows}
+        missing = transaction_ids - set(transactions)
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Transactions not found: {sorted(missing)}"
+            )
+    
+    items = []
+    for item in request.items:
+        if item.transaction_id is not None:
+            stored = transactions[item.transaction_id]
+            items.append(BatchItem(
+                description=stored.description,
+                amount=stored.amount,
+                transaction_type=stored.transaction_type,
+                transaction_id=stored.id
+            ))
+        elif item.description:
+            if item.transaction_type not in (None, "income", "expense"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Transaction type must be 'income' or 'expense'"
+                )
+            items.append(BatchItem(
+                description=item.description,
+                amount=item.amount,
+                transaction_type=item.transaction_type
+            ))
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Each item needs a transaction_id or a description"
+            )
+    
+    results = await categorize_batch(db, items, user_id=current_user.id)
+    
+    updated = 0
+    if request.write_back:
+        assignments = {
+            item.transaction_id: result
+            for item, result in zip(items, results)
+            if item.transaction_id is not None and result.source != "fallback"
+        }
+        updated = await write_back(db, current_user.id, assignments, overwrite=request.overwrite)
+    await db.commit()
+    if updated:
+        await response_cache.bump_data_version(current_user.id)
+    
+    return BatchCategorizeResponse(
+        results=[
+            BatchCategorizeResult(
+                transaction_id=item.transaction_id,
+                suggested_category=result.suggested_category,
+                confidence=result.confidence,
+                transaction_type=result.transaction_type,
+                source=result.source
+            )
+            for item, result in zip(items, results)
+        ],
+        updated=updated
+    )
+
+@router.get("/categorize/status", response_model=CategorizationStatusResponse)
+async def get_categorization_status(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """State of background categorization for the current user"""
+    pending = await db.scalar(
+        select(func.count(Transaction.id)).where(
+            Transaction.user_id == current_user.id,
+            Transaction.category_id.is_(None),
+            or_(Transaction.ai_categorized.is_(False), Transaction.ai_categorized.is_(None))
+        )
+    )
+    jobs = (await db.execute(
+        select(CategorizationJob)
+        .where(CategorizationJob.user_id == current_user.id)
+        .order_by(CategorizationJob.created_at.desc())
+        .limit(10)
+    )).scalars().all()
+    queued, running = await categorization_state(current_user.id)
+    
+    return CategorizationStatusResponse(
+        pending=pending or 0,
+        queued=queued,
+        running=running,
+        recent_jobs=[CategorizationJobResponse.model_validate(job) for job in jobs]
+    )
+
+@router.post("/parse", response_model=ParseResponse)
+async def parse_transaction(
+    request: ParseRequest,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Parse a free-text entry like "$12.50 coffee yesterday" into transaction fields"""
+    text = request.text.strip()
+    if not text or len(text) > 500:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Text must be between 1 and 500 characters"
+        )
+    
+    parsed = await parse_natural_language(text, today=request.today)
+    return ParseResponse(
+        amount=parsed.amount,
+        currency=parsed.currency,
+        description=parsed.description,
+        transaction_type=parsed.transaction_type,
+        date=parsed.date,
+        confidence=parsed.confidence,
+        source=parsed.source
+    )
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """One server-sent event; JSON keeps newlines in the text from ending it early"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@router.get("/advice")
+async def get_budgeting_advice(
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Today's budgeting advice, streamed as server-sent events"""
+    today = date.today()
+    cache_key = await advice_cache_key(current_user.id, today)
+    cached = await response_cache.get(cache_key)
+    if cached is None:
+        if not llm_client.configured:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="AI service is not configured"
+            )
+        # A short-lived session, so no connection is held while the answer streams
+        async with SessionLocal() as db:
+            messages = advice_messages(await gather_advice_inputs(db, current_user.id, today))
+    
+    async def events():
+        yield _sse({"cached": cached is not None, "date": today.isoformat()}, event="meta")
+        if cached is not None:
+            yield _sse({"text": cached})
+            yield _sse({}, event="done")
+            return
+        
+        parts = []
+        try:
+            async for text in llm_client.stream(
+                messages,
+                max_tokens=settings.AI_ADVICE_MAX_TOKENS,
+                temperature=0.7
+            ):
+                parts.append(text)
+                yield _sse({"text": text})
+        except LLMError as e:
+            logger.warning("Budgeting advice stream failed: %s", e)
+            yield _sse({"detail": ADVICE_UNAVAILABLE}, event="error")
+            return
+        
+        advice = "".join(parts)
+        if not advice:
+            # An empty answer would be served from the cache for the rest of the day
+            logger.warning("Budgeting advice stream ended without any text")
+            yield _sse({"detail": ADVICE_UNAVAILABLE}, event="error")
+            return
+        
+        # Only complete answers are cached; a disconnect mid-stream caches nothing
+        await response_cache.set(cache_key, advice, ttl=settings.AI_ADVICE_CACHE_SECONDS)
+        yield _sse({}, event="done")
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Proxies must pass each event through as soon as it is written
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/llm/stats")
+async def get_llm_stats(
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """How many LLM calls this worker made and how many were coalesced"""
+    if llm_client.single_flight is None:
+        return {"coalescing_enabled": False}
+    return {"coalescing_enabled": True, **llm_client.single_flight.metrics.snapshot()}
+
+@router.get("/categorize/cache-stats")
+async def get_categorization_cache_stats(
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Hit and miss counters of the categorization cache in this worker"""
+    return categorization_cache.stats.snapshot()
+
 @router.get("/categories")
 async def get_available_categories():
     """Get all available categories for the frontend"""
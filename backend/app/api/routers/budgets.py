@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel
 
 from app.api.routers.auth import get_current_user
+from app.core.auth_cache import CurrentUser
+from app.core.cache import response_cache
+from app.core.datetimes import NaiveUTCDateTime
 from app.db.session import get_db
-from app.db.models import User, Budget
+from app.db.models import Budget, BudgetAlert, Category
+from app.services.budgets import PERIOD_UNITS, budget_progress
 
 router = APIRouter()
 
@@ -15,8 +21,8 @@ class BudgetCreate(BaseModel):
     amount: float
     period: str  # "monthly", "weekly", "yearly"
     category_id: Optional[int] = None
-    start_date: str
-    end_date: Optional[str] = None
+    start_date: NaiveUTCDateTime
+    end_date: Optional[NaiveUTCDateTime] = None
 
 class BudgetResponse(BaseModel):
     id: int
@@ -24,43 +30,188 @@ class BudgetResponse(BaseModel):
     amount: float
     period: str
     category_id: Optional[int]
-    start_date: str
-    end_date: Optional[str]
+    start_date: datetime
+    end_date: Optional[datetime]
     is_active: bool
 
     class Config:
         from_attributes = True
 
+class BudgetProgressResponse(BaseModel):
+    budget_id: int
+    name: str
+    amount: float
+    period: str
+    category_id: Optional[int]
+    period_start: datetime
+    period_end: datetime
+    spent: float
+    remaining: float
+    progress: float  # Share of the limit spent; above 1.0 once overspent
+    projected_spend: float
+    projected_overshoot: float
+    transaction_count: int
+
+class BudgetAlertResponse(BaseModel):
+    id: int
+    budget_id: int
+    period_start: datetime
+    threshold: int  # Percent of the budget amount
+    spent: float
+    amount: float
+    created_at: datetime
+    read_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
 @router.get("/", response_model=List[BudgetResponse])
 async def get_budgets(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    budgets = db.query(Budget).filter(Budget.user_id == current_user.id).all()
+    budgets = (await db.scalars(select(Budget).where(Budget.user_id == current_user.id))).all()
     return budgets
 
 @router.post("/", response_model=BudgetResponse)
 async def create_budget(
     budget_data: BudgetCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Budget creation will be implemented in future updates
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Budget creation not yet implemented"
+    if budget_data.period not in PERIOD_UNITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Period must be one of: {', '.join(PERIOD_UNITS)}"
+        )
+    if budget_data.amount <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Amount must be positive"
+        )
+    if budget_data.end_date is not None and budget_data.end_date < budget_data.start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="End date must not be before start date"
+        )
+    
+    # Validate category belongs to user if provided
+    if budget_data.category_id:
+        category = await db.scalar(select(Category.id).where(
+            Category.id == budget_data.category_id,
+            Category.user_id == current_user.id
+        ))
+        if category is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Category not found"
+            )
+    
+    budget = Budget(
+        name=budget_data.name,
+        amount=budget_data.amount,
+        period=budget_data.period,
+        category_id=budget_data.category_id,
+        user_id=current_user.id,
+        start_date=budget_data.start_date,
+        end_date=budget_data.end_date,
+        is_active=True
     )
+    db.add(budget)
+    await db.commit()
+    await db.refresh(budget)
+    # Budgets feed the cached budgeting advice
+    await response_cache.bump_data_version(current_user.id)
+    
+    return budget
+
+# Declared before /{budget_id} so "progress" and "alerts" are not parsed as ids
+@router.get("/progress", response_model=List[BudgetProgressResponse])
+async def get_budget_progress(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Spending against every active budget's current period"""
+    now = datetime.now()
+    progress = await budget_progress(db, current_user.id, now=now)
+    
+    return [
+        BudgetProgressResponse(
+            budget_id=item.budget_id,
+            name=item.name,
+            amount=item.amount,
+            period=item.period,
+            category_id=item.category_id,
+            period_start=item.period_start,
+            period_end=item.period_end,
+            spent=item.spent,
+            remaining=item.remaining,
+            progress=round(item.progress, 4),
+            projected_spend=round(item.projected_spend(now), 2),
+            projected_overshoot=round(item.projected_overshoot(now), 2),
+            transaction_count=item.transaction_count
+        )
+        for item in progress
+    ]
+
+@router.get("/alerts", response_model=List[BudgetAlertResponse])
+async def get_budget_alerts(
+    after_id: Optional[int] = Query(None, description="Only alerts newer than this id"),
+    unread_only: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Budget threshold alerts, newest first.
+
+    With after_id, the alerts after it are returned oldest first instead, so a
+    client polling with the largest id seen pages through a backlog longer than
+    limit without skipping any.
+    """
+    query = select(BudgetAlert).where(BudgetAlert.user_id == current_user.id)
+    if after_id is not None:
+        query = query.where(BudgetAlert.id > after_id).order_by(BudgetAlert.id.asc())
+    else:
+        query = query.order_by(BudgetAlert.id.desc())
+    if unread_only:
+        query = query.where(BudgetAlert.read_at.is_(None))
+    alerts = (await db.scalars(query.limit(limit))).all()
+    return alerts
+
+@router.post("/alerts/{alert_id}/read", response_model=BudgetAlertResponse)
+async def mark_budget_alert_read(
+    alert_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    alert = await db.scalar(select(BudgetAlert).where(
+        BudgetAlert.id == alert_id,
+        BudgetAlert.user_id == current_user.id
+    ))
+    
+    if not alert:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alert not found"
+        )
+    
+    if alert.read_at is None:
+        alert.read_at = func.now()
+        await db.commit()
+        await db.refresh(alert)
+    
+    return alert
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
 async def get_budget(
     budget_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    budget = db.query(Budget).filter(
+    budget = await db.scalar(select(Budget).where(
         Budget.id == budget_id,
         Budget.user_id == current_user.id
-    ).first()
+    ))
     
     if not budget:
         raise HTTPException(
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.api.routers.auth import get_current_user
+from app.core.auth_cache import CurrentUser
+from app.db.session import get_db
+from app.db.models import Category, RecurringPattern
+from app.services import recurring
+
+router = APIRouter()
+
+# Pydantic models
+class RecurringPatternResponse(BaseModel):
+    id: int
+    merchant: str
+    description: str
+    transaction_type: str
+    category_id: Optional[int]
+    category_name: Optional[str]
+    cadence: str  # "weekly", "monthly" or "yearly"
+    amount: float  # Latest charge
+    monthly_amount: float
+    interval_days: float
+    occurrences: int
+    confidence: float
+    first_date: date
+    last_date: date
+    next_date: date
+    is_active: bool
+
+@router.get("/", response_model=List[RecurringPatternResponse])
+async def get_subscriptions(
+    transaction_type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    include_inactive: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Recurring charges found in the user's transactions, largest monthly cost first.
+
+    Transactions added since the last request are folded in first.
+    """
+    await recurring.scan_user(db, current_user.id)
+    await db.commit()
+    
+    query = select(RecurringPattern, Category.name).outerjoin(
+        Category, RecurringPattern.category_id == Category.id
+    ).where(
+        RecurringPattern.user_id == current_user.id,
+        RecurringPattern.cadence.isnot(None)
+    )
+    if transaction_type:
+        query = query.where(RecurringPattern.transaction_type == transaction_type)
+    
+    today = date.today()
+    subscriptions = [
+        RecurringPatternResponse(
+            id=pattern.id,
+            merchant=pattern.merchant,
+            description=pattern.description,
+            transaction_type=pattern.transaction_type,
+            category_id=pattern.category_id,
+            category_name=category_name,
+            cadence=pattern.cadence,
+            amount=pattern.amount,
+            monthly_amount=round(recurring.monthly_amount(pattern), 2),
+            interval_days=pattern.interval_days,
+            occurrences=pattern.occurrences,
+            confidence=pattern.confidence,
+            first_date=pattern.first_date,
+            last_date=pattern.last_date,
+            next_date=pattern.next_date,
+            is_active=recurring.is_active(pattern, today)
+        )
+        for pattern, category_name in await db.execute(query)
+    ]
+    if not include_inactive:
+        subscriptions = [subscription for subscription in subscriptions if subscription.is_active]
+    
+    return sorted(subscriptions, key=lambda subscription: subscription.monthly_amount, reverse=True)
@@ -1,23 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, tuple_
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, TypeAdapter
+import base64
+import binascii
+import json
+
+import numpy as np
 
 from app.api.routers.auth import get_current_user
+from app.core.auth_cache import CurrentUser
+from app.core.cache import response_cache
+from app.core.datetimes import NaiveUTCDateTime
 from app.db.session import get_db
-from app.db.models import User, Transaction, Category
+from app.db.models import Transaction, Category, MonthlyRollup
+from app.services import budget_alerts, export, rollups, series, statement_import
+from app.tasks.categorization import enqueue_categorization
 
 router = APIRouter()
 
+# Response header carrying the keyset cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Columns written by the export endpoint, in output order
+EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.date,
+    Transaction.amount,
+    Transaction.transaction_type,
+    Transaction.description,
+    Transaction.category_id,
+    Category.name.label("category_name"),
+    Transaction.notes,
+    Transaction.ai_categorized,
+)
+
+# Transaction fields that determine which monthly rollup a row belongs to
+ROLLUP_FIELDS = {"amount", "transaction_type", "category_id", "date"}
+
 # Pydantic models
 class TransactionCreate(BaseModel):
     amount: float
     description: str
     transaction_type: str  # "income" or "expense"
     category_id: Optional[int] = None
-    date: datetime
+    date: NaiveUTCDateTime
     notes: Optional[str] = None
 
 class TransactionUpdate(BaseModel):
@@ -25,7 +55,7 @@ class TransactionUpdate(BaseModel):
     description: Optional[str] = None
     transaction_type: Optional[str] = None
     category_id: Optional[int] = None
-    date: Optional[datetime] = None
+    date: Optional[NaiveUTCDateTime] = None
     notes: Optional[str] = None
 
 class TransactionResponse(BaseModel):
@@ -58,23 +88,115 @@ class DashboardSummary(BaseModel):
     category_summaries: List[CategorySummary]
     recent_transactions: List[TransactionResponse]
 
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+class ImportSummary(BaseModel):
+    inserted: int
+    skipped: int
+    failed: int
+    errors: List[ImportRowError]
+
+class SeriesLineResponse(BaseModel):
+    transaction_type: str
+    category_id: Optional[int]
+    category_name: Optional[str]
+    totals: List[float]
+    cumulative: List[float]
+    moving_average: List[float]
+
+class SeriesResponse(BaseModel):
+    interval: str
+    window: int
+    buckets: List[date]  # Bucket start dates, shared by every line
+    series: List[SeriesLineResponse]
+
+transaction_list_adapter = TypeAdapter(List[TransactionResponse])
+
+def _transaction_query(user_id: int):
+    """Transactions for a user, joined with their category in the same round-trip."""
+    return select(Transaction, Category).outerjoin(
+        Category, Transaction.category_id == Category.id
+    ).where(Transaction.user_id == user_id)
+
+def _apply_filters(
+    query,
+    transaction_type: Optional[str],
+    category_id: Optional[int],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+):
+    if transaction_type:
+        query = query.where(Transaction.transaction_type == transaction_type)
+    if category_id:
+        query = query.where(Transaction.category_id == category_id)
+    if start_date:
+        query = query.where(Transaction.date >= start_date)
+    if end_date:
+        query = query.where(Transaction.date <= end_date)
+    return query
+
+async def _get_user_category(db: AsyncSession, category_id: int, user_id: int) -> Category:
+    category = await db.scalar(select(Category).where(
+        Category.id == category_id,
+        Category.user_id == user_id
+    ))
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    return category
+
+def _build_transaction_response(
+    transaction: Transaction, category: Optional[Category]
+) -> TransactionResponse:
+    return TransactionResponse(
+        id=transaction.id,
+        amount=transaction.amount,
+        description=transaction.description,
+        transaction_type=transaction.transaction_type,
+        category_id=transaction.category_id,
+        category_name=category.name if category else None,
+        category_color=category.color if category else None,
+        date=transaction.date,
+        notes=transaction.notes,
+        ai_categorized=transaction.ai_categorized,
+        created_at=transaction.created_at
+    )
+
+def _encode_cursor(transaction: Transaction) -> str:
+    """Opaque cursor pointing just past ``transaction`` in (date, id) order."""
+    raw = json.dumps({"d": transaction.date.isoformat(), "i": transaction.id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data["d"]), int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _page_response(body: str, next_cursor: Optional[str]) -> Response:
+    """Pre-serialized list page, with the next-page cursor header when there is one."""
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.post("/", response_model=TransactionResponse)
 async def create_transaction(
     transaction_data: TransactionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     # Validate category belongs to user if provided
+    category = None
     if transaction_data.category_id:
-        category = db.query(Category).filter(
-            Category.id == transaction_data.category_id,
-            Category.user_id == current_user.id
-        ).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
+        category = await _get_user_category(db, transaction_data.category_id, current_user.id)
     
     # Create transaction
     db_transaction = Transaction(
@@ -88,180 +210,275 @@ async def create_transaction(
     )
     
     db.add(db_transaction)
-    db.commit()
-    db.refresh(db_transaction)
+    await rollups.record_transaction(db, db_transaction)
+    await budget_alerts.record_transaction(db, db_transaction)
+    await db.commit()
+    await db.refresh(db_transaction)
+    await response_cache.bump_data_version(current_user.id)
+    if db_transaction.category_id is None:
+        await enqueue_categorization(current_user.id)
     
-    # Get category info for response
-    category = None
-    if db_transaction.category_id:
-        category = db.query(Category).filter(Category.id == db_transaction.category_id).first()
+    # The category was already loaded during validation
+    return _build_transaction_response(db_transaction, category)
+
+@router.post("/import", response_model=ImportSummary)
+async def import_transactions(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, pattern="^(csv|ofx)$"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Bulk import a CSV or OFX bank statement.
+
+    CSV files need date, description and amount columns; type, category and
+    notes are optional. Rows already imported earlier are skipped, and so are
+    rows matching a transaction entered by hand on the same day with the same
+    amount, type and merchant.
+    """
+    file_format = file_format or statement_import.detect_format(file.filename)
+    if not file_format:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file type, expected CSV or OFX"
+        )
     
-    return TransactionResponse(
-        id=db_transaction.id,
-        amount=db_transaction.amount,
-        description=db_transaction.description,
-        transaction_type=db_transaction.transaction_type,
-        category_id=db_transaction.category_id,
-        category_name=category.name if category else None,
-        category_color=category.color if category else None,
-        date=db_transaction.date,
-        notes=db_transaction.notes,
-        ai_categorized=db_transaction.ai_categorized,
-        created_at=db_transaction.created_at
+    result = await statement_import.import_statement(db, current_user.id, file.file, file_format)
+    if result.inserted:
+        await response_cache.bump_data_version(current_user.id)
+        await enqueue_categorization(current_user.id)
+    
+    return ImportSummary(
+        inserted=result.inserted,
+        skipped=result.skipped,
+        failed=result.failed,
+        errors=[ImportRowError(row=row, error=error) for row, error in result.errors]
     )
 
 @router.get("/", response_model=List[TransactionResponse])
 async def get_transactions(
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     transaction_type: Optional[str] = None,
     category_id: Optional[int] = None,
-    start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    start_date: Optional[NaiveUTCDateTime] = None,
+    end_date: Optional[NaiveUTCDateTime] = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    # Serve hot pages from the cache; any write bumps the user's data version
+    version = await response_cache.get_data_version(current_user.id)
+    cache_key = response_cache.user_key(
+        current_user.id, version, "transactions",
+        cursor, skip, limit, transaction_type, category_id, start_date, end_date
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        page = json.loads(cached)
+        return _page_response(page["body"], page["next_cursor"])
     
-    # Apply filters
-    if transaction_type:
-        query = query.filter(Transaction.transaction_type == transaction_type)
-    if category_id:
-        query = query.filter(Transaction.category_id == category_id)
-    if start_date:
-        query = query.filter(Transaction.date >= start_date)
-    if end_date:
-        query = query.filter(Transaction.date <= end_date)
+    query = _transaction_query(current_user.id)
     
-    # Get transactions with category info
-    transactions = query.offset(skip).limit(limit).all()
+    query = _apply_filters(query, transaction_type, category_id, start_date, end_date)
     
-    # Get category info for each transaction
-    result = []
-    for transaction in transactions:
-        category = None
-        if transaction.category_id:
-            category = db.query(Category).filter(Category.id == transaction.category_id).first()
-        
-        result.append(TransactionResponse(
-            id=transaction.id,
-            amount=transaction.amount,
-            description=transaction.description,
-            transaction_type=transaction.transaction_type,
-            category_id=transaction.category_id,
-            category_name=category.name if category else None,
-            category_color=category.color if category else None,
-            date=transaction.date,
-            notes=transaction.notes,
-            ai_categorized=transaction.ai_categorized,
-            created_at=transaction.created_at
-        ))
-    
-    return result
+    # Newest first, with id as a tie-breaker so the order is stable
+    query = query.order_by(Transaction.date.desc(), Transaction.id.desc())
+    
+    if cursor:
+        # Keyset pagination: seek past the cursor instead of counting rows
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.where(
+            tuple_(Transaction.date, Transaction.id) < tuple_(cursor_date, cursor_id)
+        )
+    elif skip:
+        # Offset pagination, kept for backwards compatibility
+        query = query.offset(skip)
+    
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][0])
+    
+    result = [
+        _build_transaction_response(transaction, category)
+        for transaction, category in rows
+    ]
+    body = transaction_list_adapter.dump_json(result).decode()
+    await response_cache.set(cache_key, json.dumps({"next_cursor": next_cursor, "body": body}))
+    
+    return _page_response(body, next_cursor)
+
+@router.get("/export")
+async def export_transactions(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    transaction_type: Optional[str] = None,
+    category_id: Optional[int] = None,
+    start_date: Optional[NaiveUTCDateTime] = None,
+    end_date: Optional[NaiveUTCDateTime] = None,
+    current_user: CurrentUser = Depends(get_current_user)
+):
+    """Stream the user's transactions as CSV or NDJSON, oldest first"""
+    query = select(*EXPORT_COLUMNS).outerjoin(
+        Category, Transaction.category_id == Category.id
+    ).where(Transaction.user_id == current_user.id)
+    query = _apply_filters(query, transaction_type, category_id, start_date, end_date)
+    query = query.order_by(Transaction.date, Transaction.id)
+    
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"transactions.{export_format}"
+    return StreamingResponse(
+        export.stream_rows(query, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/series", response_model=SeriesResponse)
+async def get_transaction_series(
+    interval: str = Query("month", pattern="^(day|week|month)$"),
+    start_date: Optional[NaiveUTCDateTime] = None,
+    end_date: Optional[NaiveUTCDateTime] = None,
+    by_category: bool = False,
+    transaction_type: Optional[str] = Query(None, pattern="^(income|expense)$"),
+    window: int = Query(3, ge=1, le=365, description="Moving average window, in buckets"),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Income and expense totals per day, week or month, with running totals and moving averages.
+
+    Empty buckets are returned as zeros. Without start_date the series starts
+    at the user's first transaction.
+    """
+    version = await response_cache.get_data_version(current_user.id)
+    cache_key = response_cache.user_key(
+        current_user.id, version, "series", interval, start_date, end_date, by_category, transaction_type, window
+    )
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    try:
+        result = await series.spending_series(
+            db, current_user.id, interval, start_date, end_date, by_category, transaction_type, window
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Serialized straight from the arrays; thousands of floats per line make model validation the slow part
+    body = json.dumps({
+        "interval": result.interval,
+        "window": result.window,
+        "buckets": np.datetime_as_string(result.buckets.astype("datetime64[D]")).tolist(),
+        "series": [
+            {
+                "transaction_type": line.transaction_type,
+                "category_id": line.category_id,
+                "category_name": line.category_name,
+                "totals": np.round(line.totals, 2).tolist(),
+                "cumulative": np.round(line.cumulative, 2).tolist(),
+                "moving_average": np.round(line.moving_average, 2).tolist(),
+            }
+            for line in result.lines
+        ],
+    })
+    await response_cache.set(cache_key, body)
+    
+    return Response(content=body, media_type="application/json")
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
 async def get_transaction(
     transaction_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == current_user.id
-    ).first()
+    row = (await db.execute(
+        _transaction_query(current_user.id).where(Transaction.id == transaction_id)
+    )).first()
     
-    if not transaction:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transaction not found"
         )
     
-    # Get category info
-    category = None
-    if transaction.category_id:
-        category = db.query(Category).filter(Category.id == transaction.category_id).first()
-    
-    return TransactionResponse(
-        id=transaction.id,
-        amount=transaction.amount,
-        description=transaction.description,
-        transaction_type=transaction.transaction_type,
-        category_id=transaction.category_id,
-        category_name=category.name if category else None,
-        category_color=category.color if category else None,
-        date=transaction.date,
-        notes=transaction.notes,
-        ai_categorized=transaction.ai_categorized,
-        created_at=transaction.created_at
-    )
+    transaction, category = row
+    return _build_transaction_response(transaction, category)
 
 @router.put("/{transaction_id}", response_model=TransactionResponse)
 async def update_transaction(
     transaction_id: int,
     transaction_data: TransactionUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    transaction = db.query(Transaction).filter(
-        Transaction.id == transaction_id,
-        Transaction.user_id == current_user.id
-    ).first()
+    # Lock the row so concurrent edits compute their rollup deltas from the committed values
+    row = (await db.execute(
+        _transaction_query(current_user.id).where(
+            Transaction.id == transaction_id
+        ).with_for_update(of=Transaction)
+    )).first()
     
-    if not transaction:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Transaction not found"
         )
     
+    transaction, category = row
+    update_data = transaction_data.dict(exclude_unset=True)
+    
     # Validate category belongs to user if provided
     if transaction_data.category_id:
-        category = db.query(Category).filter(
-            Category.id == transaction_data.category_id,
-            Category.user_id == current_user.id
-        ).first()
-        if not category:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Category not found"
-            )
+        category = await _get_user_category(db, transaction_data.category_id, current_user.id)
+    elif "category_id" in update_data:
+        # Category explicitly cleared
+        category = None
+    
+    # Move the transaction between rollups if any aggregated field changes
+    rollup_changed = any(
+        field in ROLLUP_FIELDS and getattr(transaction, field) != value
+        for field, value in update_data.items()
+    )
+    if rollup_changed:
+        await rollups.record_transaction(db, transaction, sign=-1)
+        removed = budget_alerts.transaction_write(transaction, sign=-1)
     
     # Update transaction
-    update_data = transaction_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(transaction, field, value)
     
-    db.commit()
-    db.refresh(transaction)
+    # A category picked by the user is a human label from now on
+    if "category_id" in update_data:
+        transaction.ai_categorized = False
     
-    # Get category info for response
-    category = None
-    if transaction.category_id:
-        category = db.query(Category).filter(Category.id == transaction.category_id).first()
+    if rollup_changed:
+        await rollups.record_transaction(db, transaction)
+        # Old and new values net out for budget periods that contain both
+        await budget_alerts.apply_budget_writes(
+            db, current_user.id, [removed, budget_alerts.transaction_write(transaction)]
+        )
     
-    return TransactionResponse(
-        id=transaction.id,
-        amount=transaction.amount,
-        description=transaction.description,
-        transaction_type=transaction.transaction_type,
-        category_id=transaction.category_id,
-        category_name=category.name if category else None,
-        category_color=category.color if category else None,
-        date=transaction.date,
-        notes=transaction.notes,
-        ai_categorized=transaction.ai_categorized,
-        created_at=transaction.created_at
-    )
+    await db.commit()
+    await db.refresh(transaction)
+    await response_cache.bump_data_version(current_user.id)
+    
+    return _build_transaction_response(transaction, category)
 
 @router.delete("/{transaction_id}")
 async def delete_transaction(
     transaction_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    transaction = db.query(Transaction).filter(
+    # Locked so a concurrent edit or delete cannot subtract the row from the rollups twice
+    transaction = await db.scalar(select(Transaction).where(
         Transaction.id == transaction_id,
         Transaction.user_id == current_user.id
-    ).first()
+    ).with_for_update())
     
     if not transaction:
         raise HTTPException(
@@ -269,87 +486,76 @@ async def delete_transaction(
             detail="Transaction not found"
         )
     
-    db.delete(transaction)
-    db.commit()
+    await rollups.record_transaction(db, transaction, sign=-1)
+    await budget_alerts.record_transaction(db, transaction, sign=-1)
+    await db.delete(transaction)
+    await db.commit()
+    await response_cache.bump_data_version(current_user.id)
     
     return {"message": "Transaction deleted successfully"}
 
 @router.get("/summary/dashboard", response_model=DashboardSummary)
 async def get_dashboard_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    # Get date range for current month
-    now = datetime.now()
-    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    # Get total income and expenses for current month
-    income_result = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.transaction_type == "income",
-        Transaction.date >= start_of_month
-    ).scalar() or 0
-    
-    expense_result = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.transaction_type == "expense",
-        Transaction.date >= start_of_month
-    ).scalar() or 0
-    
-    # Get category summaries for expenses
-    category_summaries = db.query(
-        Transaction.category_id,
+    # Rollup key for the current month
+    current_month = rollups.month_start(datetime.now())
+    
+    version = await response_cache.get_data_version(current_user.id)
+    cache_key = response_cache.user_key(current_user.id, version, "dashboard", current_month)
+    cached = await response_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    # Month totals and the per-category breakdown come from the maintained rollups
+    category_totals = (await db.execute(select(
+        MonthlyRollup.category_id,
+        MonthlyRollup.transaction_type,
+        MonthlyRollup.total_amount,
+        MonthlyRollup.transaction_count,
         Category.name.label('category_name'),
-        Category.color.label('category_color'),
-        func.sum(Transaction.amount).label('total_amount'),
-        func.count(Transaction.id).label('transaction_count')
-    ).outerjoin(Category, Transaction.category_id == Category.id).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.transaction_type == "expense",
-        Transaction.date >= start_of_month
-    ).group_by(Transaction.category_id, Category.name, Category.color).all()
-    
-    # Format category summaries
+        Category.color.label('category_color')
+    ).outerjoin(Category, MonthlyRollup.category_id == Category.id).where(
+        MonthlyRollup.user_id == current_user.id,
+        MonthlyRollup.month == current_month,
+        MonthlyRollup.transaction_count > 0
+    ))).all()
+    
+    income_result = 0.0
+    expense_result = 0.0
     formatted_summaries = []
-    for summary in category_summaries:
-        formatted_summaries.append(CategorySummary(
-            category_id=summary.category_id,
-            category_name=summary.category_name or "Uncategorized",
-            category_color=summary.category_color or "#6B7280",
-            total_amount=float(summary.total_amount),
-            transaction_count=summary.transaction_count
-        ))
-    
-    # Get recent transactions (last 10)
-    recent_transactions = db.query(Transaction).filter(
-        Transaction.user_id == current_user.id
-    ).order_by(Transaction.date.desc()).limit(10).all()
+    for summary in category_totals:
+        if summary.transaction_type == "income":
+            income_result += summary.total_amount
+        elif summary.transaction_type == "expense":
+            expense_result += summary.total_amount
+            # Only expense categories appear in the breakdown
+            formatted_summaries.append(CategorySummary(
+                category_id=summary.category_id,
+                category_name=summary.category_name or "Uncategorized",
+                category_color=summary.category_color or "#6B7280",
+                total_amount=summary.total_amount,
+                transaction_count=summary.transaction_count
+            ))
     
-    # Format recent transactions
-    formatted_transactions = []
-    for transaction in recent_transactions:
-        category = None
-        if transaction.category_id:
-            category = db.query(Category).filter(Category.id == transaction.category_id).first()
-        
-        formatted_transactions.append(TransactionResponse(
-            id=transaction.id,
-            amount=transaction.amount,
-            description=transaction.description,
-            transaction_type=transaction.transaction_type,
-            category_id=transaction.category_id,
-            category_name=category.name if category else None,
-            category_color=category.color if category else None,
-            date=transaction.date,
-            notes=transaction.notes,
-            ai_categorized=transaction.ai_categorized,
-            created_at=transaction.created_at
-        ))
-    
-    return DashboardSummary(
-        total_income=float(income_result),
-        total_expenses=float(expense_result),
-        net_amount=float(income_result - expense_result),
+    # Get recent transactions (last 10) with their categories in one query
+    recent_rows = (await db.execute(_transaction_query(current_user.id).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).limit(10))).all()
+    
+    formatted_transactions = [
+        _build_transaction_response(transaction, category)
+        for transaction, category in recent_rows
+    ]
+    
+    summary = DashboardSummary(
+        total_income=income_result,
+        total_expenses=expense_result,
+        net_amount=income_result - expense_result,
         category_summaries=formatted_summaries,
         recent_transactions=formatted_transactions
-    ) 
\ No newline at end of file
+    )
+    await response_cache.set(cache_key, summary.model_dump_json())
+    
+    return summary 
\ No newline at end of file
@@ -0,0 +1,31 @@
+"""Celery application for background work.
+
+Start a worker from ``backend/`` with::
+
+    celery -A app.celery worker --loglevel=info
+
+The broker defaults to ``REDIS_URL``. Tests can set ``CELERY_BROKER_URL=memory://``
+or ``CELERY_TASK_ALWAYS_EAGER=true`` to run without Redis.
+"""
+from celery import Celery
+
+from app.core.config import settings
+
+celery_app = Celery(
+    "financeflareai",
+    broker=settings.CELERY_BROKER_URL or settings.REDIS_URL,
+    backend=settings.CELERY_RESULT_BACKEND or None,
+    include=["app.tasks.categorization"]
+)
+
+celery_app.conf.update(
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    task_eager_propagates=True,
+    task_serializer="json",
+    accept_content=["json"],
+    # Redeliver a task whose worker died mid-run; the task is idempotent
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_ignore_result=not settings.CELERY_RESULT_BACKEND,
+)
@@ -0,0 +1,136 @@
+"""Cached identity lookups for authenticated requests.
+
+``get_current_user`` resolves a bearer token in three steps, each of which is
+cached: the JWT is decoded once per token, and the user row is turned into a
+lightweight ``CurrentUser`` principal that is kept in a short-lived
+in-process cache and shared across workers through the Redis-backed response
+cache. Committed changes to a ``User`` row invalidate its principal, so a
+deactivated user is locked out within ``AUTH_LOCAL_TTL_SECONDS`` on other
+workers and immediately on the worker that made the change.
+"""
+import asyncio
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import LocalTTLCache, response_cache
+from app.core.config import settings
+from app.core.security import verify_token
+from app.db.models import User
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """The authenticated user, detached from any database session."""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            full_name=user.full_name,
+            is_active=bool(user.is_active)
+        )
+
+
+_tokens = LocalTTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+_principals = LocalTTLCache(settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_LOCAL_TTL_SECONDS)
+
+# Strong references to fire-and-forget Redis invalidations
+_background_tasks: set = set()
+
+
+def _principal_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def user_id_from_token(token: str) -> Optional[int]:
+    """Subject of a valid token, decoding each distinct token only once."""
+    cached = _tokens.get(token)
+    if cached is not None:
+        return cached
+
+    payload = verify_token(token)
+    if payload is None or payload.get("sub") is None:
+        return None
+    try:
+        user_id = int(payload["sub"])
+    except (TypeError, ValueError):
+        return None
+
+    # Never keep a token cached past its own expiry
+    ttl = settings.AUTH_TOKEN_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _tokens.set(token, user_id, ttl)
+    return user_id
+
+
+async def get_cached_principal(user_id: int) -> Optional[CurrentUser]:
+    principal = _principals.get(_principal_key(user_id))
+    if principal is not None:
+        return principal
+
+    cached = await response_cache.get(_principal_key(user_id))
+    if cached is None:
+        return None
+    principal = CurrentUser(**json.loads(cached))
+    _principals.set(_principal_key(user_id), principal)
+    return principal
+
+
+async def cache_principal(principal: CurrentUser) -> None:
+    _principals.set(_principal_key(principal.id), principal)
+    await response_cache.set(
+        _principal_key(principal.id),
+        json.dumps(asdict(principal)),
+        ttl=settings.AUTH_CACHE_TTL_SECONDS
+    )
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Drop a user's cached principal locally and in Redis."""
+    _principals.delete(_principal_key(user_id))
+    await response_cache.delete(_principal_key(user_id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_changed(mapper, connection, target: User) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session: Session) -> None:
+    # Invalidate only after commit, so concurrent requests cannot re-cache old rows
+    user_ids = session.info.pop("changed_user_ids", None)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        _principals.delete(_principal_key(user_id))
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    for user_id in user_ids:
+        task = loop.create_task(response_cache.delete(_principal_key(user_id)))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session: Session) -> None:
+    session.info.pop("changed_user_ids", None)
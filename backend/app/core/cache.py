@@ -0,0 +1,222 @@
+"""Response cache backed by Redis with an in-process LRU fallback.
+
+Cached values are keyed by a per-user data version. Every write to a user's
+data replaces that version with a new opaque token, so stale entries are
+simply never read again and expire through their TTL. When Redis is not
+reachable the cache degrades to a per-process LRU, which also lets tests and
+local development run without Redis. Versions bumped while Redis was
+unreachable are pushed to Redis once it is back; until then this worker
+keeps using its local version for those users.
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Set
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Deletes KEYS[1] only while it still holds ARGV[1], atomically
+_DELETE_IF_EQUAL = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class LocalTTLCache:
+    """Size-bounded in-process LRU whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Serialized response cache shared through Redis when it is available."""
+
+    # How long to stay on the local fallback after a Redis failure
+    REDIS_RETRY_SECONDS = 30.0
+
+    def __init__(
+        self,
+        redis_url: str,
+        default_ttl: int,
+        max_local_entries: int,
+        version_ttl: int,
+        prefix: str = "ff"
+    ):
+        self.default_ttl = default_ttl
+        self.version_ttl = version_ttl
+        self.prefix = prefix
+        self._local = LocalTTLCache(max_local_entries, default_ttl)
+        self._redis: Optional[redis.Redis] = None
+        if redis_url:
+            self._redis = redis.from_url(
+                redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.25,
+                socket_timeout=0.25
+            )
+            self._delete_if_equal = self._redis.register_script(_DELETE_IF_EQUAL)
+        self._redis_down_until = 0.0
+        # Users whose version bump has not reached Redis yet
+        self._unsynced_versions: Set[int] = set()
+
+    def _redis_available(self) -> bool:
+        return self._redis is not None and time.monotonic() >= self._redis_down_until
+
+    def _mark_redis_down(self, exc: Exception) -> None:
+        logger.warning("Redis unavailable, using local cache: %s", exc)
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_SECONDS
+
+    async def get(self, key: str) -> Optional[str]:
+        key = f"{self.prefix}:{key}"
+        if self._redis_available():
+            try:
+                return await self._redis.get(key)
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        return self._local.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        key = f"{self.prefix}:{key}"
+        ttl = ttl if ttl is not None else self.default_ttl
+        if self._redis_available():
+            try:
+                await self._redis.set(key, value, ex=ttl)
+                return
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        self._local.set(key, value, ttl)
+
+    async def add(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        """Set ``key`` only if it does not exist; True when this call set it."""
+        key = f"{self.prefix}:{key}"
+        ttl = ttl if ttl is not None else self.default_ttl
+        if self._redis_available():
+            try:
+                return bool(await self._redis.set(key, value, nx=True, ex=ttl))
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        if self._local.get(key) is not None:
+            return False
+        self._local.set(key, value, ttl)
+        return True
+
+    async def delete(self, key: str) -> None:
+        key = f"{self.prefix}:{key}"
+        self._local.delete(key)
+        if self._redis_available():
+            try:
+                await self._redis.delete(key)
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+
+    async def delete_if(self, key: str, value: str) -> bool:
+        """Delete ``key`` only if it still holds ``value``; True when this call deleted it."""
+        key = f"{self.prefix}:{key}"
+        if self._local.get(key) == value:
+            self._local.delete(key)
+            return True
+        if self._redis_available():
+            try:
+                return bool(await self._delete_if_equal(keys=[key], args=[value]))
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        return False
+
+    async def _sync_versions(self) -> None:
+        """Push versions bumped during a Redis outage; raises ``RedisError`` if Redis fails again."""
+        for user_id in list(self._unsynced_versions):
+            key = f"{self.prefix}:ver:{user_id}"
+            version = self._local.get(key) or uuid.uuid4().hex
+            await self._redis.set(key, version, ex=self.version_ttl)
+            self._unsynced_versions.discard(user_id)
+
+    async def get_data_version(self, user_id: int) -> str:
+        """Current opaque data version for a user, created on first use."""
+        key = f"{self.prefix}:ver:{user_id}"
+        if self._redis_available():
+            try:
+                # Otherwise the version from before the outage would serve stale entries again
+                if self._unsynced_versions:
+                    await self._sync_versions()
+                # NX keeps concurrent first readers on the same token
+                await self._redis.set(key, uuid.uuid4().hex, nx=True, ex=self.version_ttl)
+                version = await self._redis.get(key)
+                if version is not None:
+                    return version
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        version = self._local.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            self._local.set(key, version, self.version_ttl)
+        return version
+
+    async def bump_data_version(self, user_id: int) -> None:
+        """Invalidate every cached response for a user after a write."""
+        key = f"{self.prefix}:ver:{user_id}"
+        version = uuid.uuid4().hex
+        # Always update the local copy so a later fallback cannot serve stale data
+        self._local.set(key, version, self.version_ttl)
+        if self._redis is None:
+            return
+        if self._redis_available():
+            try:
+                await self._redis.set(key, version, ex=self.version_ttl)
+                return
+            except RedisError as exc:
+                self._mark_redis_down(exc)
+        self._unsynced_versions.add(user_id)
+
+    def user_key(self, user_id: int, version: str, name: str, *parts: Any) -> str:
+        suffix = ":".join(str(part) for part in parts)
+        return f"u:{user_id}:{version}:{name}:{suffix}"
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+
+
+response_cache = ResponseCache(
+    redis_url=settings.REDIS_URL,
+    default_ttl=settings.CACHE_TTL_SECONDS,
+    max_local_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+    version_ttl=settings.CACHE_VERSION_TTL_SECONDS
+)
@@ -0,0 +1,22 @@
+"""Request datetimes in the form the database stores them.
+
+Transaction and budget dates live in naive ``DateTime`` columns that hold
+UTC. asyncpg refuses timezone-aware values for those columns, but clients
+send them: the frontend posts ``Date.toISOString()`` values, which end in
+``Z``. ``NaiveUTCDateTime`` accepts both forms in request models and query
+parameters and converts aware values to naive UTC.
+"""
+from datetime import datetime, timezone
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """``value`` in UTC without tzinfo; naive values are assumed to be UTC already."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+NaiveUTCDateTime = Annotated[datetime, AfterValidator(to_naive_utc)]
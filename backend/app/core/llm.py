@@ -0,0 +1,205 @@
+"""Shared asynchronous client for OpenAI-compatible chat completions.
+
+One pooled HTTP client is reused for every call. Each call gets a timeout,
+transient failures (timeouts, connection errors, 429 and 5xx responses) are
+retried with full-jitter exponential backoff, and a semaphore caps the number
+of requests in flight. Identical concurrent requests are coalesced into one
+call through ``SingleFlight``, within a worker and across workers.
+``stream`` yields a completion as it is generated.
+
+Pointing ``OPENAI_BASE_URL`` at a local OpenAI-compatible server makes the
+client easy to exercise without the real API.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from functools import partial
+from typing import AsyncIterator, Dict, List, Optional
+
+import httpx
+import openai
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+from app.core.single_flight import SingleFlight
+
+# Errors worth retrying; anything else from the API fails immediately
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class LLMError(Exception):
+    """The LLM call failed after all retries, or with a non-retryable error."""
+
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        model: str,
+        timeout: float,
+        max_retries: int,
+        max_concurrency: int,
+        max_connections: int,
+        single_flight: Optional[SingleFlight] = None,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.single_flight = single_flight
+        self._configured = bool(api_key or base_url)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            ),
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        )
+        self._client = AsyncOpenAI(
+            # A local fake server does not need a real key
+            api_key=api_key or "not-configured",
+            base_url=base_url or None,
+            http_client=self._http,
+            max_retries=0,
+            timeout=timeout
+        )
+
+    @property
+    def configured(self) -> bool:
+        return self._configured
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _request_key(model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> str:
+        # Whitespace differences do not change the answer, so they do not split requests
+        normalized = [
+            {"role": message["role"], "content": " ".join(message["content"].split())}
+            for message in messages
+        ]
+        payload = json.dumps([model, normalized, max_tokens, temperature], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+        coalesce: bool = True
+    ) -> str:
+        """Return the text of the first choice of a chat completion.
+
+        Identical concurrent requests share one call unless ``coalesce`` is off.
+        """
+        model = model or self.model
+        call = partial(self._complete, messages, max_tokens, temperature, timeout, model)
+        if coalesce and self.single_flight is not None:
+            return await self.single_flight.do(
+                self._request_key(model, messages, max_tokens, temperature), call
+            )
+        return await call()
+
+    async def _complete(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float],
+        model: str
+    ) -> str:
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._slots:
+                    response = await self._client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        timeout=timeout or self.timeout
+                    )
+                return (response.choices[0].message.content or "").strip()
+            except RETRYABLE_ERRORS as exc:
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM request failed after {attempt + 1} attempts") from exc
+                await asyncio.sleep(self._backoff(attempt))
+            except openai.OpenAIError as exc:
+                raise LLMError("LLM request failed") from exc
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Yield the text of the first choice as the model produces it.
+
+        Opening the stream is retried like ``complete``. Once text has been
+        yielded, a failure ends the stream with ``LLMError``. Streams are never
+        coalesced, and each one holds a concurrency slot until it ends.
+        """
+        model = model or self.model
+        for attempt in range(self.max_retries + 1):
+            await self._slots.acquire()
+            try:
+                stream = await self._client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=timeout or self.timeout,
+                    stream=True
+                )
+                break
+            except RETRYABLE_ERRORS as exc:
+                self._slots.release()
+                if attempt == self.max_retries:
+                    raise LLMError(f"LLM stream failed to open after {attempt + 1} attempts") from exc
+                await asyncio.sleep(self._backoff(attempt))
+            except openai.OpenAIError as exc:
+                self._slots.release()
+                raise LLMError("LLM stream failed to open") from exc
+
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except (openai.OpenAIError, httpx.HTTPError) as exc:
+            raise LLMError("LLM stream was interrupted") from exc
+        finally:
+            self._slots.release()
+            await stream.response.aclose()
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+
+llm_client = LLMClient(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    model=settings.OPENAI_MODEL,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_connections=settings.LLM_MAX_CONNECTIONS,
+    single_flight=SingleFlight(
+        lock_ttl=settings.LLM_SINGLE_FLIGHT_LOCK_SECONDS,
+        result_ttl=settings.LLM_SINGLE_FLIGHT_RESULT_SECONDS,
+        wait_timeout=settings.LLM_SINGLE_FLIGHT_WAIT_SECONDS
+    ) if settings.LLM_SINGLE_FLIGHT_ENABLED else None
+)
@@ -0,0 +1,186 @@
+"""LLM prompt templates, loaded and validated once at import.
+
+Templates live in ``app/prompts/<name>.txt``. A file holds an optional
+``[system]`` section followed by a ``[user]`` section; a file without section
+markers is a single user message. The user message is a ``str.format``
+template, so literal braces are doubled.
+
+At load time, every template registered in ``PROMPT_SPECS`` must exist and
+must use exactly the placeholders its spec declares. A broken template fails
+startup instead of failing requests.
+
+Each template gets a version: a hash of its file contents. Caches of LLM
+answers key on it, so editing a prompt invalidates what the old wording
+produced.
+
+``render`` can keep a prompt within a token budget. It counts tokens locally
+with ``count_tokens`` and, when the prompt is too long, drops lines from the
+end of the template's trimmable sections, such as recent transactions.
+"""
+import hashlib
+import logging
+import re
+import string
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+_TOKEN_PIECES = re.compile(r"\s{2,}|\d+|[^\W\d]+|[^\w\s]")
+
+
+class PromptError(Exception):
+    """A prompt template is missing or does not match its spec."""
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    fields: FrozenSet[str]
+    # Fields passed as lists of lines, trimmed from the end in this order to fit a budget
+    trimmable: Tuple[str, ...] = ()
+
+
+PROMPT_SPECS: Dict[str, PromptSpec] = {
+    "categorize": PromptSpec(frozenset({"description", "amount", "date", "expense_categories", "income_categories"})),
+    "categorize_batch": PromptSpec(frozenset({"items", "expense_categories", "income_categories"})),
+    "expense_categorization": PromptSpec(frozenset({"description", "amount"})),
+    "budgeting_advice": PromptSpec(
+        frozenset({"monthly_income", "current_month_spending", "top_categories", "budget_goals", "recent_transactions"}),
+        trimmable=("recent_transactions",)
+    ),
+    "nl_parse": PromptSpec(frozenset({"text", "today"})),
+}
+
+
+def count_tokens(text: str) -> int:
+    """Local estimate of the tokens ``text`` costs in a chat model prompt.
+
+    Close to BPE tokenizers for English: common words are one token, long
+    words a few, digits go in groups of three, and each punctuation mark and
+    whitespace run is a token of its own.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += 1 + len(piece) // 8
+        else:
+            tokens += 1
+    return tokens
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    system: Optional[str]
+    user: str
+    version: str
+    spec: PromptSpec
+    # Tokens of the template with every placeholder empty
+    fixed_tokens: int
+
+    def render(
+        self,
+        budget: Optional[int] = None,
+        **values: Union[str, int, float, Sequence[str], None]
+    ) -> List[Dict[str, str]]:
+        """Chat messages for this prompt, trimmed to ``budget`` tokens if given."""
+        missing = self.spec.fields - values.keys()
+        if missing:
+            raise PromptError(f"Prompt {self.name!r} is missing values for {sorted(missing)}")
+
+        sections = {field: _lines(values[field]) for field in self.spec.trimmable}
+        if budget is not None:
+            fixed = self.fixed_tokens + sum(
+                count_tokens(str(value)) for field, value in values.items() if field not in sections
+            )
+            costs = {field: [count_tokens(line) + 1 for line in lines] for field, lines in sections.items()}
+            total = fixed + sum(sum(field_costs) for field_costs in costs.values())
+            dropped = 0
+            for field in self.spec.trimmable:
+                while total > budget and sections[field]:
+                    sections[field].pop()
+                    total -= costs[field].pop()
+                    dropped += 1
+            if dropped:
+                logger.debug("Trimmed %d lines from prompt %s to fit %d tokens", dropped, self.name, budget)
+
+        rendered = {**values, **{field: "\n".join(lines) or "None" for field, lines in sections.items()}}
+        messages = []
+        if self.system:
+            messages.append({"role": "system", "content": self.system})
+        messages.append({"role": "user", "content": self.user.format(**rendered)})
+        return messages
+
+
+def _lines(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return value.splitlines()
+    return [str(line) for line in value]
+
+
+def _split_sections(name: str, text: str) -> Tuple[Optional[str], str]:
+    if not text.lstrip().startswith("[system]"):
+        return None, text.strip()
+    system, separator, user = text.lstrip()[len("[system]"):].partition("\n[user]\n")
+    if not separator:
+        raise PromptError(f"Prompt {name!r} has a [system] section but no [user] section")
+    return system.strip(), user.strip()
+
+
+def _load_template(directory: Path, name: str, spec: PromptSpec) -> PromptTemplate:
+    path = directory / f"{name}.txt"
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError as exc:
+        raise PromptError(f"Prompt {name!r} could not be read from {path}: {exc}") from exc
+
+    system, user = _split_sections(name, text)
+    try:
+        placeholders = {field for _, field, _, _ in string.Formatter().parse(user) if field is not None}
+    except ValueError as exc:
+        raise PromptError(f"Prompt {name!r} is not a valid format string: {exc}") from exc
+    if placeholders != spec.fields:
+        raise PromptError(
+            f"Prompt {name!r} placeholders {sorted(placeholders)} do not match its spec {sorted(spec.fields)}"
+        )
+    unknown_trimmable = set(spec.trimmable) - spec.fields
+    if unknown_trimmable:
+        raise PromptError(f"Prompt {name!r} trims unknown fields {sorted(unknown_trimmable)}")
+
+    empty = user.format(**{field: "" for field in spec.fields})
+    return PromptTemplate(
+        name=name,
+        system=system,
+        user=user,
+        version=hashlib.sha256(text.encode("utf-8")).hexdigest()[:12],
+        spec=spec,
+        fixed_tokens=count_tokens(system or "") + count_tokens(empty)
+    )
+
+
+class PromptRegistry:
+    def __init__(self, directory: Path = PROMPTS_DIR, specs: Dict[str, PromptSpec] = PROMPT_SPECS):
+        self.directory = directory
+        self._templates = {name: _load_template(directory, name, spec) for name, spec in specs.items()}
+        unregistered = {path.stem for path in directory.glob("*.txt")} - specs.keys()
+        if unregistered:
+            logger.warning("Ignoring unregistered prompt templates: %s", ", ".join(sorted(unregistered)))
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise PromptError(f"Unknown prompt {name!r}") from None
+
+    def versions(self) -> Dict[str, str]:
+        return {name: template.version for name, template in self._templates.items()}
+
+
+prompt_registry = PromptRegistry()
@@ -0,0 +1,120 @@
+"""Request coalescing for identical concurrent calls.
+
+``SingleFlight.do(key, fn)`` makes sure that, for each key, only one call
+to ``fn`` is in progress at a time:
+
+- Within a process, callers with the same key await one shared task.
+- Across workers, a short Redis lock elects a leader. The other workers
+  poll for the result the leader publishes.
+- If the leader disappears without publishing, its lock is gone: the first
+  waiter to take the lock over calls ``fn`` and the others keep waiting for
+  it. A waiter whose wait times out calls ``fn`` itself.
+
+The lock holds a token unique to the call that took it and is released with
+a compare-and-delete, so a leader that outlives its lock TTL cannot release
+the lock of the leader after it.
+
+The shared task is shielded, so a caller that disconnects does not cancel
+the work for the others.
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.cache import response_cache
+
+
+class SingleFlightMetrics:
+    def __init__(self):
+        self.leader_calls = 0
+        self.local_coalesced = 0
+        self.remote_coalesced = 0
+        # Waiters that gave up on the leader and made the call themselves
+        self.fallthrough_calls = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        coalesced = self.local_coalesced + self.remote_coalesced
+        calls = self.leader_calls + self.fallthrough_calls
+        total = coalesced + calls
+        return {
+            "calls": calls,
+            "coalesced": {
+                "local": self.local_coalesced,
+                "remote": self.remote_coalesced,
+                "total": coalesced,
+            },
+            "fallthrough_calls": self.fallthrough_calls,
+            "coalesced_rate": round(coalesced / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    def __init__(
+        self,
+        lock_ttl: int,
+        result_ttl: int,
+        wait_timeout: float,
+        poll_interval: float = 0.1,
+        prefix: str = "sf"
+    ):
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self.metrics = SingleFlightMetrics()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics.local_coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._run(key, fn))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        lock_key = f"{self.prefix}:lock:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = uuid.uuid4().hex
+
+        result = await response_cache.get(result_key)
+        if result is not None:
+            self.metrics.remote_coalesced += 1
+            return result
+
+        if await response_cache.add(lock_key, token, ttl=self.lock_ttl):
+            self.metrics.leader_calls += 1
+            return await self._lead(lock_key, result_key, token, fn)
+
+        # Another worker is leading; wait for its result
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await response_cache.get(result_key)
+            if result is not None:
+                self.metrics.remote_coalesced += 1
+                return result
+            # The lock is only free when the leader failed without publishing; one waiter takes over
+            if await response_cache.add(lock_key, token, ttl=self.lock_ttl):
+                result = await response_cache.get(result_key)
+                if result is not None:
+                    # Published between the two reads above
+                    await response_cache.delete_if(lock_key, token)
+                    self.metrics.remote_coalesced += 1
+                    return result
+                self.metrics.fallthrough_calls += 1
+                return await self._lead(lock_key, result_key, token, fn)
+        self.metrics.fallthrough_calls += 1
+        return await fn()
+
+    async def _lead(self, lock_key: str, result_key: str, token: str, fn: Callable[[], Awaitable[str]]) -> str:
+        try:
+            result = await fn()
+            await response_cache.set(result_key, result, ttl=self.result_ttl)
+            return result
+        finally:
+            await response_cache.delete_if(lock_key, token)
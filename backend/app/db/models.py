@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import ARRAY, Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -27,7 +27,7 @@ class Category(Base):
     name = Column(String, nullable=False)
     color = Column(String, default="#6B7280")
     icon = Column(String)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -46,12 +46,24 @@ class Transaction(Base):
     date = Column(DateTime, nullable=False)
     notes = Column(Text)
     ai_categorized = Column(Boolean, default=False)
+    import_hash = Column(String(64))  # Content hash of imported statement rows
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="transactions")
     category = relationship("Category", back_populates="transactions")
+    
+    # Composite indexes matching the per-user access patterns
+    __table_args__ = (
+        Index("ix_transactions_user_id_date", user_id, date.desc(), id.desc()),
+        Index("ix_transactions_user_id_type_date", user_id, transaction_type, date),
+        Index("ix_transactions_user_id_category_id_date", user_id, category_id, date),
+        Index(
+            "uq_transactions_user_id_import_hash", user_id, import_hash,
+            unique=True, postgresql_where=import_hash.isnot(None)
+        ),
+    )
 
 class Budget(Base):
     __tablename__ = "budgets"
@@ -61,7 +73,7 @@ class Budget(Base):
     amount = Column(Float, nullable=False)
     period = Column(String, nullable=False)  # "monthly", "weekly", "yearly"
     category_id = Column(Integer, ForeignKey("categories.id"))
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime)
     is_active = Column(Boolean, default=True)
@@ -70,4 +82,154 @@ class Budget(Base):
     
     # Relationships
     user = relationship("User", back_populates="budgets")
-    category = relationship("Category") 
\ No newline at end of file
+    category = relationship("Category") 
+
+class MonthlyRollup(Base):
+    """Running per-user totals for one month, category and transaction type.
+
+    Maintained by ``app.services.rollups`` in the same DB transaction as every
+    transaction write, so summaries never have to re-aggregate raw rows.
+    """
+    __tablename__ = "monthly_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    transaction_type = Column(String, nullable=False)  # "income" or "expense"
+    total_amount = Column(Float, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    category = relationship("Category")
+    
+    # Uncategorized rows share one key, so NULL category ids must collide
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "month", "category_id", "transaction_type",
+            name="uq_monthly_rollups_key",
+            postgresql_nulls_not_distinct=True
+        ),
+    )
+
+class CategorizationCacheEntry(Base):
+    """A past LLM categorization, shared by every user with the same merchant.
+
+    Keyed by a hash of the normalized description, prompt version and model,
+    so changing the prompt or model starts a fresh set of entries.
+    """
+    __tablename__ = "categorization_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    normalized_description = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    suggested_category = Column(String, nullable=False)
+    transaction_type = Column(String, nullable=False)  # "income" or "expense"
+    confidence = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class CategorizationJob(Base):
+    """One run of the background categorization task for a user."""
+    __tablename__ = "categorization_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    task_id = Column(String)
+    status = Column(String, nullable=False, default="running")  # "running", "succeeded", "retrying" or "dead"
+    attempts = Column(Integer, nullable=False, default=0)
+    processed = Column(Integer, nullable=False, default=0)
+    categorized = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        Index("ix_categorization_jobs_user_id_created_at", user_id, created_at.desc()),
+    )
+
+class BudgetPeriodTotal(Base):
+    """Running expense total of one budget for one period.
+
+    Maintained by ``app.services.budget_alerts`` on every transaction write.
+    A row is seeded from raw transactions the first time a write touches its
+    period, and from then on changes only by deltas.
+    """
+    __tablename__ = "budget_period_totals"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    budget_id = Column(Integer, ForeignKey("budgets.id"), nullable=False)
+    period_start = Column(DateTime, nullable=False)  # date_trunc of the budget's period unit
+    spent = Column(Float, nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("budget_id", "period_start", name="uq_budget_period_totals_key"),
+    )
+
+class BudgetAlert(Base):
+    """A budget period's spending crossed a threshold (50, 80 or 100 percent)."""
+    __tablename__ = "budget_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    budget_id = Column(Integer, ForeignKey("budgets.id"), nullable=False)
+    period_start = Column(DateTime, nullable=False)
+    threshold = Column(Integer, nullable=False)  # Percent of the budget amount
+    spent = Column(Float, nullable=False)
+    amount = Column(Float, nullable=False)  # The budget amount at the time
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    read_at = Column(DateTime(timezone=True))
+    
+    __table_args__ = (
+        # Each threshold alerts at most once per budget period
+        UniqueConstraint("budget_id", "period_start", "threshold", name="uq_budget_alerts_key"),
+        Index("ix_budget_alerts_user_id_id", user_id, id.desc()),
+    )
+
+class RecurringPattern(Base):
+    """One merchant's charge history for a user and the periodic pattern found in it.
+
+    Maintained by ``app.services.recurring``. Every merchant with at least one
+    transaction has a row, so later charges can be folded in without rereading
+    old transactions; ``cadence`` is NULL until a pattern is detected.
+    """
+    __tablename__ = "recurring_patterns"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    merchant = Column(String, nullable=False)  # Normalized description
+    transaction_type = Column(String, nullable=False)  # "income" or "expense"
+    description = Column(String, nullable=False)  # Latest raw description
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    # Most recent charges, oldest first, capped at RECURRING_HISTORY_LIMIT
+    dates = Column(ARRAY(Date), nullable=False)
+    amounts = Column(ARRAY(Float), nullable=False)
+    cadence = Column(String)  # "weekly", "monthly", "yearly" or NULL
+    interval_days = Column(Float)  # Median days between charges
+    amount = Column(Float)  # Latest charge within the amount tolerance
+    occurrences = Column(Integer, nullable=False, default=0)
+    confidence = Column(Float, nullable=False, default=0)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    next_date = Column(Date)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    category = relationship("Category")
+    
+    __table_args__ = (
+        UniqueConstraint("user_id", "merchant", "transaction_type", name="uq_recurring_patterns_key"),
+    )
+
+class RecurringScanState(Base):
+    """Id of the last transaction folded into a user's recurring patterns."""
+    __tablename__ = "recurring_scan_state"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    watermark = Column(Integer, nullable=False, default=0)
+    scanned_at = Column(DateTime(timezone=True))
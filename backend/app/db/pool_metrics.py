@@ -0,0 +1,107 @@
+"""Connection pool instrumentation.
+
+Checkouts, checkins, new connections and invalidations are counted through
+SQLAlchemy pool events. Pool events fire only after a connection has been
+handed out, so the time spent waiting for a free connection, overflow
+connections and checkout timeouts are measured by ``InstrumentedAsyncPool``,
+a thin subclass of the pool the async engine uses by default.
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+
+class PoolMetrics:
+    """Counters and a checkout wait-time histogram for one pool."""
+
+    # Upper bounds, in seconds, of the wait-time histogram buckets
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.overflow_events = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_counts = [0] * (len(self.WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.wait_counts[bisect.bisect_left(self.WAIT_BUCKETS, seconds)] += 1
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        with self._lock:
+            observed = sum(self.wait_counts)
+            buckets = {
+                f"le_{bound}": count
+                for bound, count in zip(self.WAIT_BUCKETS, self.wait_counts)
+            }
+            buckets["le_inf"] = self.wait_counts[-1]
+            return {
+                "pool": {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                },
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "wait_seconds": {
+                    "count": observed,
+                    "mean": self.wait_total / observed if observed else 0.0,
+                    "max": self.wait_max,
+                    "buckets": buckets,
+                },
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Async queue pool that records checkout wait time, overflow and timeouts."""
+
+    def _do_get(self):
+        overflow_before = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.increment("timeouts")
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - start)
+        if self.overflow() > max(overflow_before, 0):
+            pool_metrics.increment("overflow_events")
+        return connection
+
+
+def register_pool_events(pool: Pool) -> None:
+    """Attach the event listeners that feed ``pool_metrics``."""
+    event.listen(pool, "checkout", lambda *args: pool_metrics.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *args: pool_metrics.increment("checkins"))
+    event.listen(pool, "connect", lambda *args: pool_metrics.increment("connects"))
+    event.listen(pool, "invalidate", lambda *args: pool_metrics.increment("invalidations"))
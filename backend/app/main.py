@@ -1,19 +1,27 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api.routers import auth, transactions, budgets, ai
+from app.core.cache import response_cache
+from app.core.llm import llm_client
+from app.core.security import shutdown_password_hashing
 from app.db.session import engine
-from app.db.models import Base
+from app.db.pool_metrics import pool_metrics
+from app.api.routers import auth, transactions, budgets, ai, subscriptions
+from app.api.routers.auth import get_current_user
+from app.api.routers.transactions import NEXT_CURSOR_HEADER
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
+    # The schema is managed by Alembic migrations (`alembic upgrade head`)
     yield
     # Shutdown
-    pass
+    shutdown_password_hashing()
+    await llm_client.close()
+    await response_cache.close()
+    await engine.dispose()
 
 app = FastAPI(
     title="FinanceFlareAI API",
@@ -35,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -42,6 +51,7 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(transactions.router, prefix="/api/transactions", tags=["Transactions"])
 app.include_router(budgets.router, prefix="/api/budgets", tags=["Budgets"])
 app.include_router(ai.router, prefix="/api/ai", tags=["AI Services"])
+app.include_router(subscriptions.router, prefix="/api/subscriptions", tags=["Subscriptions"])
 
 @app.get("/")
 async def root():
@@ -49,4 +59,10 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"} 
\ No newline at end of file
+    return {"status": "healthy"} 
+
+# Pool internals are for operators, so unlike /health this needs a signed-in user
+@app.get("/health/db-pool", dependencies=[Depends(get_current_user)])
+async def db_pool_metrics():
+    """Connection pool usage, checkout wait times and overflow/timeout counts"""
+    return pool_metrics.snapshot(engine.sync_engine.pool)
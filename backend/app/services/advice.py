@@ -0,0 +1,132 @@
+"""Inputs and caching for personalized budgeting advice.
+
+``gather_advice_inputs`` assembles everything the advice prompt needs in one
+round trip. A single ``UNION ALL`` statement returns:
+
+- this month's totals per category, read from the monthly rollups;
+- the user's active budgets;
+- the most recent transactions of the last ``AI_ADVICE_RECENT_DAYS`` days.
+
+Each row is tagged with its kind. Generated advice is cached for each user
+and day under the user's data version and the prompt version, so it is
+produced at most once a day unless the user's data or the prompt changes.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.prompts import prompt_registry
+from app.db.models import Budget, Category, MonthlyRollup, Transaction
+from app.services import rollups
+
+
+@dataclass
+class AdviceInputs:
+    monthly_income: float = 0.0
+    current_month_spending: float = 0.0
+    # (category name, amount spent this month), largest first
+    top_categories: List[Tuple[str, float]] = field(default_factory=list)
+    budget_goals: List[str] = field(default_factory=list)
+    recent_transactions: List[str] = field(default_factory=list)
+
+
+def _advice_query(user_id: int, today: date):
+    # Every branch returns (kind, label, amount, category, detail, position)
+    month_totals = select(
+        literal("category").label("kind"),
+        func.coalesce(Category.name, "Uncategorized").label("label"),
+        MonthlyRollup.total_amount.label("amount"),
+        Category.name.label("category"),
+        MonthlyRollup.transaction_type.label("detail"),
+        literal(0).label("position")
+    ).outerjoin(Category, MonthlyRollup.category_id == Category.id).where(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.month == rollups.month_start(today),
+        MonthlyRollup.transaction_count > 0
+    )
+
+    budgets = select(
+        literal("budget").label("kind"),
+        Budget.name.label("label"),
+        Budget.amount.label("amount"),
+        Category.name.label("category"),
+        Budget.period.label("detail"),
+        literal(0).label("position")
+    ).outerjoin(Category, Budget.category_id == Category.id).where(
+        Budget.user_id == user_id,
+        Budget.is_active.is_(True)
+    )
+
+    # LIMIT inside a UNION branch needs its own subquery
+    since = datetime.combine(today - timedelta(days=settings.AI_ADVICE_RECENT_DAYS), time.min)
+    recent = select(
+        Transaction.description,
+        Transaction.amount,
+        Category.name.label("category_name"),
+        Transaction.transaction_type,
+        func.row_number().over(order_by=(Transaction.date.desc(), Transaction.id.desc())).label("position")
+    ).outerjoin(Category, Transaction.category_id == Category.id).where(
+        Transaction.user_id == user_id,
+        Transaction.date >= since
+    ).order_by(Transaction.date.desc(), Transaction.id.desc()).limit(settings.AI_ADVICE_RECENT_LIMIT).subquery()
+    recent_rows = select(
+        literal("recent").label("kind"),
+        recent.c.description,
+        recent.c.amount,
+        recent.c.category_name,
+        recent.c.transaction_type,
+        recent.c.position
+    )
+
+    return union_all(month_totals, budgets, recent_rows)
+
+
+async def gather_advice_inputs(db: AsyncSession, user_id: int, today: Optional[date] = None) -> AdviceInputs:
+    """Everything the advice prompt needs, from one aggregate query."""
+    today = today or date.today()
+    inputs = AdviceInputs()
+    spending = {}
+    recent = []
+    for row in await db.execute(_advice_query(user_id, today)):
+        if row.kind == "category":
+            if row.detail == "income":
+                inputs.monthly_income += row.amount
+            else:
+                inputs.current_month_spending += row.amount
+                spending[row.label] = spending.get(row.label, 0.0) + row.amount
+        elif row.kind == "budget":
+            goal = f"Keep {row.label} under ${row.amount:.2f} {row.detail}"
+            inputs.budget_goals.append(f"{goal} ({row.category})" if row.category else goal)
+        else:
+            sign = "+" if row.detail == "income" else "-"
+            recent.append((row.position, f"- {row.label}: {sign}${row.amount:.2f} ({row.category or 'Uncategorized'})"))
+
+    inputs.top_categories = sorted(spending.items(), key=lambda item: item[1], reverse=True)[
+        :settings.AI_ADVICE_TOP_CATEGORIES
+    ]
+    # Newest first, so trimming the prompt to its budget drops the oldest
+    inputs.recent_transactions = [line for _, line in sorted(recent)]
+    return inputs
+
+
+def advice_messages(inputs: AdviceInputs) -> List[Dict[str, str]]:
+    return prompt_registry.get("budgeting_advice").render(
+        budget=settings.AI_ADVICE_PROMPT_TOKENS,
+        monthly_income=f"{inputs.monthly_income:.2f}",
+        current_month_spending=f"{inputs.current_month_spending:.2f}",
+        top_categories=", ".join(f"{name} (${total:.2f})" for name, total in inputs.top_categories) or "None yet",
+        budget_goals=", ".join(inputs.budget_goals) or "No specific goals set",
+        recent_transactions=inputs.recent_transactions
+    )
+
+
+async def advice_cache_key(user_id: int, today: date) -> str:
+    version = await response_cache.get_data_version(user_id)
+    return response_cache.user_key(
+        user_id, version, "advice", today.isoformat(), prompt_registry.get("budgeting_advice").version
+    )
@@ -0,0 +1,258 @@
+"""Running budget period totals and threshold alerts.
+
+Every transaction write applies its delta inside the caller's DB
+transaction, next to the monthly rollups:
+
+- the expense is matched against the user's budgets by category and date;
+- each matching budget period's row in ``budget_period_totals`` moves by the
+  delta with a single ``UPDATE ... RETURNING``;
+- comparing the total before and after the delta shows which of the 50, 80
+  and 100 percent thresholds were crossed, without re-summing anything.
+
+Each crossing is recorded once per budget period in ``budget_alerts``, which
+clients poll with an id cursor.
+
+A period's row is seeded from raw transactions the first time a write
+touches it. The seed must reflect the database before the write, so callers
+apply deltas before flushing the write, or pass the ids of rows they have
+already inserted in ``exclude_ids``. ``verify`` compares the stored totals
+with a full recomputation::
+
+    python -m app.services.budget_alerts verify
+    python -m app.services.budget_alerts rebuild --user-id 42
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Budget, BudgetAlert, BudgetPeriodTotal, Transaction
+from app.services.budgets import period_bounds
+
+# Percent of the budget amount at which an alert is recorded
+ALERT_THRESHOLDS = (50, 80, 100)
+
+PeriodKey = Tuple[int, datetime]
+
+
+@dataclass(frozen=True)
+class BudgetWrite:
+    when: datetime
+    category_id: Optional[int]
+    transaction_type: str
+    amount: float  # Negative when a transaction leaves its budgets
+    count: int  # 1 or -1
+
+
+def transaction_write(transaction: Transaction, sign: int = 1) -> BudgetWrite:
+    """The write that adds (``sign=1``) or removes (``sign=-1``) a transaction."""
+    return BudgetWrite(
+        when=transaction.date,
+        category_id=transaction.category_id,
+        transaction_type=transaction.transaction_type,
+        amount=sign * transaction.amount,
+        count=sign
+    )
+
+
+def budget_matches(budget, write: BudgetWrite) -> bool:
+    """Whether a write counts toward a budget; budgets without a category take every expense."""
+    return (
+        write.transaction_type == "expense"
+        and (budget.category_id is None or budget.category_id == write.category_id)
+        and budget.start_date <= write.when
+        and (budget.end_date is None or write.when <= budget.end_date)
+    )
+
+
+def budget_deltas(budgets: Iterable, writes: Iterable[BudgetWrite]) -> Dict[PeriodKey, Tuple[float, int]]:
+    """Net (amount, count) change per (budget id, period start)."""
+    deltas: Dict[PeriodKey, List[float]] = defaultdict(lambda: [0.0, 0])
+    budgets = list(budgets)
+    for write in writes:
+        for budget in budgets:
+            if budget_matches(budget, write):
+                delta = deltas[(budget.id, period_bounds(budget.period, write.when)[0])]
+                delta[0] += write.amount
+                delta[1] += write.count
+    # A transaction edited within the same period and amount nets out
+    return {key: (amount, count) for key, (amount, count) in deltas.items() if count or abs(amount) > 1e-9}
+
+
+def crossed_thresholds(before: float, after: float, limit: float) -> List[int]:
+    """Thresholds that ``after`` reaches and ``before`` did not."""
+    if limit <= 0 or after <= before:
+        return []
+    return [threshold for threshold in ALERT_THRESHOLDS if before < limit * threshold / 100 <= after]
+
+
+def _period_filter(budget, period_start: datetime, user_id: int):
+    start, end = period_bounds(budget.period, period_start)
+    conditions = [
+        Transaction.user_id == user_id,
+        Transaction.transaction_type == "expense",
+        Transaction.date >= max(start, budget.start_date),
+        Transaction.date < end,
+    ]
+    if budget.end_date is not None:
+        conditions.append(Transaction.date <= budget.end_date)
+    if budget.category_id is not None:
+        conditions.append(Transaction.category_id == budget.category_id)
+    return and_(*conditions)
+
+
+async def _seed(
+    db: AsyncSession,
+    user_id: int,
+    budget,
+    period_start: datetime,
+    exclude_ids: Collection[int]
+) -> Tuple[float, int]:
+    query = select(
+        func.coalesce(func.sum(Transaction.amount), 0.0),
+        func.count(Transaction.id)
+    ).where(_period_filter(budget, period_start, user_id))
+    if exclude_ids:
+        query = query.where(Transaction.id.notin_(list(exclude_ids)))
+    spent, count = (await db.execute(query)).one()
+    return float(spent), count
+
+
+async def apply_budget_writes(
+    db: AsyncSession,
+    user_id: int,
+    writes: Iterable[BudgetWrite],
+    exclude_ids: Collection[int] = ()
+) -> int:
+    """Move the running totals of every budget period the writes touch.
+
+    Returns the number of new alerts. The caller commits.
+    """
+    writes = [write for write in writes if write.transaction_type == "expense"]
+    if not writes:
+        return 0
+    budgets = {
+        budget.id: budget
+        for budget in await db.execute(select(
+            Budget.id, Budget.amount, Budget.period, Budget.category_id,
+            Budget.start_date, Budget.end_date, Budget.is_active
+        ).where(Budget.user_id == user_id))
+    }
+
+    alerts = 0
+    for (budget_id, period_start), (amount, count) in budget_deltas(budgets.values(), writes).items():
+        budget = budgets[budget_id]
+        after = await db.scalar(
+            update(BudgetPeriodTotal)
+            .where(BudgetPeriodTotal.budget_id == budget_id, BudgetPeriodTotal.period_start == period_start)
+            .values(
+                spent=BudgetPeriodTotal.spent + amount,
+                transaction_count=BudgetPeriodTotal.transaction_count + count,
+                updated_at=func.now()
+            )
+            .returning(BudgetPeriodTotal.spent)
+        )
+        if after is None:
+            # First write to this period: start from the raw transactions
+            seeded, seeded_count = await _seed(db, user_id, budget, period_start, exclude_ids)
+            stmt = insert(BudgetPeriodTotal).values(
+                budget_id=budget_id,
+                period_start=period_start,
+                spent=seeded + amount,
+                transaction_count=seeded_count + count
+            )
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_budget_period_totals_key",
+                set_={
+                    "spent": BudgetPeriodTotal.spent + amount,
+                    "transaction_count": BudgetPeriodTotal.transaction_count + count,
+                    "updated_at": func.now(),
+                }
+            ).returning(BudgetPeriodTotal.spent)
+            after = await db.scalar(stmt)
+
+        if not budget.is_active:
+            continue
+        for threshold in crossed_thresholds(after - amount, after, budget.amount):
+            # Each threshold alerts once per period, even if spending dips and recovers
+            created = await db.scalar(
+                insert(BudgetAlert).values(
+                    user_id=user_id,
+                    budget_id=budget_id,
+                    period_start=period_start,
+                    threshold=threshold,
+                    spent=after,
+                    amount=budget.amount
+                ).on_conflict_do_nothing(constraint="uq_budget_alerts_key").returning(BudgetAlert.id)
+            )
+            alerts += created is not None
+    return alerts
+
+
+async def record_transaction(db: AsyncSession, transaction: Transaction, sign: int = 1) -> int:
+    """Add (``sign=1``) or remove (``sign=-1``) a not yet flushed transaction from its budgets."""
+    return await apply_budget_writes(db, transaction.user_id, [transaction_write(transaction, sign)])
+
+
+async def rebuild_totals(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recompute every stored period total from raw transactions."""
+    query = select(BudgetPeriodTotal, Budget).join(Budget, BudgetPeriodTotal.budget_id == Budget.id)
+    if user_id is not None:
+        query = query.where(Budget.user_id == user_id)
+    rows = (await db.execute(query)).all()
+    for total, budget in rows:
+        total.spent, total.transaction_count = await _seed(db, budget.user_id, budget, total.period_start, ())
+    return len(rows)
+
+
+async def verify_totals(db: AsyncSession, user_id: Optional[int] = None) -> List[str]:
+    """Compare stored period totals with a recomputation and describe mismatches."""
+    query = select(BudgetPeriodTotal, Budget).join(Budget, BudgetPeriodTotal.budget_id == Budget.id)
+    if user_id is not None:
+        query = query.where(Budget.user_id == user_id)
+    problems = []
+    for total, budget in (await db.execute(query)).all():
+        spent, count = await _seed(db, budget.user_id, budget, total.period_start, ())
+        if count != total.transaction_count or abs(spent - total.spent) > 0.005:
+            problems.append(
+                f"budget {budget.id} period {total.period_start:%Y-%m-%d}: "
+                f"expected ({spent}, {count}), stored ({total.spent}, {total.transaction_count})"
+            )
+    return problems
+
+
+async def _run(command: str, user_id: Optional[int]) -> int:
+    from app.db.session import SessionLocal, engine
+
+    try:
+        async with SessionLocal() as db:
+            if command == "rebuild":
+                count = await rebuild_totals(db, user_id)
+                await db.commit()
+                print(f"Rebuilt {count} budget period totals")
+                return 0
+            problems = await verify_totals(db, user_id)
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} mismatched budget period totals")
+            return 1 if problems else 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the budget_period_totals table")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args.command, args.user_id)))
+
+
+if __name__ == "__main__":
+    main()
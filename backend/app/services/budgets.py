@@ -0,0 +1,158 @@
+"""Budget progress for all of a user's active budgets in one query.
+
+``budget_progress`` finds the current period of every active budget in SQL.
+``date_trunc`` with the budget's own unit (week, month or year) gives the
+period start. The period is clipped to the budget's ``start_date`` and
+``end_date``. Matching expenses are then summed with a single grouped
+outer join, so a user with dozens of budgets still costs one round trip.
+
+A budget with a category counts only that category's expenses; one without
+counts every expense. Projections extrapolate the spending so far linearly
+over the whole period.
+"""
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import DateTime, Interval, and_, case, cast, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Budget, Transaction
+
+# Budget period -> date_trunc unit
+PERIOD_UNITS = {"weekly": "week", "monthly": "month", "yearly": "year"}
+
+
+def period_bounds(period: str, when: datetime) -> Tuple[datetime, datetime]:
+    """Start and (exclusive) end of the budget period containing ``when``.
+
+    Matches ``date_trunc`` in SQL: weeks start on Monday, unknown periods are
+    treated as monthly.
+    """
+    unit = PERIOD_UNITS.get(period, "month")
+    if unit == "week":
+        start = datetime.combine(when.date() - timedelta(days=when.weekday()), time.min)
+        return start, start + timedelta(days=7)
+    if unit == "year":
+        return datetime(when.year, 1, 1), datetime(when.year + 1, 1, 1)
+    start = datetime(when.year, when.month, 1)
+    end = datetime(when.year + 1, 1, 1) if when.month == 12 else datetime(when.year, when.month + 1, 1)
+    return start, end
+
+
+@dataclass
+class BudgetProgress:
+    budget_id: int
+    name: str
+    amount: float
+    period: str
+    category_id: Optional[int]
+    period_start: datetime
+    period_end: datetime
+    spent: float
+    transaction_count: int
+
+    @property
+    def remaining(self) -> float:
+        return self.amount - self.spent
+
+    @property
+    def progress(self) -> float:
+        """Share of the limit already spent; above 1.0 once overspent."""
+        return self.spent / self.amount if self.amount > 0 else 0.0
+
+    def elapsed(self, now: datetime) -> float:
+        """Share of the period that has passed at ``now``."""
+        length = (self.period_end - self.period_start).total_seconds()
+        if length <= 0:
+            return 1.0
+        return min(max((now - self.period_start).total_seconds() / length, 0.0), 1.0)
+
+    def projected_spend(self, now: datetime) -> float:
+        elapsed = self.elapsed(now)
+        # Too early in the period to extrapolate meaningfully
+        if elapsed < 0.05:
+            return self.spent
+        return self.spent / elapsed
+
+    def projected_overshoot(self, now: datetime) -> float:
+        return max(self.projected_spend(now) - self.amount, 0.0)
+
+
+def _current_periods(user_id: int, now: datetime, budget_ids: Optional[List[int]] = None):
+    """Active budgets with the bounds of the period containing ``now``."""
+    unit = case(
+        *((Budget.period == period, literal(name)) for period, name in PERIOD_UNITS.items()),
+        else_=literal("month")
+    )
+    period_start = func.date_trunc(unit, now, type_=DateTime)
+    period_end = period_start + cast(literal("1 ") + unit, Interval)
+
+    query = select(
+        Budget.id,
+        Budget.name,
+        Budget.amount,
+        Budget.period,
+        Budget.category_id,
+        func.greatest(period_start, Budget.start_date).label("period_start"),
+        period_end.label("period_end"),
+        Budget.end_date
+    ).where(
+        Budget.user_id == user_id,
+        Budget.is_active.is_(True),
+        Budget.start_date <= now,
+        or_(Budget.end_date.is_(None), Budget.end_date >= now)
+    )
+    if budget_ids is not None:
+        query = query.where(Budget.id.in_(budget_ids))
+    return query.subquery()
+
+
+async def budget_progress(
+    db: AsyncSession,
+    user_id: int,
+    now: Optional[datetime] = None,
+    budget_ids: Optional[List[int]] = None
+) -> List[BudgetProgress]:
+    """Spending against every active budget's current period, in one query."""
+    now = now or datetime.now()
+    periods = _current_periods(user_id, now, budget_ids)
+    rows = await db.execute(
+        select(
+            periods.c.id,
+            periods.c.name,
+            periods.c.amount,
+            periods.c.period,
+            periods.c.category_id,
+            periods.c.period_start,
+            periods.c.period_end,
+            periods.c.end_date,
+            func.coalesce(func.sum(Transaction.amount), 0.0).label("spent"),
+            func.count(Transaction.id).label("transaction_count")
+        ).outerjoin(Transaction, and_(
+            Transaction.user_id == user_id,
+            Transaction.transaction_type == "expense",
+            or_(periods.c.category_id.is_(None), Transaction.category_id == periods.c.category_id),
+            Transaction.date >= periods.c.period_start,
+            Transaction.date < periods.c.period_end,
+            # end_date is inclusive, the period end is not
+            or_(periods.c.end_date.is_(None), Transaction.date <= periods.c.end_date)
+        )).group_by(
+            periods.c.id, periods.c.name, periods.c.amount, periods.c.period,
+            periods.c.category_id, periods.c.period_start, periods.c.period_end, periods.c.end_date
+        ).order_by(periods.c.id)
+    )
+    return [
+        BudgetProgress(
+            budget_id=row.id,
+            name=row.name,
+            amount=row.amount,
+            period=row.period,
+            category_id=row.category_id,
+            period_start=row.period_start,
+            period_end=min(row.period_end, row.end_date) if row.end_date else row.period_end,
+            spent=float(row.spent),
+            transaction_count=row.transaction_count
+        )
+        for row in rows
+    ]
@@ -0,0 +1,377 @@
+"""LLM transaction categorization shared by the AI endpoints.
+
+Single descriptions are categorized by ``/api/ai/categorize``. Larger sets go
+through ``categorize_batch``, which:
+
+- answers what it can from the user's local classifier and the
+  categorization cache;
+- packs the remaining distinct merchants into numbered prompts sized to a
+  token budget;
+- runs those prompts concurrently;
+- validates every returned item on its own, so one malformed answer only
+  falls back for that item.
+
+``write_back`` stores accepted results on the transactions and keeps the
+monthly rollups in step.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.llm import LLMError, llm_client
+from app.core.prompts import count_tokens, prompt_registry
+from app.db.models import Category, Transaction
+from app.services import rollups
+from app.services.budget_alerts import BudgetWrite, apply_budget_writes, transaction_write
+from app.services.categorization_cache import (
+    Categorization, categorization_cache, normalize_description
+)
+from app.services.local_classifier import local_classifier
+
+logger = logging.getLogger(__name__)
+
+# Predefined categories for AI to choose from
+EXPENSE_CATEGORIES = [
+    "Food & Dining", "Transportation", "Shopping", "Entertainment",
+    "Healthcare", "Utilities", "Housing", "Education", "Travel",
+    "Insurance", "Taxes", "Personal Care", "Gifts", "Subscriptions",
+    "Business", "Other"
+]
+
+INCOME_CATEGORIES = [
+    "Salary", "Freelance", "Investment", "Business", "Gift",
+    "Refund", "Other"
+]
+
+# Cached categorizations are keyed on this, so editing a prompt or the category lists refreshes them
+PROMPT_VERSION = hashlib.sha256("\n".join([
+    prompt_registry.get("categorize").version, prompt_registry.get("categorize_batch").version,
+    *EXPENSE_CATEGORIES, *INCOME_CATEGORIES
+]).encode()).hexdigest()[:16]
+
+# Rough output size of one batch answer, in tokens
+BATCH_TOKENS_PER_ITEM = 40
+
+# Descriptions are cut to this many characters inside batch prompts
+BATCH_DESCRIPTION_CHARS = 200
+
+
+def strip_code_fence(content: str) -> str:
+    content = content.strip()
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+    return content.strip()
+
+
+def validate_categorization(result) -> dict:
+    """Check an LLM answer and coerce it onto the known categories."""
+    if not isinstance(result, dict):
+        raise ValueError("Invalid response format")
+
+    # Ensure required fields are present
+    if "suggested_category" not in result:
+        raise ValueError("Missing suggested_category")
+    if "confidence" not in result:
+        raise ValueError("Missing confidence")
+    if "transaction_type" not in result:
+        raise ValueError("Missing transaction_type")
+
+    # Validate category
+    if result["transaction_type"] == "expense":
+        if result["suggested_category"] not in EXPENSE_CATEGORIES:
+            result["suggested_category"] = "Other"
+    elif result["transaction_type"] == "income":
+        if result["suggested_category"] not in INCOME_CATEGORIES:
+            result["suggested_category"] = "Other"
+    else:
+        result["transaction_type"] = "expense"
+        result["suggested_category"] = "Other"
+
+    # Validate confidence
+    if not isinstance(result["confidence"], (int, float)) or result["confidence"] < 0 or result["confidence"] > 1:
+        result["confidence"] = 0.5
+
+    return result
+
+
+@dataclass
+class BatchItem:
+    description: str
+    amount: Optional[float] = None
+    transaction_type: Optional[str] = None  # Known type, if any
+    transaction_id: Optional[int] = None
+
+
+@dataclass
+class BatchResult:
+    suggested_category: str
+    transaction_type: str
+    confidence: float
+    source: str  # "model", "cache", "llm" or "fallback"
+
+
+@dataclass
+class _PromptEntry:
+    """One distinct merchant sent to the LLM, shared by identical items."""
+    description: str
+    amount: Optional[float]
+    transaction_type: Optional[str]
+    normalized: str
+    result: Optional[BatchResult] = None
+
+
+def _fallback(transaction_type: Optional[str], confidence: float) -> BatchResult:
+    return BatchResult(
+        suggested_category="Other",
+        transaction_type=transaction_type or "expense",
+        confidence=confidence,
+        source="fallback"
+    )
+
+
+def _prompt_line(number: int, entry: _PromptEntry) -> str:
+    amount = f"{entry.amount:.2f}" if entry.amount is not None else "?"
+    description = " ".join(entry.description.split())[:BATCH_DESCRIPTION_CHARS].replace("|", "/")
+    return f"{number} | {entry.transaction_type or 'unknown'} | {amount} | {description}"
+
+
+def _chunk_entries(entries: List[_PromptEntry]) -> List[List[_PromptEntry]]:
+    """Split entries into chunks whose prompts fit the configured token budget."""
+    base_tokens = prompt_registry.get("categorize_batch").fixed_tokens + count_tokens(
+        ", ".join(EXPENSE_CATEGORIES + INCOME_CATEGORIES)
+    )
+    budget = max(settings.AI_BATCH_PROMPT_TOKENS - base_tokens, 1)
+    chunks: List[List[_PromptEntry]] = []
+    current: List[_PromptEntry] = []
+    used = 0
+    for entry in entries:
+        cost = count_tokens(_prompt_line(len(current) + 1, entry)) + 1
+        if current and (used + cost > budget or len(current) >= settings.AI_BATCH_MAX_ITEMS_PER_CHUNK):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(entry)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_chunk_answer(content: str) -> Dict[int, dict]:
+    answer = json.loads(strip_code_fence(content))
+    if isinstance(answer, dict):
+        answer = answer.get("results", answer.get("transactions"))
+    if not isinstance(answer, list):
+        raise ValueError("Expected a JSON array")
+    parsed = {}
+    for item in answer:
+        try:
+            parsed[int(item["id"])] = item
+        except (KeyError, TypeError, ValueError):
+            continue
+    return parsed
+
+
+async def _categorize_chunk(chunk: List[_PromptEntry], slots: asyncio.Semaphore) -> None:
+    """Fill in ``result`` for every entry of one chunk, never raising."""
+    messages = prompt_registry.get("categorize_batch").render(
+        items="\n".join(_prompt_line(number, entry) for number, entry in enumerate(chunk, start=1)),
+        expense_categories=", ".join(EXPENSE_CATEGORIES),
+        income_categories=", ".join(INCOME_CATEGORIES)
+    )
+    try:
+        async with slots:
+            started = time.perf_counter()
+            content = await llm_client.complete(
+                messages=messages,
+                max_tokens=BATCH_TOKENS_PER_ITEM * len(chunk) + 50,
+                temperature=0.1
+            )
+            categorization_cache.stats.observe_llm_call(time.perf_counter() - started)
+        answers = _parse_chunk_answer(content)
+    except (LLMError, ValueError) as exc:
+        # json.JSONDecodeError is a ValueError
+        logger.warning("Batch categorization chunk of %d items failed: %s", len(chunk), exc)
+        for entry in chunk:
+            entry.result = _fallback(entry.transaction_type, 0.1)
+        return
+
+    for number, entry in enumerate(chunk, start=1):
+        try:
+            answer = validate_categorization(dict(answers[number]))
+            if entry.transaction_type and answer["transaction_type"] != entry.transaction_type:
+                raise ValueError("Transaction type mismatch")
+            entry.result = BatchResult(
+                suggested_category=answer["suggested_category"],
+                transaction_type=answer["transaction_type"],
+                confidence=float(answer["confidence"]),
+                source="llm"
+            )
+        except (KeyError, TypeError, ValueError):
+            entry.result = _fallback(entry.transaction_type, 0.3)
+
+
+async def categorize_batch(
+    db: AsyncSession,
+    items: List[BatchItem],
+    user_id: Optional[int] = None
+) -> List[BatchResult]:
+    """Categorize ``items``, returning one result per item in the same order.
+
+    With ``user_id``, the user's local classifier answers first. New LLM
+    answers are added to the categorization cache; the caller commits.
+    """
+    results: List[Optional[BatchResult]] = [None] * len(items)
+    entries: Dict[Tuple[str, Optional[str]], _PromptEntry] = {}
+    pending: List[Tuple[int, _PromptEntry]] = []
+
+    for index, item in enumerate(items):
+        if user_id is not None and settings.LOCAL_CLASSIFIER_ENABLED:
+            local = await local_classifier.predict(db, user_id, item.description, item.transaction_type)
+            if local is not None and local.confidence >= settings.LOCAL_CLASSIFIER_CONFIDENCE:
+                categorization_cache.stats.increment("model_hits")
+                results[index] = BatchResult(
+                    suggested_category=local.category_name,
+                    transaction_type=local.transaction_type,
+                    confidence=local.confidence,
+                    source="model"
+                )
+                continue
+        normalized = normalize_description(item.description)
+        if normalized:
+            cached = await categorization_cache.get(db, normalized, PROMPT_VERSION, settings.OPENAI_MODEL)
+            if cached is not None and item.transaction_type in (None, cached.transaction_type):
+                results[index] = BatchResult(
+                    suggested_category=cached.suggested_category,
+                    transaction_type=cached.transaction_type,
+                    confidence=cached.confidence,
+                    source="cache"
+                )
+                continue
+        # Identical merchants are asked about once; unnormalizable ones individually
+        key = (normalized or f"#{index}", item.transaction_type)
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = _PromptEntry(
+                description=item.description,
+                amount=item.amount,
+                transaction_type=item.transaction_type,
+                normalized=normalized
+            )
+        pending.append((index, entry))
+
+    slots = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+    await asyncio.gather(*[
+        _categorize_chunk(chunk, slots) for chunk in _chunk_entries(list(entries.values()))
+    ])
+
+    for entry in entries.values():
+        if entry.normalized and entry.result.source == "llm":
+            await categorization_cache.set(
+                db,
+                entry.normalized,
+                PROMPT_VERSION,
+                settings.OPENAI_MODEL,
+                Categorization(
+                    suggested_category=entry.result.suggested_category,
+                    transaction_type=entry.result.transaction_type,
+                    confidence=entry.result.confidence
+                )
+            )
+    for index, entry in pending:
+        results[index] = entry.result
+    return results
+
+
+async def _category_ids(db: AsyncSession, user_id: int, names: List[str]) -> Dict[str, int]:
+    """The user's category ids by lower-cased name, creating missing categories."""
+    rows = await db.execute(
+        select(func.lower(Category.name), Category.id).where(Category.user_id == user_id)
+    )
+    ids: Dict[str, int] = {}
+    for name, category_id in rows:
+        ids.setdefault(name, category_id)
+    missing = {name for name in names if name.lower() not in ids}
+    if missing:
+        created = [Category(name=name, user_id=user_id) for name in sorted(missing)]
+        db.add_all(created)
+        await db.flush()
+        ids.update({category.name.lower(): category.id for category in created})
+    return ids
+
+
+async def write_back(
+    db: AsyncSession,
+    user_id: int,
+    assignments: Dict[int, BatchResult],
+    overwrite: bool = False,
+    skip_locked: bool = False
+) -> int:
+    """Set ``category_id`` and ``ai_categorized`` from batch results.
+
+    Results whose type disagrees with the stored transaction are ignored, and
+    categories the user chose by hand are kept unless ``overwrite`` is set.
+    Rows stay locked until the caller commits, so concurrent edits and
+    deletes cannot change them between this read and the rollup deltas. With
+    ``skip_locked``, rows locked by another writer are skipped instead of
+    waited for. Returns the number of transactions updated; the caller commits.
+    """
+    if not assignments:
+        return 0
+    # Ordered so concurrent batches lock rows in the same order
+    query = select(Transaction).where(
+        Transaction.user_id == user_id,
+        Transaction.id.in_(list(assignments))
+    ).order_by(Transaction.id).with_for_update(skip_locked=skip_locked).execution_options(
+        populate_existing=True
+    )
+    transactions = (await db.execute(query)).scalars().all()
+    accepted = [
+        (transaction, assignments[transaction.id])
+        for transaction in transactions
+        if assignments[transaction.id].transaction_type == transaction.transaction_type
+        and (overwrite or transaction.category_id is None or transaction.ai_categorized)
+    ]
+    if not accepted:
+        return 0
+
+    category_ids = await _category_ids(db, user_id, [result.suggested_category for _, result in accepted])
+    deltas: Dict[Tuple[date, Optional[int], str], List[float]] = defaultdict(lambda: [0.0, 0])
+    budget_writes: List[BudgetWrite] = []
+    for transaction, result in accepted:
+        category_id = category_ids[result.suggested_category.lower()]
+        if transaction.category_id != category_id:
+            budget_writes.append(transaction_write(transaction, sign=-1))
+            month = rollups.month_start(transaction.date)
+            old = deltas[(month, transaction.category_id, transaction.transaction_type)]
+            old[0] -= transaction.amount
+            old[1] -= 1
+            new = deltas[(month, category_id, transaction.transaction_type)]
+            new[0] += transaction.amount
+            new[1] += 1
+            transaction.category_id = category_id
+            budget_writes.append(transaction_write(transaction))
+        transaction.ai_categorized = True
+
+    for (month, category_id, transaction_type), (amount, count) in deltas.items():
+        # Swapping categories nets the counts out but not the amounts
+        if count or abs(amount) > 1e-9:
+            await rollups.apply_rollup_delta(
+                db, user_id, month, category_id, transaction_type, amount, count
+            )
+    # The category changes are not flushed yet, so period seeds see the old values
+    await apply_budget_writes(db, user_id, budget_writes)
+    return len(accepted)
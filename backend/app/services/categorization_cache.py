@@ -0,0 +1,249 @@
+"""Multi-tier cache of LLM transaction categorizations.
+
+Descriptions are normalized before lookup, so "STARBUCKS #1234 04/12" and
+"Starbucks #0087" share one entry. Lookups go through a per-process LRU, then
+Redis, then the ``categorization_cache`` table; a hit in a slower tier warms
+the faster ones. Keys include the prompt version and model, so changing
+either one misses every old entry and results are refreshed on demand.
+Expired rows can be removed with::
+
+    python -m app.services.categorization_cache purge
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LocalTTLCache, response_cache
+from app.core.config import settings
+from app.db.models import CategorizationCacheEntry
+
+_CARD_SUFFIX = re.compile(
+    r"\b(?:card|acct|account)(?:\s+ending)?(?:\s+in)?\s*[#:]?\s*[x*]*\d{2,4}\b"
+    r"|[x*]{2,}\d{2,4}\b"
+)
+_DATE = re.compile(r"\b\d{1,4}[/.\-]\d{1,2}(?:[/.\-]\d{2,4})?\b")
+_STORE_NUMBER = re.compile(r"(?:#|\bno\.|\bstore)\s*\d+")
+_TOKEN_WITH_DIGITS = re.compile(r"\b\w*\d\w*\b")
+_NON_WORD = re.compile(r"[^a-z&]+")
+
+# Normalized descriptions are truncated so keys stay bounded
+MAX_NORMALIZED_LENGTH = 100
+
+
+def normalize_description(description: str) -> str:
+    """Reduce a bank description to the part that identifies the merchant.
+
+    Card suffixes, dates, store numbers and any other tokens containing digits
+    are dropped, punctuation is collapsed and the result is lower-cased.
+    """
+    text = description.lower().replace("'", "")
+    text = _CARD_SUFFIX.sub(" ", text)
+    text = _DATE.sub(" ", text)
+    text = _STORE_NUMBER.sub(" ", text)
+    text = _TOKEN_WITH_DIGITS.sub(" ", text)
+    text = _NON_WORD.sub(" ", text)
+    return " ".join(text.split())[:MAX_NORMALIZED_LENGTH]
+
+
+@dataclass(frozen=True)
+class Categorization:
+    suggested_category: str
+    transaction_type: str
+    confidence: float
+
+
+class CategorizationStats:
+    """Per-process hit and miss counters for the categorization cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.model_hits = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def observe_llm_call(self, seconds: float) -> None:
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.model_hits + self.local_hits + self.redis_hits + self.db_hits
+            lookups = hits + self.misses
+            avg_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "hits": {
+                    "model": self.model_hits,
+                    "local": self.local_hits,
+                    "redis": self.redis_hits,
+                    "db": self.db_hits,
+                    "total": hits,
+                },
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "llm_calls": self.llm_calls,
+                "avg_llm_seconds": round(avg_llm_seconds, 4),
+                # Every hit is one LLM round-trip that was not made
+                "llm_calls_saved": hits,
+                "estimated_seconds_saved": round(hits * avg_llm_seconds, 2),
+            }
+
+
+class CategorizationCache:
+    def __init__(
+        self,
+        local_size: int,
+        local_ttl: int,
+        redis_ttl: int,
+        db_ttl_days: int,
+        min_confidence: float
+    ):
+        self.redis_ttl = redis_ttl
+        self.db_ttl = timedelta(days=db_ttl_days)
+        self.min_confidence = min_confidence
+        self.stats = CategorizationStats()
+        self._local = LocalTTLCache(local_size, local_ttl)
+
+    @staticmethod
+    def cache_key(normalized: str, prompt_version: str, model: str) -> str:
+        return hashlib.sha256(f"{prompt_version}|{model}|{normalized}".encode()).hexdigest()
+
+    async def get(
+        self,
+        db: AsyncSession,
+        normalized: str,
+        prompt_version: str,
+        model: str
+    ) -> Optional[Categorization]:
+        key = self.cache_key(normalized, prompt_version, model)
+
+        result = self._local.get(key)
+        if result is not None:
+            self.stats.increment("local_hits")
+            return result
+
+        cached = await response_cache.get(f"cat:{key}")
+        if cached is not None:
+            result = Categorization(**json.loads(cached))
+            self._local.set(key, result)
+            self.stats.increment("redis_hits")
+            return result
+
+        now = datetime.now(timezone.utc)
+        entry = (await db.execute(
+            select(CategorizationCacheEntry).where(
+                CategorizationCacheEntry.cache_key == key,
+                CategorizationCacheEntry.expires_at > now
+            )
+        )).scalar_one_or_none()
+        if entry is None:
+            self.stats.increment("misses")
+            return None
+
+        result = Categorization(
+            suggested_category=entry.suggested_category,
+            transaction_type=entry.transaction_type,
+            confidence=entry.confidence
+        )
+        self._local.set(key, result)
+        # Never keep a Redis copy past the row's own expiry
+        remaining = int((entry.expires_at - now).total_seconds())
+        await response_cache.set(
+            f"cat:{key}", json.dumps(asdict(result)), ttl=max(1, min(self.redis_ttl, remaining))
+        )
+        self.stats.increment("db_hits")
+        return result
+
+    async def set(
+        self,
+        db: AsyncSession,
+        normalized: str,
+        prompt_version: str,
+        model: str,
+        result: Categorization
+    ) -> None:
+        """Store a result in every tier; the caller commits the DB write.
+
+        Low-confidence answers are not cached, so they are asked again.
+        """
+        if result.confidence < self.min_confidence:
+            return
+        key = self.cache_key(normalized, prompt_version, model)
+        self._local.set(key, result)
+        await response_cache.set(f"cat:{key}", json.dumps(asdict(result)), ttl=self.redis_ttl)
+
+        values = {
+            "suggested_category": result.suggested_category,
+            "transaction_type": result.transaction_type,
+            "confidence": result.confidence,
+            "expires_at": datetime.now(timezone.utc) + self.db_ttl,
+        }
+        stmt = insert(CategorizationCacheEntry).values(
+            cache_key=key,
+            normalized_description=normalized,
+            prompt_version=prompt_version,
+            model=model,
+            **values
+        )
+        await db.execute(stmt.on_conflict_do_update(index_elements=["cache_key"], set_=values))
+
+
+async def purge_expired(db: AsyncSession) -> int:
+    """Delete expired rows; rows of a retired prompt or model age out here too."""
+    result = await db.execute(
+        delete(CategorizationCacheEntry).where(
+            CategorizationCacheEntry.expires_at <= datetime.now(timezone.utc)
+        )
+    )
+    return result.rowcount
+
+
+categorization_cache = CategorizationCache(
+    local_size=settings.CATEGORIZATION_CACHE_LOCAL_SIZE,
+    local_ttl=settings.CATEGORIZATION_CACHE_LOCAL_TTL_SECONDS,
+    redis_ttl=settings.CATEGORIZATION_CACHE_TTL_SECONDS,
+    db_ttl_days=settings.CATEGORIZATION_CACHE_DB_TTL_DAYS,
+    min_confidence=settings.CATEGORIZATION_CACHE_MIN_CONFIDENCE
+)
+
+
+async def _run(command: str) -> int:
+    from app.db.session import SessionLocal, engine
+
+    try:
+        async with SessionLocal() as db:
+            count = await purge_expired(db)
+            await db.commit()
+            print(f"Purged {count} expired categorization cache rows")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the categorization_cache table")
+    parser.add_argument("command", choices=["purge"])
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Constant-memory transaction export.
+
+Rows are read through a server-side cursor in fixed-size partitions and each
+partition is encoded and handed to the response before the next one is
+fetched, so memory use does not depend on the size of the history.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator
+
+from sqlalchemy.sql import Select
+
+from app.db.session import SessionLocal
+
+# Rows fetched from the server-side cursor per round-trip
+EXPORT_BATCH_SIZE = 1000
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _encode_csv(rows, header=None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+def _encode_ndjson(rows, keys) -> str:
+    return "".join(
+        json.dumps(dict(zip(keys, row)), default=_json_default) + "\n"
+        for row in rows
+    )
+
+
+async def stream_rows(query: Select, export_format: str) -> AsyncIterator[str]:
+    """Yield the rows of ``query`` encoded as CSV or NDJSON chunks.
+
+    The generator opens its own session because it keeps running after the
+    request handler has returned.
+    """
+    async with SessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        keys = list(result.keys())
+        if export_format == "csv":
+            yield _encode_csv([], header=keys)
+        async for partition in result.partitions():
+            if export_format == "csv":
+                yield _encode_csv(partition)
+            else:
+                yield _encode_ndjson(partition, keys)
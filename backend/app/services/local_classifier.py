@@ -0,0 +1,226 @@
+"""Per-user naive Bayes categorizer that answers before the LLM does.
+
+Each user's model is a multinomial naive Bayes over hashed character n-grams
+of normalized descriptions, trained on transactions the user categorized by
+hand. A prediction is a handful of NumPy operations. Models live in a
+per-process LRU:
+
+- New rows are folded in incrementally from an id watermark, at most every
+  ``LOCAL_CLASSIFIER_REFRESH_SECONDS``.
+- A full retrain every ``LOCAL_CLASSIFIER_REBUILD_SECONDS`` picks up
+  edited and deleted rows.
+
+A prediction's confidence is its posterior scaled by the share of the
+description's features the predicted category has seen. Merchants the user
+has never labeled therefore fall through to the LLM.
+"""
+import asyncio
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db.models import Category, Transaction
+from app.services.categorization_cache import normalize_description
+
+NGRAM_SIZES = (3, 4, 5)
+
+# Additive smoothing of feature counts
+ALPHA = 0.1
+
+# (description, category_id, category_name, transaction_type)
+LabeledRow = Tuple[str, int, str, str]
+
+
+def featurize(description: str, dim: int) -> np.ndarray:
+    """Hashed word and character n-gram indices of a description."""
+    text = normalize_description(description) or " ".join(description.lower().split())
+    padded = f" {text} "
+    grams = [f"w:{word}" for word in text.split()]
+    grams.extend(
+        padded[start:start + size]
+        for size in NGRAM_SIZES
+        for start in range(len(padded) - size + 1)
+    )
+    # crc32 is stable across processes, unlike hash()
+    return np.fromiter((zlib.crc32(gram.encode()) % dim for gram in grams), dtype=np.int64, count=len(grams))
+
+
+@dataclass(frozen=True)
+class LocalPrediction:
+    category_id: int
+    category_name: str
+    transaction_type: str
+    confidence: float
+
+
+class NaiveBayesModel:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.category_ids: List[int] = []
+        self.category_names: List[str] = []
+        self.transaction_types: List[str] = []
+        self.feature_counts = np.zeros((0, dim), dtype=np.float32)
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        self.watermark = 0
+        self.trained_at = time.monotonic()
+        self.refreshed_at = 0.0
+        self._class_index: Dict[int, int] = {}
+        # (log prior, feature log probabilities), rebuilt lazily after training
+        self._params: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def examples(self) -> int:
+        return int(self.class_counts.sum())
+
+    def _class_for(self, category_id: int, name: str, transaction_type: str) -> int:
+        index = self._class_index.get(category_id)
+        if index is None:
+            index = self._class_index[category_id] = len(self.category_ids)
+            self.category_ids.append(category_id)
+            self.category_names.append(name)
+            self.transaction_types.append(transaction_type)
+            self.feature_counts = np.vstack([self.feature_counts, np.zeros((1, self.dim), dtype=np.float32)])
+            self.class_counts = np.append(self.class_counts, 0.0)
+        else:
+            # Keep the latest name and type of a renamed category
+            self.category_names[index] = name
+            self.transaction_types[index] = transaction_type
+        return index
+
+    def partial_fit(self, rows: Iterable[LabeledRow]) -> None:
+        for description, category_id, name, transaction_type in rows:
+            index = self._class_for(category_id, name, transaction_type)
+            features = featurize(description, self.dim)
+            np.add.at(self.feature_counts[index], features, 1.0)
+            self.class_counts[index] += 1
+        self._params = None
+
+    def _compile(self) -> Tuple[np.ndarray, np.ndarray]:
+        smoothed = self.feature_counts.astype(np.float64) + ALPHA
+        feature_log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        log_prior = np.log(self.class_counts) - np.log(self.class_counts.sum())
+        # One assignment, so a concurrent prediction never sees a half-built pair
+        self._params = (log_prior, feature_log_prob)
+        return self._params
+
+    def predict(self, description: str, transaction_type: Optional[str] = None) -> Optional[LocalPrediction]:
+        if len(self.category_ids) < 2:
+            return None
+        log_prior, feature_log_prob = self._params or self._compile()
+        features = featurize(description, self.dim)
+        if not len(features):
+            return None
+        scores = log_prior + feature_log_prob[:, features].sum(axis=1)
+        if transaction_type is not None:
+            allowed = np.array([kind == transaction_type for kind in self.transaction_types[:len(scores)]])
+            if not allowed.any():
+                return None
+            scores = np.where(allowed, scores, -np.inf)
+        posterior = np.exp(scores - scores.max())
+        posterior /= posterior.sum()
+        best = int(posterior.argmax())
+        # Share of the description the chosen class has seen before
+        coverage = float((self.feature_counts[best, features] > 0).mean())
+        return LocalPrediction(
+            category_id=self.category_ids[best],
+            category_name=self.category_names[best],
+            transaction_type=self.transaction_types[best],
+            confidence=float(posterior[best]) * coverage
+        )
+
+
+def _labeled_rows_query(user_id: int, after_id: int):
+    # Only labels a person chose; training on model or LLM output would reinforce mistakes
+    return (
+        select(Transaction.id, Transaction.description, Category.id, Category.name, Transaction.transaction_type)
+        .join(Category, Transaction.category_id == Category.id)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.id > after_id,
+            or_(Transaction.ai_categorized.is_(False), Transaction.ai_categorized.is_(None))
+        )
+        .order_by(Transaction.id)
+    )
+
+
+class LocalClassifier:
+    """Per-process registry of per-user models."""
+
+    def __init__(
+        self,
+        dim: int,
+        max_models: int,
+        min_examples: int,
+        refresh_seconds: float,
+        rebuild_seconds: float
+    ):
+        self.dim = dim
+        self.max_models = max_models
+        self.min_examples = min_examples
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._models: "OrderedDict[int, NaiveBayesModel]" = OrderedDict()
+        self._locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    async def _train(self, db: AsyncSession, user_id: int, model: NaiveBayesModel) -> None:
+        rows = (await db.execute(_labeled_rows_query(user_id, model.watermark))).all()
+        if rows:
+            model.watermark = rows[-1][0]
+            await run_in_threadpool(model.partial_fit, [row[1:] for row in rows])
+        model.refreshed_at = time.monotonic()
+
+    async def get_model(self, db: AsyncSession, user_id: int) -> NaiveBayesModel:
+        """The user's model, trained up to the latest labeled rows."""
+        model = self._models.get(user_id)
+        now = time.monotonic()
+        if model is not None and now - model.refreshed_at < self.refresh_seconds:
+            self._models.move_to_end(user_id)
+            return model
+
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        async with lock:
+            model = self._models.get(user_id)
+            if model is None or now - model.trained_at >= self.rebuild_seconds:
+                model = NaiveBayesModel(self.dim)
+            if now - model.refreshed_at >= self.refresh_seconds:
+                await self._train(db, user_id, model)
+            self._models[user_id] = model
+            self._models.move_to_end(user_id)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return model
+
+    async def predict(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        description: str,
+        transaction_type: Optional[str] = None
+    ) -> Optional[LocalPrediction]:
+        model = await self.get_model(db, user_id)
+        if model.examples < self.min_examples:
+            return None
+        return model.predict(description, transaction_type)
+
+    def forget(self, user_id: int) -> None:
+        self._models.pop(user_id, None)
+
+
+local_classifier = LocalClassifier(
+    dim=2 ** settings.LOCAL_CLASSIFIER_HASH_BITS,
+    max_models=settings.LOCAL_CLASSIFIER_MAX_MODELS,
+    min_examples=settings.LOCAL_CLASSIFIER_MIN_EXAMPLES,
+    refresh_seconds=settings.LOCAL_CLASSIFIER_REFRESH_SECONDS,
+    rebuild_seconds=settings.LOCAL_CLASSIFIER_REBUILD_SECONDS
+)
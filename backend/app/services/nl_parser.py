@@ -0,0 +1,303 @@
+"""Natural-language transaction entry ("$12.50 coffee yesterday").
+
+``parse_transaction_text`` is a deterministic fast path built from compiled
+regular expressions and a small tokenizer. It extracts:
+
+- the amount and currency;
+- an absolute or relative date ("yesterday", "last Friday", "3 days ago");
+- income or expense keywords;
+- a cleaned-up description.
+
+It also scores how sure it is. ``parse_natural_language`` only asks the LLM
+when that score is below ``NL_PARSER_CONFIDENCE``, so typical input never
+leaves the process.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.llm import LLMError, llm_client
+from app.core.prompts import prompt_registry
+from app.services.categorization import strip_code_fence
+
+logger = logging.getLogger(__name__)
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR"}
+CURRENCY_WORDS = {
+    "usd": "USD", "dollar": "USD", "dollars": "USD", "buck": "USD", "bucks": "USD",
+    "eur": "EUR", "euro": "EUR", "euros": "EUR",
+    "gbp": "GBP", "pound": "GBP", "pounds": "GBP", "quid": "GBP",
+    "inr": "INR", "rs": "INR", "rupee": "INR", "rupees": "INR",
+    "jpy": "JPY", "yen": "JPY",
+    "cad": "CAD", "aud": "AUD",
+}
+
+_NUMBER = r"(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?"
+_CURRENCY_WORD = "|".join(sorted(CURRENCY_WORDS, key=len, reverse=True))
+_SYMBOL = "[" + "".join(re.escape(symbol) for symbol in CURRENCY_SYMBOLS) + "]"
+
+# Amounts with an explicit currency marker, in order of preference
+_MARKED_AMOUNT = re.compile(
+    rf"(?P<symbol>{_SYMBOL})\s?(?P<n1>{_NUMBER})(?P<k1>k\b)?"
+    rf"|\b(?P<code>{_CURRENCY_WORD})\s?(?P<n2>{_NUMBER})(?P<k2>k\b)?"
+    rf"|(?<![\w.,])(?P<n3>{_NUMBER})(?P<k3>k)?\s?(?P<word>{_CURRENCY_WORD})\b",
+    re.IGNORECASE
+)
+_BARE_AMOUNT = re.compile(rf"(?<![\w.,/:-])(?P<n>{_NUMBER})(?P<k>k)?(?![\w/:-]|\.\d|,\d)", re.IGNORECASE)
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_MONTHS = {
+    name: number
+    for number, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december"),
+    ], start=1)
+    for name in names
+}
+_MONTH_NAME = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_WEEKDAY_NAME = "|".join(_WEEKDAYS)
+# A slash number before one of these is a quantity ("3/4 lb"), not a date
+_UNIT = (
+    r"lbs?|pounds?|oz|ounces?|kgs?|g|grams?|mg|l|ml|liters?|litres?|gal|gallons?|pints?|pt|quarts?|qt"
+    r"|cups?|tsp|tbsp|teaspoons?|tablespoons?|dozen|inch(?:es)?|ft|feet|yards?|yd|km|cm|mm|miles?"
+)
+
+_DATE_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("iso", re.compile(r"\b(?P<y>\d{4})-(?P<m>\d{1,2})-(?P<d>\d{1,2})\b")),
+    ("slash", re.compile(
+        rf"\b(?P<m>\d{{1,2}})/(?P<d>\d{{1,2}})(?:/(?P<y>\d{{2}}|\d{{4}}))?\b(?!\s?(?:{_UNIT})\b)", re.IGNORECASE
+    )),
+    ("day_before_yesterday", re.compile(r"\b(?:the\s+)?day\s+before\s+yesterday\b", re.IGNORECASE)),
+    ("yesterday", re.compile(r"\byesterday\b|\byday\b", re.IGNORECASE)),
+    ("today", re.compile(r"\btoday\b|\btonight\b|\bthis\s+(?:morning|afternoon|evening)\b", re.IGNORECASE)),
+    ("days_ago", re.compile(r"\b(?P<n>\d{1,2}|a|one|two|three|four|five|six|seven)\s+days?\s+ago\b", re.IGNORECASE)),
+    ("last_week", re.compile(r"\b(?:a\s+week\s+ago|last\s+week)\b", re.IGNORECASE)),
+    ("weekday", re.compile(rf"\b(?:(?P<which>last|this|on|past)\s+)?(?P<day>{_WEEKDAY_NAME})\b", re.IGNORECASE)),
+    ("month_day", re.compile(rf"\b(?:on\s+)?(?P<mon>{_MONTH_NAME})\.?\s+(?P<d>\d{{1,2}})(?:st|nd|rd|th)?\b", re.IGNORECASE)),
+    ("day_month", re.compile(rf"\b(?:on\s+)?(?P<d>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<mon>{_MONTH_NAME})\b", re.IGNORECASE)),
+]
+_SMALL_NUMBERS = {"a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+_INCOME_PATTERNS = re.compile(
+    r"\b(?:got\s+paid|paid\s+me|payday|salary|paycheck|pay\s*check|wages?|bonus|income|earned|earnings"
+    r"|received|receive|refund(?:ed)?|reimburse(?:d|ment)?|cashback|cash\s+back|dividends?|interest"
+    r"|freelance|invoice\s+paid|sold|deposit(?:ed)?|gift\s+from|won|royalt(?:y|ies)|rent\s+from|allowance"
+    r"|(?:venmo|zelle|paypal|transfer)\s+from)\b",
+    re.IGNORECASE
+)
+_EXPENSE_PATTERNS = re.compile(
+    r"\b(?:spent|spend|paid|pay|bought|buy|purchased?|bill|fee|subscription|rent|ordered|order"
+    r"|lunch|dinner|breakfast|coffee|groceries|grocery|gas|fuel|taxi|uber|lyft|ticket|tickets"
+    r"|donated|tip|renewal|charged?)\b",
+    re.IGNORECASE
+)
+
+# Words that make an entry an expense even next to an income keyword
+_SPENT = re.compile(r"\b(?:spent|bought|paid\s+(?:for|the|my))\b", re.IGNORECASE)
+
+# Words that carry no description once amount, date and type are known
+_FILLER = re.compile(
+    r"\b(?:i|i've|ive|we|just|spent|spend|paid|pay|bought|buy|purchased?|got|received|receive|earned"
+    r"|for|on|at|in|from|to|of|the|a|an|my|some|was|were|me|total|today|about|around|approx|approximately"
+    r"|ago|worth|with\s+card|by\s+card|using|via|and)\b",
+    re.IGNORECASE
+)
+_PUNCTUATION = re.compile(r"[^\w&'/\-\s]+")
+
+
+@dataclass
+class ParsedTransaction:
+    amount: Optional[float]
+    currency: Optional[str]
+    description: str
+    transaction_type: str  # "income" or "expense"
+    date: Optional[date]
+    confidence: float
+    source: str = "rules"  # "rules" or "llm"
+
+
+def _to_amount(number: str, thousands: Optional[str]) -> float:
+    value = float(number.replace(",", ""))
+    return round(value * 1000 if thousands else value, 2)
+
+
+def _extract_amount(text: str) -> Tuple[Optional[float], Optional[str], float, List[Tuple[int, int]]]:
+    """Amount, currency, confidence contribution and spans to blank out."""
+    marked = list(_MARKED_AMOUNT.finditer(text))
+    if marked:
+        match = marked[0]
+        if match.group("symbol"):
+            number, thousands, currency = match.group("n1"), match.group("k1"), CURRENCY_SYMBOLS[match.group("symbol")]
+        elif match.group("code"):
+            number, thousands, currency = match.group("n2"), match.group("k2"), CURRENCY_WORDS[match.group("code").lower()]
+        else:
+            number, thousands, currency = match.group("n3"), match.group("k3"), CURRENCY_WORDS[match.group("word").lower()]
+        # "$23.99 and $5 shipping" may be a sum or a split; leave it to the LLM
+        return _to_amount(number, thousands), currency, 0.5 if len(marked) == 1 else 0.2, [match.span()]
+
+    candidates = list(_BARE_AMOUNT.finditer(text))
+    if len(candidates) == 1:
+        match = candidates[0]
+        return _to_amount(match.group("n"), match.group("k")), None, 0.4, [match.span()]
+    if candidates:
+        # Several numbers ("2 coffees 9"): the largest is usually the price
+        match = max(candidates, key=lambda m: _to_amount(m.group("n"), m.group("k")))
+        return _to_amount(match.group("n"), match.group("k")), None, 0.15, [match.span()]
+    return None, None, 0.0, []
+
+
+def _most_recent(today: date, weekday: int, include_today: bool) -> date:
+    delta = (today.weekday() - weekday) % 7
+    if delta == 0 and not include_today:
+        delta = 7
+    return today - timedelta(days=delta)
+
+
+def _past_date(today: date, month: int, day: int) -> date:
+    """A month and day without a year: entries are about the past, so a later date means last year."""
+    parsed = date(today.year, month, day)
+    return parsed.replace(year=today.year - 1) if parsed > today else parsed
+
+
+def _resolve_date(kind: str, match: re.Match, today: date) -> Optional[date]:
+    if kind == "iso":
+        return date(int(match.group("y")), int(match.group("m")), int(match.group("d")))
+    if kind == "slash":
+        year = match.group("y")
+        if year is not None:
+            return date(int(year) + (2000 if len(year) == 2 else 0), int(match.group("m")), int(match.group("d")))
+        return _past_date(today, int(match.group("m")), int(match.group("d")))
+    if kind == "day_before_yesterday":
+        return today - timedelta(days=2)
+    if kind == "yesterday":
+        return today - timedelta(days=1)
+    if kind == "today":
+        return today
+    if kind == "days_ago":
+        count = match.group("n").lower()
+        return today - timedelta(days=int(count) if count.isdigit() else _SMALL_NUMBERS[count])
+    if kind == "last_week":
+        return today - timedelta(days=7)
+    if kind == "weekday":
+        weekday = _WEEKDAYS.index(match.group("day").lower())
+        # "last Wednesday" said on a Wednesday means a week ago
+        which = (match.group("which") or "").lower()
+        return _most_recent(today, weekday, include_today=which not in ("last", "past"))
+    if kind in ("month_day", "day_month"):
+        return _past_date(today, _MONTHS[match.group("mon").lower()], int(match.group("d")))
+    return None
+
+
+def _extract_date(text: str, today: date) -> Tuple[Optional[date], List[Tuple[int, int]], bool]:
+    """Date, spans to blank out, and whether a date-like phrase failed to resolve."""
+    for kind, pattern in _DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            try:
+                return _resolve_date(kind, match, today), [match.span()], False
+            except ValueError:
+                return None, [match.span()], True
+    return None, [], False
+
+
+def _blank(text: str, spans: List[Tuple[int, int]]) -> str:
+    for start, end in sorted(spans, reverse=True):
+        text = text[:start] + " " + text[end:]
+    return text
+
+
+def parse_transaction_text(text: str, today: Optional[date] = None) -> ParsedTransaction:
+    """Parse a free-text entry without calling the LLM."""
+    today = today or date.today()
+    text = " ".join(text.split())
+
+    # Dates first, so "3/14" is never mistaken for an amount
+    when, date_spans, bad_date = _extract_date(text, today)
+    remaining = _blank(text, date_spans)
+    amount, currency, amount_score, amount_spans = _extract_amount(remaining)
+    remaining = _blank(remaining, amount_spans)
+
+    income = _INCOME_PATTERNS.search(remaining)
+    expense = _EXPENSE_PATTERNS.search(remaining)
+    spent = _SPENT.search(remaining)
+    if income and spent:
+        # "refund for the shoes I bought": conflicting signals, let the LLM decide
+        transaction_type, type_score = "expense", -0.1
+    elif income:
+        transaction_type, type_score = "income", 0.15
+    elif expense:
+        transaction_type, type_score = "expense", 0.15
+    else:
+        # Most free-text entries are purchases
+        transaction_type, type_score = "expense", 0.05
+
+    description = _PUNCTUATION.sub(" ", remaining)
+    description = _FILLER.sub(" ", description)
+    description = " ".join(description.split()).strip(" -'")
+    description = description[:1].upper() + description[1:]
+
+    confidence = amount_score + type_score
+    if description:
+        confidence += 0.3
+    if bad_date:
+        confidence -= 0.2
+    if amount is not None and amount <= 0:
+        amount, currency, confidence = None, None, 0.0
+    return ParsedTransaction(
+        amount=amount,
+        currency=currency,
+        description=description,
+        transaction_type=transaction_type,
+        date=when,
+        confidence=round(max(0.0, min(confidence, 0.99)), 2)
+    )
+
+
+def _from_llm_answer(answer: dict) -> ParsedTransaction:
+    if not isinstance(answer, dict):
+        raise ValueError("Invalid response format")
+    amount = answer.get("amount")
+    when = answer.get("date")
+    transaction_type = answer.get("type")
+    confidence = answer.get("confidence")
+    return ParsedTransaction(
+        amount=round(float(amount), 2) if amount is not None else None,
+        currency=(answer.get("currency") or None),
+        description=str(answer.get("description") or "").strip(),
+        transaction_type=transaction_type if transaction_type in ("income", "expense") else "expense",
+        date=datetime.strptime(when, "%Y-%m-%d").date() if when else None,
+        confidence=float(confidence) if isinstance(confidence, (int, float)) and 0 <= confidence <= 1 else 0.5,
+        source="llm"
+    )
+
+
+async def parse_with_llm(text: str, today: date) -> ParsedTransaction:
+    content = await llm_client.complete(
+        messages=prompt_registry.get("nl_parse").render(text=text.replace('"', "'"), today=today.isoformat()),
+        max_tokens=200,
+        temperature=0.1
+    )
+    return _from_llm_answer(json.loads(strip_code_fence(content)))
+
+
+async def parse_natural_language(text: str, today: Optional[date] = None) -> ParsedTransaction:
+    """Parse with the fast path, asking the LLM only when it is unsure."""
+    today = today or date.today()
+    parsed = parse_transaction_text(text, today)
+    if parsed.confidence >= settings.NL_PARSER_CONFIDENCE or not llm_client.configured:
+        return parsed
+    try:
+        from_llm = await parse_with_llm(text, today)
+    except (LLMError, ValueError, TypeError) as exc:
+        logger.warning("LLM transaction parsing failed: %s", exc)
+        return parsed
+    # The rules resolve relative dates exactly; keep theirs when the LLM has none
+    if from_llm.date is None:
+        from_llm.date = parsed.date
+    return from_llm if from_llm.confidence >= parsed.confidence else parsed
+
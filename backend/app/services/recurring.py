@@ -0,0 +1,278 @@
+"""Detection of recurring transactions such as subscriptions and salaries.
+
+A user's transactions are grouped by normalized description (see
+``normalize_description``) and type. Each group's charge history is kept in
+``recurring_patterns``, so a scan only reads transactions added since the id
+watermark in ``recurring_scan_state`` and folds them into the groups they
+touch.
+
+``detect_patterns`` analyzes any number of histories at once. They are
+flattened into NumPy arrays, and one pass of sorts, diffs and bincounts
+yields per-history results:
+
+- the median amount, and which charges are within the amount tolerance of it;
+- the median number of days between consecutive charges within tolerance;
+- the cadence (weekly, monthly or yearly) whose interval range contains that
+  median, and the share of intervals inside the range.
+
+The confidence is that share times the share of charges within tolerance.
+Edited and deleted transactions are not picked up by the watermark;
+``rebuild`` rescans a user's whole history::
+
+    python -m app.services.recurring rebuild --user-id 42
+"""
+import argparse
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import RecurringPattern, RecurringScanState, Transaction
+from app.services.categorization_cache import normalize_description
+
+# Amounts within this much of the typical amount always count, however small it is
+MIN_AMOUNT_TOLERANCE = 1.0
+
+
+@dataclass(frozen=True)
+class Cadence:
+    name: str
+    low: int  # Accepted days between charges, inclusive
+    high: int
+    min_occurrences: int
+    grace_days: int  # How late the next charge may be before the pattern counts as ended
+    per_month: float  # Charges per month, for monthly cost
+
+
+CADENCES = (
+    Cadence("weekly", 6, 8, 4, 3, 52 / 12),
+    Cadence("monthly", 26, 35, 3, 10, 1.0),
+    Cadence("yearly", 350, 380, 2, 30, 1 / 12),
+)
+CADENCES_BY_NAME = {cadence.name: cadence for cadence in CADENCES}
+
+
+@dataclass
+class Detection:
+    cadence: Optional[str]
+    confidence: float
+    occurrences: int  # Charges within the amount tolerance
+    amount: Optional[float]
+    interval_days: Optional[float]
+    first_date: Optional[date]
+    last_date: Optional[date]
+    next_date: Optional[date]
+
+
+def _group_medians(groups: np.ndarray, values: np.ndarray, count: int) -> np.ndarray:
+    """Median of ``values`` per group id in ``range(count)``; NaN for empty groups."""
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    medians = np.full(count, np.nan)
+    present = sizes > 0
+    low = starts[present] + (sizes[present] - 1) // 2
+    high = starts[present] + sizes[present] // 2
+    medians[present] = (ordered[low] + ordered[high]) / 2
+    return medians
+
+
+def detect_patterns(histories: Sequence[Tuple[Sequence[date], Sequence[float]]]) -> List[Detection]:
+    """Periodic pattern, if any, of each (dates, amounts) history."""
+    count = len(histories)
+    lengths = np.fromiter((len(dates) for dates, _ in histories), dtype=np.int64, count=count)
+    total = int(lengths.sum())
+    groups = np.repeat(np.arange(count), lengths)
+    days = np.fromiter((day.toordinal() for dates, _ in histories for day in dates), dtype=np.int64, count=total)
+    amounts = np.fromiter((amount for _, values in histories for amount in values), dtype=np.float64, count=total)
+    order = np.lexsort((days, groups))
+    groups, days, amounts = groups[order], days[order], amounts[order]
+
+    # Keep charges close to the typical amount; one-off purchases at the same merchant drop out
+    typical = _group_medians(groups, amounts, count)
+    tolerance = np.maximum(np.abs(typical) * settings.RECURRING_AMOUNT_TOLERANCE, MIN_AMOUNT_TOLERANCE)
+    within = np.abs(amounts - typical[groups]) <= tolerance[groups]
+    groups, days, amounts = groups[within], days[within], amounts[within]
+    occurrences = np.bincount(groups, minlength=count)
+    last_index = np.cumsum(occurrences) - 1
+    first_index = last_index - occurrences + 1
+
+    # Days between consecutive charges of the same history
+    same_group = groups[1:] == groups[:-1]
+    interval_groups = groups[1:][same_group]
+    intervals = np.diff(days)[same_group].astype(np.float64)
+    median_interval = _group_medians(interval_groups, intervals, count)
+    interval_counts = np.maximum(occurrences - 1, 1)
+
+    cadence_index = np.full(count, -1)
+    regularity = np.zeros(count)
+    for position, cadence in enumerate(CADENCES):
+        matches = (
+            (median_interval >= cadence.low)
+            & (median_interval <= cadence.high)
+            & (occurrences >= cadence.min_occurrences)
+        )
+        regular = (intervals >= cadence.low) & (intervals <= cadence.high)
+        in_range = np.bincount(interval_groups, weights=regular, minlength=count)
+        cadence_index[matches] = position
+        regularity[matches] = in_range[matches] / interval_counts[matches]
+    confidence = regularity * occurrences / np.maximum(lengths, 1)
+    detected = (cadence_index >= 0) & (confidence >= settings.RECURRING_MIN_CONFIDENCE)
+
+    detections = []
+    for index in range(count):
+        if not occurrences[index]:
+            detections.append(Detection(None, 0.0, 0, None, None, None, None, None))
+            continue
+        last_day = int(days[last_index[index]])
+        interval = None if np.isnan(median_interval[index]) else float(median_interval[index])
+        found = bool(detected[index])
+        detections.append(Detection(
+            cadence=CADENCES[cadence_index[index]].name if found else None,
+            confidence=round(float(confidence[index]), 4),
+            occurrences=int(occurrences[index]),
+            amount=float(amounts[last_index[index]]),
+            interval_days=interval,
+            first_date=date.fromordinal(int(days[first_index[index]])),
+            last_date=date.fromordinal(last_day),
+            next_date=date.fromordinal(last_day + round(interval)) if found else None
+        ))
+    return detections
+
+
+def is_active(pattern: RecurringPattern, today: date) -> bool:
+    """Whether the next charge of a detected pattern is not overdue by more than its grace."""
+    cadence = CADENCES_BY_NAME.get(pattern.cadence)
+    if cadence is None or pattern.next_date is None:
+        return False
+    return pattern.next_date + timedelta(days=cadence.grace_days) >= today
+
+
+def monthly_amount(pattern: RecurringPattern) -> float:
+    cadence = CADENCES_BY_NAME.get(pattern.cadence)
+    return (pattern.amount or 0.0) * cadence.per_month if cadence else 0.0
+
+
+def _apply(pattern: RecurringPattern, detection: Detection) -> None:
+    pattern.cadence = detection.cadence
+    pattern.confidence = detection.confidence
+    pattern.occurrences = detection.occurrences
+    pattern.amount = detection.amount
+    pattern.interval_days = detection.interval_days
+    pattern.first_date = detection.first_date
+    pattern.last_date = detection.last_date
+    pattern.next_date = detection.next_date
+
+
+async def scan_user(db: AsyncSession, user_id: int) -> int:
+    """Fold transactions added since the last scan into the user's patterns.
+
+    Returns the number of merchant histories re-analyzed. The caller commits.
+    """
+    await db.execute(
+        insert(RecurringScanState).values(user_id=user_id, watermark=0).on_conflict_do_nothing(
+            index_elements=[RecurringScanState.user_id]
+        )
+    )
+    # Concurrent scans of one user wait here instead of folding the same rows twice
+    state = await db.scalar(
+        select(RecurringScanState).where(RecurringScanState.user_id == user_id).with_for_update()
+    )
+    rows = (await db.execute(select(
+        Transaction.id,
+        Transaction.date,
+        Transaction.amount,
+        Transaction.transaction_type,
+        Transaction.description,
+        Transaction.category_id
+    ).where(
+        Transaction.user_id == user_id,
+        Transaction.id > state.watermark
+    ).order_by(Transaction.id))).all()
+    state.scanned_at = func.now()
+    if not rows:
+        return 0
+    state.watermark = rows[-1].id
+
+    added: Dict[Tuple[str, str], list] = defaultdict(list)
+    for row in rows:
+        merchant = normalize_description(row.description)
+        if merchant:
+            added[(merchant, row.transaction_type)].append(row)
+    if not added:
+        return 0
+
+    existing = {
+        (pattern.merchant, pattern.transaction_type): pattern
+        for pattern in await db.scalars(select(RecurringPattern).where(
+            RecurringPattern.user_id == user_id,
+            RecurringPattern.merchant.in_({merchant for merchant, _ in added})
+        ))
+    }
+    patterns = []
+    for (merchant, transaction_type), new_rows in added.items():
+        pattern = existing.get((merchant, transaction_type))
+        if pattern is None:
+            pattern = RecurringPattern(
+                user_id=user_id, merchant=merchant, transaction_type=transaction_type, dates=[], amounts=[]
+            )
+            db.add(pattern)
+        history = sorted(zip(
+            list(pattern.dates) + [row.date.date() for row in new_rows],
+            list(pattern.amounts) + [row.amount for row in new_rows]
+        ))[-settings.RECURRING_HISTORY_LIMIT:]
+        pattern.dates = [day for day, _ in history]
+        pattern.amounts = [amount for _, amount in history]
+        latest = max(new_rows, key=lambda row: (row.date, row.id))
+        pattern.description = latest.description
+        pattern.category_id = latest.category_id
+        patterns.append(pattern)
+
+    for pattern, detection in zip(patterns, detect_patterns([(p.dates, p.amounts) for p in patterns])):
+        _apply(pattern, detection)
+    return len(patterns)
+
+
+async def rebuild(db: AsyncSession, user_id: int) -> int:
+    """Forget a user's patterns and rescan their whole history."""
+    await db.execute(delete(RecurringPattern).where(RecurringPattern.user_id == user_id))
+    await db.execute(delete(RecurringScanState).where(RecurringScanState.user_id == user_id))
+    return await scan_user(db, user_id)
+
+
+async def _run(user_id: Optional[int]) -> int:
+    from app.db.session import SessionLocal, engine
+
+    try:
+        async with SessionLocal() as db:
+            if user_id is not None:
+                user_ids = [user_id]
+            else:
+                user_ids = (await db.scalars(select(Transaction.user_id).distinct())).all()
+            for current in user_ids:
+                count = await rebuild(db, current)
+                await db.commit()
+                print(f"User {current}: analyzed {count} merchant histories")
+            return 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the recurring_patterns table")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args.user_id)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Incrementally maintained monthly rollups of transaction totals.
+
+Every transaction write applies a signed delta to the matching
+``monthly_rollups`` row inside the caller's DB transaction. ``rebuild_rollups``
+recomputes the table from raw transactions and can be run from the command
+line to verify the incremental path::
+
+    python -m app.services.rollups verify
+    python -m app.services.rollups rebuild --user-id 42
+"""
+import argparse
+import asyncio
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import MonthlyRollup, Transaction
+
+RollupKey = Tuple[int, date, Optional[int], str]
+
+
+def month_start(value: datetime) -> date:
+    """First day of the month containing ``value``."""
+    return date(value.year, value.month, 1)
+
+
+async def apply_rollup_delta(
+    db: AsyncSession,
+    user_id: int,
+    month: date,
+    category_id: Optional[int],
+    transaction_type: str,
+    amount: float,
+    count: int
+) -> None:
+    """Add ``amount`` and ``count`` to one rollup row, creating it if needed."""
+    stmt = insert(MonthlyRollup).values(
+        user_id=user_id,
+        month=month,
+        category_id=category_id,
+        transaction_type=transaction_type,
+        total_amount=amount,
+        transaction_count=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_monthly_rollups_key",
+        set_={
+            "total_amount": MonthlyRollup.total_amount + stmt.excluded.total_amount,
+            "transaction_count": MonthlyRollup.transaction_count + stmt.excluded.transaction_count,
+            "updated_at": func.now(),
+        }
+    )
+    await db.execute(stmt)
+
+
+async def record_transaction(db: AsyncSession, transaction: Transaction, sign: int = 1) -> None:
+    """Add (``sign=1``) or remove (``sign=-1``) a transaction from its rollup."""
+    await apply_rollup_delta(
+        db,
+        user_id=transaction.user_id,
+        month=month_start(transaction.date),
+        category_id=transaction.category_id,
+        transaction_type=transaction.transaction_type,
+        amount=sign * transaction.amount,
+        count=sign
+    )
+
+
+def _rollup_source(user_id: Optional[int] = None):
+    """Rollup rows aggregated from scratch over the raw transactions table."""
+    month = cast(func.date_trunc("month", Transaction.date), Date)
+    stmt = select(
+        Transaction.user_id,
+        month.label("month"),
+        Transaction.category_id,
+        Transaction.transaction_type,
+        func.sum(Transaction.amount).label("total_amount"),
+        func.count(Transaction.id).label("transaction_count")
+    ).group_by(
+        Transaction.user_id, month, Transaction.category_id, Transaction.transaction_type
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    return stmt
+
+
+async def rebuild_rollups(db: AsyncSession, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from raw transactions, for one user or everyone."""
+    delete_stmt = delete(MonthlyRollup)
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(MonthlyRollup.user_id == user_id)
+    await db.execute(delete_stmt)
+
+    source = _rollup_source(user_id)
+    result = await db.execute(
+        insert(MonthlyRollup).from_select(
+            ["user_id", "month", "category_id", "transaction_type",
+             "total_amount", "transaction_count"],
+            source
+        )
+    )
+    return result.rowcount
+
+
+async def verify_rollups(db: AsyncSession, user_id: Optional[int] = None) -> List[str]:
+    """Compare stored rollups with a full recomputation and describe mismatches."""
+    expected: Dict[RollupKey, Tuple[float, int]] = {
+        (row.user_id, row.month, row.category_id, row.transaction_type):
+            (float(row.total_amount), row.transaction_count)
+        for row in await db.execute(_rollup_source(user_id))
+    }
+    stored_query = select(MonthlyRollup).where(MonthlyRollup.transaction_count != 0)
+    if user_id is not None:
+        stored_query = stored_query.where(MonthlyRollup.user_id == user_id)
+    stored: Dict[RollupKey, Tuple[float, int]] = {
+        (row.user_id, row.month, row.category_id, row.transaction_type):
+            (row.total_amount, row.transaction_count)
+        for row in await db.scalars(stored_query)
+    }
+
+    problems = []
+    for key in sorted(set(expected) | set(stored), key=str):
+        want = expected.get(key, (0.0, 0))
+        have = stored.get(key, (0.0, 0))
+        if want[1] != have[1] or abs(want[0] - have[0]) > 0.005:
+            problems.append(f"{key}: expected {want}, stored {have}")
+    return problems
+
+
+async def _run(command: str, user_id: Optional[int]) -> int:
+    from app.db.session import SessionLocal, engine
+
+    try:
+        async with SessionLocal() as db:
+            if command == "rebuild":
+                count = await rebuild_rollups(db, user_id)
+                await db.commit()
+                print(f"Rebuilt {count} rollup rows")
+                return 0
+            problems = await verify_rollups(db, user_id)
+            for problem in problems:
+                print(problem)
+            print(f"{len(problems)} mismatched rollup rows")
+            return 1 if problems else 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain the monthly_rollups table")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args.command, args.user_id)))
+
+
+if __name__ == "__main__":
+    main()
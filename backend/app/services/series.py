@@ -0,0 +1,238 @@
+"""Income and expense totals over time, for charts.
+
+Bucketing happens in SQL. ``date_trunc`` groups a user's transactions by day
+or week; monthly buckets are read straight from the maintained monthly
+rollups and never touch raw rows. Everything after the query is array work
+in NumPy:
+
+- the sparse (series, bucket) totals are scattered into a dense
+  series x bucket matrix, so empty buckets come out as zeros;
+- running totals are a cumulative sum along the bucket axis;
+- trailing moving averages are differences of that cumulative sum.
+
+Weeks start on Monday, like ``date_trunc``. Month buckets always cover whole
+months, and the first week of a range may begin before its start date.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import DateTime, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import Category, MonthlyRollup, Transaction
+from app.services import rollups
+
+INTERVALS = ("day", "week", "month")
+TRANSACTION_TYPES = ("income", "expense")
+
+# NumPy unit and bucket width (in that unit) per interval
+_UNITS = {"day": ("datetime64[D]", 1), "week": ("datetime64[D]", 7), "month": ("datetime64[M]", 1)}
+_MONDAY = np.datetime64("1970-01-05", "D")
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# (transaction type, category id); the category is None when not split
+SeriesKey = Tuple[str, Optional[int]]
+# (bucket start, transaction type, category id, category name, total)
+BucketRow = Tuple[date, str, Optional[int], Optional[str], float]
+
+
+@dataclass
+class SeriesLine:
+    transaction_type: str
+    category_id: Optional[int]
+    category_name: Optional[str]
+    totals: np.ndarray
+    cumulative: np.ndarray
+    moving_average: np.ndarray
+
+
+@dataclass
+class Series:
+    interval: str
+    window: int
+    buckets: np.ndarray  # Bucket start dates, datetime64
+    lines: List[SeriesLine]
+
+
+def bucket_start(interval: str, value: date) -> np.datetime64:
+    """Start of the bucket containing ``value``, as ``date_trunc`` computes it."""
+    day = np.datetime64(value.date() if isinstance(value, datetime) else value, "D")
+    if interval == "month":
+        return day.astype("datetime64[M]")
+    if interval == "week":
+        return day - (day - _MONDAY) % np.timedelta64(7, "D")
+    return day
+
+
+def bucket_count(interval: str, first: np.datetime64, last: np.datetime64) -> int:
+    """Buckets from ``first`` to ``last``; raises ``ValueError`` above ``SERIES_MAX_BUCKETS``."""
+    count = int((last - first).astype(np.int64)) // _UNITS[interval][1] + 1
+    if count > settings.SERIES_MAX_BUCKETS:
+        raise ValueError(f"Range covers {count} {interval} buckets, the limit is {settings.SERIES_MAX_BUCKETS}")
+    return count
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over ``window`` buckets along the last axis.
+
+    The first ``window - 1`` buckets average over the buckets available.
+    """
+    cumulative = np.cumsum(values, axis=-1)
+    sums = cumulative.copy()
+    sums[..., window:] -= cumulative[..., :-window]
+    return sums / np.minimum(np.arange(1, values.shape[-1] + 1), window)
+
+
+def build_series(
+    rows: Sequence[BucketRow],
+    interval: str,
+    first: Optional[np.datetime64],
+    last: np.datetime64,
+    window: int,
+    keys: Iterable[SeriesKey] = ()
+) -> Series:
+    """Gap-filled, accumulated and smoothed series from sparse bucket totals.
+
+    ``first`` defaults to the earliest bucket in ``rows``. ``keys`` are series
+    to include even when they have no rows.
+    """
+    unit, step = _UNITS[interval]
+    index: Dict[SeriesKey, int] = {key: position for position, key in enumerate(keys)}
+    series_positions = np.fromiter(
+        (index.setdefault((row[1], row[2]), len(index)) for row in rows), dtype=np.int64, count=len(rows)
+    )
+    names: Dict[SeriesKey, Optional[str]] = {(row[1], row[2]): row[3] for row in rows}
+    # Day ordinals convert far faster than date objects
+    ordinals = np.fromiter((row[0].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    starts = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]").astype(unit)
+    amounts = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+
+    if first is None:
+        first = starts.min() if len(rows) else last
+    count = bucket_count(interval, first, last)
+    buckets = first + np.arange(count) * step
+
+    bucket_positions = (starts - first).astype(np.int64) // step
+    in_range = (bucket_positions >= 0) & (bucket_positions < count)
+    # Scatter into a dense series x bucket matrix; missing buckets stay zero
+    values = np.bincount(
+        series_positions[in_range] * count + bucket_positions[in_range],
+        weights=amounts[in_range],
+        minlength=len(index) * count
+    ).reshape(len(index), count)
+
+    cumulative = np.cumsum(values, axis=1)
+    averages = moving_average(values, window)
+    # Income before expenses, then the largest series first
+    ordered = sorted(index.items(), key=lambda item: (item[0][0] != "income", -cumulative[item[1], -1]))
+    return Series(
+        interval=interval,
+        window=window,
+        buckets=buckets,
+        lines=[
+            SeriesLine(
+                transaction_type=transaction_type,
+                category_id=category_id,
+                category_name=names.get((transaction_type, category_id)),
+                totals=values[position],
+                cumulative=cumulative[position],
+                moving_average=averages[position]
+            )
+            for (transaction_type, category_id), position in ordered
+        ]
+    )
+
+
+def _transaction_buckets(
+    user_id: int,
+    interval: str,
+    start: Optional[datetime],
+    end: datetime,
+    by_category: bool,
+    transaction_type: Optional[str]
+):
+    bucket = func.date_trunc(interval, Transaction.date, type_=DateTime).label("bucket")
+    columns = (Transaction.category_id, Category.name) if by_category else ()
+    query = select(
+        bucket,
+        Transaction.transaction_type,
+        *columns,
+        func.sum(Transaction.amount)
+    ).where(Transaction.user_id == user_id, Transaction.date <= end)
+    if by_category:
+        query = query.outerjoin(Category, Transaction.category_id == Category.id)
+    if start is not None:
+        query = query.where(Transaction.date >= start)
+    if transaction_type:
+        query = query.where(Transaction.transaction_type == transaction_type)
+    return query.group_by(bucket, Transaction.transaction_type, *columns)
+
+
+def _rollup_buckets(
+    user_id: int,
+    start: Optional[datetime],
+    end: datetime,
+    by_category: bool,
+    transaction_type: Optional[str]
+):
+    columns = (MonthlyRollup.category_id, Category.name) if by_category else ()
+    query = select(
+        MonthlyRollup.month,
+        MonthlyRollup.transaction_type,
+        *columns,
+        func.sum(MonthlyRollup.total_amount)
+    ).where(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.month <= rollups.month_start(end),
+        MonthlyRollup.transaction_count > 0
+    )
+    if by_category:
+        query = query.outerjoin(Category, MonthlyRollup.category_id == Category.id)
+    if start is not None:
+        query = query.where(MonthlyRollup.month >= rollups.month_start(start))
+    if transaction_type:
+        query = query.where(MonthlyRollup.transaction_type == transaction_type)
+    return query.group_by(MonthlyRollup.month, MonthlyRollup.transaction_type, *columns)
+
+
+async def spending_series(
+    db: AsyncSession,
+    user_id: int,
+    interval: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    by_category: bool = False,
+    transaction_type: Optional[str] = None,
+    window: int = 3
+) -> Series:
+    """Totals per bucket from ``start`` (default: the user's first bucket) to ``end``.
+
+    Raises ``ValueError`` when ``start`` is after ``end`` or the range has more
+    than ``SERIES_MAX_BUCKETS`` buckets.
+    """
+    end = end or datetime.now()
+    if start is not None and start > end:
+        raise ValueError("Start date must not be after end date")
+    last = bucket_start(interval, end)
+    first = bucket_start(interval, start) if start is not None else None
+    if first is not None:
+        # Refuse oversized ranges before querying
+        bucket_count(interval, first, last)
+
+    if interval == "month":
+        query = _rollup_buckets(user_id, start, end, by_category, transaction_type)
+    else:
+        query = _transaction_buckets(user_id, interval, start, end, by_category, transaction_type)
+    rows = [
+        (row[0], row[1], row[2], row[3], row[4]) if by_category else (row[0], row[1], None, None, row[2])
+        for row in await db.execute(query)
+    ]
+
+    # Without a category split, both types always get a line
+    keys = [] if by_category else [
+        (kind, None) for kind in TRANSACTION_TYPES if transaction_type in (None, kind)
+    ]
+    return build_series(rows, interval, first, last, window, keys)
@@ -0,0 +1,388 @@
+"""Streaming import of bank statements (CSV and OFX).
+
+Uploads are read incrementally and processed in fixed-size batches: each
+batch is parsed and validated off the event loop, deduplicated by a content
+hash and written with one multi-row ``INSERT ... ON CONFLICT DO NOTHING``.
+Transactions entered by hand have no content hash, so rows are also skipped
+when they match one on the day, amount, type and merchant (see
+``normalize_description``).
+Monthly rollups and budget period totals for the inserted rows are applied
+in the same commit.
+"""
+import codecs
+import csv
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.datetimes import to_naive_utc
+from app.db.models import Category, Transaction
+from app.services import budget_alerts, rollups
+from app.services.budget_alerts import BudgetWrite
+from app.services.categorization_cache import normalize_description
+
+SUPPORTED_FORMATS = ("csv", "ofx")
+
+# asyncpg allows 32767 bind parameters per statement; 1000 rows stays well below
+DEFAULT_BATCH_SIZE = 1000
+
+# Only the first errors are returned to the client
+MAX_REPORTED_ERRORS = 100
+
+_CSV_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%m/%d/%Y", "%d.%m.%Y", "%Y%m%d")
+_AMOUNT_JUNK = re.compile(r"[^\d.\-+]")
+_OFX_BLOCK = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+_OFX_FIELD = re.compile(r"<([A-Za-z0-9.]+)>([^<\r\n]*)")
+_OFX_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class StatementRow:
+    date: datetime
+    amount: float
+    description: str
+    transaction_type: str
+    category_name: Optional[str] = None
+    notes: Optional[str] = None
+    external_id: Optional[str] = None
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    def add_error(self, row_number: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+
+# A parsed row, or the validation error for that row
+ParsedItem = Tuple[int, Union[StatementRow, ValueError]]
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    if filename and "." in filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension in SUPPORTED_FORMATS:
+            return extension
+        if extension == "qfx":
+            return "ofx"
+    return None
+
+
+def _parse_amount(value: str) -> float:
+    text = value.strip()
+    negative = text.startswith("(") and text.endswith(")")
+    cleaned = _AMOUNT_JUNK.sub("", text)
+    if not cleaned:
+        raise ValueError(f"Invalid amount: {value!r}")
+    amount = float(cleaned)
+    return -abs(amount) if negative else amount
+
+
+def _parse_csv_date(value: str) -> datetime:
+    text = value.strip()
+    try:
+        # Dates with a UTC offset are stored as naive UTC, like request datetimes
+        return to_naive_utc(datetime.fromisoformat(text))
+    except ValueError:
+        pass
+    for fmt in _CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value!r}")
+
+
+def _parse_ofx_date(value: str) -> datetime:
+    digits = re.match(r"\d{8,14}", value.strip())
+    if not digits:
+        raise ValueError(f"Invalid date: {value!r}")
+    text = digits.group(0)
+    return datetime.strptime(text[:14].ljust(14, "0"), "%Y%m%d%H%M%S")
+
+
+def _signed_row(
+    when: datetime,
+    amount: float,
+    description: str,
+    transaction_type: Optional[str] = None,
+    **extra
+) -> StatementRow:
+    description = description.strip()
+    if not description:
+        raise ValueError("Missing description")
+    if transaction_type:
+        transaction_type = transaction_type.strip().lower()
+        if transaction_type not in ("income", "expense"):
+            raise ValueError(f"Invalid transaction type: {transaction_type!r}")
+    else:
+        # Statements without a type column use the sign of the amount
+        transaction_type = "expense" if amount < 0 else "income"
+    if amount == 0:
+        raise ValueError("Amount must not be zero")
+    return StatementRow(
+        date=when,
+        amount=round(abs(amount), 2),
+        description=description[:500],
+        transaction_type=transaction_type,
+        **extra
+    )
+
+
+def iter_csv(stream: BinaryIO) -> Iterator[ParsedItem]:
+    """Parse a CSV statement with date, description and amount columns.
+
+    Optional columns are ``type`` (income/expense), ``category`` and ``notes``.
+    """
+    text = codecs.getreader("utf-8-sig")(stream, errors="replace")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    missing = {"date", "description", "amount"} - set(columns)
+    if missing:
+        yield 1, ValueError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+        return
+
+    def cell(values: List[str], name: str) -> Optional[str]:
+        index = columns.get(name)
+        if index is None or index >= len(values):
+            return None
+        return values[index].strip() or None
+
+    for row_number, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        try:
+            yield row_number, _signed_row(
+                _parse_csv_date(cell(values, "date") or ""),
+                _parse_amount(cell(values, "amount") or ""),
+                cell(values, "description") or "",
+                cell(values, "type"),
+                category_name=cell(values, "category"),
+                notes=cell(values, "notes")
+            )
+        except ValueError as exc:
+            yield row_number, exc
+
+
+def iter_ofx(stream: BinaryIO) -> Iterator[ParsedItem]:
+    """Parse ``<STMTTRN>`` blocks from an OFX/QFX file, SGML or XML flavoured."""
+    decoder = codecs.getincrementaldecoder("latin-1")()
+    buffer = ""
+    index = 0
+    while True:
+        chunk = stream.read(_OFX_CHUNK_SIZE)
+        buffer += decoder.decode(chunk or b"", final=not chunk)
+        position = 0
+        for match in _OFX_BLOCK.finditer(buffer):
+            index += 1
+            position = match.end()
+            fields = {name.upper(): value.strip() for name, value in _OFX_FIELD.findall(match.group(1))}
+            try:
+                description = fields.get("NAME") or fields.get("MEMO") or fields.get("PAYEE") or ""
+                memo = fields.get("MEMO")
+                yield index, _signed_row(
+                    _parse_ofx_date(fields.get("DTPOSTED", "")),
+                    _parse_amount(fields.get("TRNAMT", "")),
+                    description,
+                    notes=memo if memo and memo != description else None,
+                    external_id=fields.get("FITID")
+                )
+            except ValueError as exc:
+                yield index, exc
+        buffer = buffer[position:]
+        if not chunk:
+            return
+
+
+def content_key(user_id: int, row: StatementRow) -> str:
+    if row.external_id:
+        return f"{user_id}|fitid|{row.external_id}"
+    description = " ".join(row.description.lower().split())
+    return f"{user_id}|{row.date.isoformat()}|{row.amount:.2f}|{row.transaction_type}|{description}"
+
+
+def content_hash(key: str, occurrence: int) -> str:
+    """Stable fingerprint used to skip transactions that were already imported.
+
+    ``occurrence`` numbers identical rows within one file, so two genuine
+    same-day purchases stay distinct while re-importing the file is a no-op.
+    """
+    return hashlib.sha256(f"{key}|{occurrence}".encode()).hexdigest()
+
+
+async def _category_ids(db: AsyncSession, user_id: int) -> Dict[str, int]:
+    rows = await db.execute(
+        select(func.lower(Category.name), Category.id).where(Category.user_id == user_id)
+    )
+    return {name: category_id for name, category_id in rows}
+
+
+# Day, amount, type and merchant of a transaction entered by hand
+ManualKey = Tuple[date, float, str, str]
+
+
+def manual_key(when: datetime, amount: float, transaction_type: str, description: str) -> Optional[ManualKey]:
+    merchant = normalize_description(description)
+    if not merchant:
+        return None
+    return when.date(), round(amount, 2), transaction_type, merchant
+
+
+class ManualMatcher:
+    """Matches statement rows with transactions the user entered by hand.
+
+    Each hand-entered transaction absorbs at most one statement row, across
+    all batches of an import.
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._remaining: Dict[ManualKey, int] = defaultdict(int)
+        self._loaded_ids: Set[int] = set()
+
+    async def load(self, db: AsyncSession, rows: List[StatementRow]) -> None:
+        """Fetch the hand-entered transactions on the days the rows cover."""
+        first = min(row.date for row in rows).replace(hour=0, minute=0, second=0, microsecond=0)
+        last = max(row.date for row in rows).replace(hour=0, minute=0, second=0, microsecond=0)
+        manual = await db.execute(select(
+            Transaction.id, Transaction.date, Transaction.amount, Transaction.transaction_type, Transaction.description
+        ).where(
+            Transaction.user_id == self.user_id,
+            Transaction.import_hash.is_(None),
+            Transaction.date >= first,
+            Transaction.date < last + timedelta(days=1)
+        ))
+        for transaction_id, when, amount, transaction_type, description in manual:
+            if transaction_id in self._loaded_ids:
+                continue
+            self._loaded_ids.add(transaction_id)
+            key = manual_key(when, amount, transaction_type, description)
+            if key is not None:
+                self._remaining[key] += 1
+
+    def take(self, row: StatementRow) -> bool:
+        """Whether ``row`` duplicates a hand-entered transaction not matched yet."""
+        key = manual_key(row.date, row.amount, row.transaction_type, row.description)
+        if key is None or not self._remaining.get(key):
+            return False
+        self._remaining[key] -= 1
+        return True
+
+
+async def _insert_batch(db: AsyncSession, values: List[dict]) -> List[tuple]:
+    stmt = insert(Transaction).values(values).on_conflict_do_nothing(
+        index_elements=[Transaction.user_id, Transaction.import_hash],
+        index_where=Transaction.import_hash.isnot(None)
+    ).returning(
+        Transaction.date, Transaction.category_id, Transaction.transaction_type, Transaction.amount, Transaction.id
+    )
+    return (await db.execute(stmt)).all()
+
+
+async def _apply_rollups(db: AsyncSession, user_id: int, inserted: List[tuple]) -> None:
+    deltas: Dict[Tuple[date, Optional[int], str], List[float]] = defaultdict(lambda: [0.0, 0])
+    for when, category_id, transaction_type, amount, _ in inserted:
+        delta = deltas[(rollups.month_start(when), category_id, transaction_type)]
+        delta[0] += amount
+        delta[1] += 1
+    for (month, category_id, transaction_type), (amount, count) in deltas.items():
+        await rollups.apply_rollup_delta(
+            db, user_id, month, category_id, transaction_type, amount, count
+        )
+
+
+async def _apply_budget_writes(db: AsyncSession, user_id: int, inserted: List[tuple]) -> None:
+    writes = [
+        BudgetWrite(when, category_id, transaction_type, amount, 1)
+        for when, category_id, transaction_type, amount, _ in inserted
+    ]
+    # The batch is already in the table, so period seeds must not count it twice
+    await budget_alerts.apply_budget_writes(
+        db, user_id, writes, exclude_ids={transaction_id for *_, transaction_id in inserted}
+    )
+
+
+async def import_statement(
+    db: AsyncSession,
+    user_id: int,
+    stream: BinaryIO,
+    file_format: str,
+    batch_size: int = DEFAULT_BATCH_SIZE
+) -> ImportResult:
+    """Import a statement file in batches, committing after every batch.
+
+    Re-importing the same file is safe: rows whose content hash already exists
+    for the user are counted as skipped, and so are rows matching a
+    transaction entered by hand. Rows that fail validation are counted as
+    failed and do not stop the import.
+    """
+    items = iter_csv(stream) if file_format == "csv" else iter_ofx(stream)
+    categories = await _category_ids(db, user_id)
+    occurrences: Dict[bytes, int] = defaultdict(int)
+    manual = ManualMatcher(user_id)
+    result = ImportResult()
+
+    while True:
+        # Parsing and validation run in a worker thread
+        batch = await run_in_threadpool(lambda: list(islice(items, batch_size)))
+        if not batch:
+            break
+
+        rows = [item for _, item in batch if not isinstance(item, ValueError)]
+        if rows:
+            await manual.load(db, rows)
+
+        values = []
+        for row_number, item in batch:
+            if isinstance(item, ValueError):
+                result.add_error(row_number, str(item))
+                continue
+            if manual.take(item):
+                result.skipped += 1
+                continue
+            key = content_key(user_id, item)
+            # Count occurrences under a short digest to keep memory small
+            digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+            row_hash = content_hash(key, occurrences[digest])
+            occurrences[digest] += 1
+            category_id = categories.get(item.category_name.lower()) if item.category_name else None
+            values.append({
+                "amount": item.amount,
+                "description": item.description,
+                "transaction_type": item.transaction_type,
+                "category_id": category_id,
+                "user_id": user_id,
+                "date": item.date,
+                "notes": item.notes,
+                "ai_categorized": False,
+                "import_hash": row_hash,
+            })
+
+        if not values:
+            continue
+        inserted = await _insert_batch(db, values)
+        await _apply_rollups(db, user_id, inserted)
+        await _apply_budget_writes(db, user_id, inserted)
+        await db.commit()
+        result.inserted += len(inserted)
+        result.skipped += len(values) - len(inserted)
+
+    return result
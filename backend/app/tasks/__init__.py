@@ -0,0 +1 @@
+# Celery tasks package
@@ -0,0 +1,260 @@
+"""Background categorization of newly written transactions.
+
+Writes that leave transactions uncategorized call ``enqueue_categorization``.
+Calls for the same user within ``CATEGORIZATION_DEBOUNCE_SECONDS`` collapse
+into one delayed task. The task works through the user's uncategorized rows
+in batches: it runs them through the local classifier, the cache and the
+LLM, then writes the results back, so request latency never includes LLM
+time.
+
+The task is safe to run more than once:
+
+- Only rows that are still uncategorized are selected, and they are
+  re-checked under a row lock before writing.
+- A per-user lock keeps two workers from paying for the same LLM calls.
+
+When the LLM is unavailable the task retries with jittered backoff. Once the
+retries are used up the job is pushed to a Redis dead-letter list.
+"""
+import asyncio
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import redis
+from celery import Task
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import DBAPIError
+from starlette.concurrency import run_in_threadpool
+
+from app.celery import celery_app
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.llm import llm_client
+from app.db.models import CategorizationJob, Transaction
+from app.db.session import SessionLocal
+from app.services.categorization import BatchItem, categorize_batch, write_back
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on one job's runtime, after which the per-user lock frees itself
+JOB_LOCK_SECONDS = 900
+
+_thread_state = threading.local()
+_dead_letter_redis: Optional[redis.Redis] = None
+
+
+class CategorizationUnavailable(Exception):
+    """The LLM could not categorize any row of a batch; retry later."""
+
+
+def _queued_key(user_id: int) -> str:
+    return f"catq:{user_id}"
+
+
+def _running_key(user_id: int) -> str:
+    return f"catrun:{user_id}"
+
+
+def run_async(coro):
+    """Run ``coro`` on this thread's long-lived event loop.
+
+    The database, Redis and HTTP pools keep connections bound to the loop that
+    opened them, so tasks reuse one loop per worker thread instead of
+    ``asyncio.run``.
+    """
+    loop = getattr(_thread_state, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _thread_state.loop = asyncio.new_event_loop()
+    return loop.run_until_complete(coro)
+
+
+def _uncategorized(user_id: int):
+    return (
+        Transaction.user_id == user_id,
+        Transaction.category_id.is_(None),
+        or_(Transaction.ai_categorized.is_(False), Transaction.ai_categorized.is_(None)),
+    )
+
+
+async def enqueue_categorization(user_id: int) -> None:
+    """Schedule categorization of a user's uncategorized transactions.
+
+    Never raises: a failure to enqueue must not fail the write that caused it.
+    """
+    if not settings.BACKGROUND_CATEGORIZATION_ENABLED:
+        return
+    try:
+        # Later writes inside the window are picked up by the already queued task
+        if not await response_cache.add(_queued_key(user_id), "1", ttl=settings.CATEGORIZATION_DEBOUNCE_SECONDS):
+            return
+        if celery_app.conf.task_always_eager:
+            # Eager mode (tests) runs the job inline on the caller's loop
+            await categorize_pending(user_id)
+        else:
+            await run_in_threadpool(
+                categorize_user_transactions.apply_async,
+                args=[user_id],
+                countdown=settings.CATEGORIZATION_DEBOUNCE_SECONDS
+            )
+    except Exception:
+        logger.exception("Could not enqueue categorization for user %s", user_id)
+        await response_cache.delete(_queued_key(user_id))
+
+
+async def categorization_state(user_id: int) -> Tuple[bool, bool]:
+    """Whether a job is queued and whether one is running for the user."""
+    queued = await response_cache.get(_queued_key(user_id)) is not None
+    running = await response_cache.get(_running_key(user_id)) is not None
+    return queued, running
+
+
+async def categorize_pending(
+    user_id: int,
+    task_id: Optional[str] = None,
+    attempt: int = 1
+) -> Optional[Dict[str, int]]:
+    """Categorize the user's uncategorized rows, recording the run as a job.
+
+    Returns None without doing anything if another job holds the user's lock.
+    """
+    if not await response_cache.add(_running_key(user_id), task_id or "inline", ttl=JOB_LOCK_SECONDS):
+        return None
+
+    more_remaining = False
+    try:
+        async with SessionLocal() as db:
+            job = CategorizationJob(
+                user_id=user_id, task_id=task_id, status="running",
+                attempts=attempt, processed=0, categorized=0
+            )
+            db.add(job)
+            await db.commit()
+            job_id = job.id
+
+            try:
+                last_id = 0
+                while True:
+                    if job.processed >= settings.CATEGORIZATION_TASK_MAX_ROWS:
+                        more_remaining = True
+                        break
+                    rows = (await db.execute(
+                        select(Transaction.id, Transaction.description, Transaction.amount, Transaction.transaction_type)
+                        .where(*_uncategorized(user_id), Transaction.id > last_id)
+                        .order_by(Transaction.id)
+                        .limit(settings.CATEGORIZATION_TASK_BATCH_SIZE)
+                    )).all()
+                    if not rows:
+                        break
+                    # Rows left uncategorized are not retried within this run
+                    last_id = rows[-1].id
+
+                    items = [
+                        BatchItem(
+                            description=row.description,
+                            amount=row.amount,
+                            transaction_type=row.transaction_type,
+                            transaction_id=row.id
+                        )
+                        for row in rows
+                    ]
+                    results = await categorize_batch(db, items, user_id=user_id)
+                    if llm_client.configured and all(result.source == "fallback" for result in results):
+                        raise CategorizationUnavailable(f"No row of a {len(items)}-row batch could be categorized")
+
+                    assignments = {
+                        item.transaction_id: result
+                        for item, result in zip(items, results)
+                        if result.source != "fallback"
+                    }
+                    updated = await write_back(db, user_id, assignments, skip_locked=True)
+                    job.processed += len(items)
+                    job.categorized += updated
+                    await db.commit()
+                    if updated:
+                        await response_cache.bump_data_version(user_id)
+
+                job.status = "succeeded"
+                job.finished_at = datetime.now(timezone.utc)
+                await db.commit()
+                summary = {"job_id": job_id, "processed": job.processed, "categorized": job.categorized}
+            except Exception as exc:
+                await db.rollback()
+                await db.execute(
+                    update(CategorizationJob)
+                    .where(CategorizationJob.id == job_id)
+                    .values(status="retrying", error=str(exc)[:1000], finished_at=datetime.now(timezone.utc))
+                )
+                await db.commit()
+                raise
+    finally:
+        await response_cache.delete(_running_key(user_id))
+
+    if more_remaining:
+        # Continue in a fresh job so no single run holds the lock for long
+        await response_cache.delete(_queued_key(user_id))
+        await enqueue_categorization(user_id)
+    return summary
+
+
+def _dead_letter_client() -> redis.Redis:
+    global _dead_letter_redis
+    if _dead_letter_redis is None:
+        _dead_letter_redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _dead_letter_redis
+
+
+async def _mark_dead(task_id: str, error: str) -> None:
+    async with SessionLocal() as db:
+        await db.execute(
+            update(CategorizationJob)
+            .where(CategorizationJob.task_id == task_id, CategorizationJob.status.in_(["running", "retrying"]))
+            .values(status="dead", error=error[:1000], finished_at=datetime.now(timezone.utc))
+        )
+        await db.commit()
+
+
+class CategorizationTask(Task):
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        """Dead-letter a job whose retries are exhausted, or which failed outright."""
+        user_id = args[0] if args else kwargs.get("user_id")
+        entry = {
+            "task_id": task_id,
+            "user_id": user_id,
+            "error": repr(exc),
+            "failed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            client = _dead_letter_client()
+            client.lpush(settings.CATEGORIZATION_DEAD_LETTER_KEY, json.dumps(entry))
+            client.ltrim(settings.CATEGORIZATION_DEAD_LETTER_KEY, 0, settings.CATEGORIZATION_DEAD_LETTER_MAX - 1)
+        except redis.RedisError:
+            logger.exception("Could not dead-letter categorization task %s", task_id)
+        try:
+            run_async(_mark_dead(task_id, repr(exc)))
+        except Exception:
+            logger.exception("Could not mark categorization task %s as dead", task_id)
+
+
+@celery_app.task(
+    bind=True,
+    base=CategorizationTask,
+    name="categorization.categorize_user_transactions",
+    autoretry_for=(CategorizationUnavailable, DBAPIError),
+    retry_backoff=True,
+    retry_backoff_max=600,
+    retry_jitter=True,
+    max_retries=settings.CATEGORIZATION_TASK_MAX_RETRIES
+)
+def categorize_user_transactions(self, user_id: int) -> Optional[Dict[str, int]]:
+    summary = run_async(categorize_pending(
+        user_id, task_id=self.request.id, attempt=self.request.retries + 1
+    ))
+    if summary is None:
+        # Another job for this user is running; try again later without using up retries
+        categorize_user_transactions.apply_async(
+            args=[user_id], countdown=settings.CATEGORIZATION_DEBOUNCE_SECONDS
+        )
+    return summary
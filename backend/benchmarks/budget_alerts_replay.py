@@ -0,0 +1,204 @@
+"""Replay random transaction writes against the budget alert bookkeeping.
+
+Drives the same pieces ``app.services.budget_alerts`` runs on every write
+(``budget_deltas``, ``crossed_thresholds`` and ``period_bounds``) against an
+in-memory store instead of Postgres:
+
+- some transactions exist before the first write, so periods are seeded
+  lazily from raw rows exactly as the service seeds them;
+- creates, updates (amount, date, category and type) and deletes are then
+  replayed in random order over weekly, monthly and yearly budgets, with and
+  without a category, an end date or the active flag.
+
+After every write, each stored period containing the old or new date of the
+written transaction is compared with a full recomputation from the raw
+transactions; every stored period is checked again at the end. The recorded
+alerts must be exactly the thresholds that the recomputed totals crossed
+upward at some write, even after dipping back below them. Amounts are whole
+dollars, so float sums are exact. Run it from ``backend/``::
+
+    python -m benchmarks.budget_alerts_replay --seeds 10 --writes 1000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Set, Tuple
+
+from app.services.budget_alerts import (
+    ALERT_THRESHOLDS,
+    BudgetWrite,
+    budget_deltas,
+    budget_matches,
+    crossed_thresholds,
+)
+from app.services.budgets import period_bounds
+
+START = datetime(2024, 1, 1)
+DAYS = 120
+CATEGORIES = (1, 2, 3, None)
+
+
+def _random_budgets(rng: random.Random, count: int) -> List[SimpleNamespace]:
+    budgets = []
+    for budget_id in range(1, count + 1):
+        start = START + timedelta(days=rng.randrange(30))
+        budgets.append(SimpleNamespace(
+            id=budget_id,
+            amount=float(rng.choice((100, 250, 400, 1000, 5000))),
+            period=rng.choice(("weekly", "monthly", "yearly")),
+            category_id=rng.choice(CATEGORIES),
+            start_date=start,
+            end_date=start + timedelta(days=rng.randrange(30, DAYS)) if rng.random() < 0.3 else None,
+            is_active=rng.random() < 0.85
+        ))
+    return budgets
+
+
+def _random_transaction(rng: random.Random) -> dict:
+    return {
+        "when": START + timedelta(days=rng.randrange(DAYS), minutes=rng.randrange(24 * 60)),
+        "category_id": rng.choice(CATEGORIES),
+        "transaction_type": "income" if rng.random() < 0.15 else "expense",
+        "amount": float(rng.randint(1, 200)),
+    }
+
+
+def _write(transaction: dict, sign: int = 1) -> BudgetWrite:
+    return BudgetWrite(
+        when=transaction["when"],
+        category_id=transaction["category_id"],
+        transaction_type=transaction["transaction_type"],
+        amount=sign * transaction["amount"],
+        count=sign
+    )
+
+
+def _recompute(budget, period_start: datetime, transactions: Dict[int, dict]) -> Tuple[float, int]:
+    """Full recomputation of one budget period from the raw transactions."""
+    end = period_bounds(budget.period, period_start)[1]
+    matching = [
+        transaction for transaction in transactions.values()
+        if budget_matches(budget, _write(transaction)) and period_start <= transaction["when"] < end
+    ]
+    return sum(transaction["amount"] for transaction in matching), len(matching)
+
+
+class ReplayStore:
+    """In-memory stand-in for budget_period_totals and budget_alerts."""
+
+    def __init__(self, budgets: List[SimpleNamespace]):
+        self.budgets = {budget.id: budget for budget in budgets}
+        self.totals: Dict[Tuple[int, datetime], List[float]] = {}
+        self.alerts: Set[Tuple[int, datetime, int]] = set()
+
+    def apply(self, writes: List[BudgetWrite], transactions: Dict[int, dict]) -> None:
+        """Mirror of ``apply_budget_writes``; ``transactions`` is the state before the writes."""
+        for key, (amount, count) in budget_deltas(self.budgets.values(), writes).items():
+            budget = self.budgets[key[0]]
+            if key not in self.totals:
+                self.totals[key] = list(_recompute(budget, key[1], transactions))
+            total = self.totals[key]
+            total[0] += amount
+            total[1] += count
+            if budget.is_active:
+                for threshold in crossed_thresholds(total[0] - amount, total[0], budget.amount):
+                    self.alerts.add((key[0], key[1], threshold))
+
+
+def _replay(seed: int, writes: int, budget_count: int, initial: int) -> dict:
+    rng = random.Random(seed)
+    budgets = _random_budgets(rng, budget_count)
+    transactions = {tx_id: _random_transaction(rng) for tx_id in range(initial)}
+    next_id = initial
+    store = ReplayStore(budgets)
+
+    # Every budget period any write can touch, with its current true total
+    periods = {
+        (budget.id, period_bounds(budget.period, START + timedelta(days=day))[0])
+        for budget in budgets for day in range(DAYS)
+    }
+    current = {key: _recompute(store.budgets[key[0]], key[1], transactions)[0] for key in periods}
+    expected_alerts: Set[Tuple[int, datetime, int]] = set()
+
+    mismatches = 0
+    elapsed = 0.0
+    for _ in range(writes):
+        roll = rng.random()
+        if roll < 0.5 or not transactions:
+            new = _random_transaction(rng)
+            batch, tx_id, before, after = [_write(new)], next_id, None, new
+            next_id += 1
+        elif roll < 0.8:
+            tx_id = rng.choice(list(transactions))
+            changed = dict(transactions[tx_id])
+            field = rng.choice(("amount", "when", "category_id", "transaction_type", "nothing"))
+            if field != "nothing":
+                changed[field] = _random_transaction(rng)[field]
+            before = transactions[tx_id]
+            batch, after = [_write(before, sign=-1), _write(changed)], changed
+        else:
+            tx_id = rng.choice(list(transactions))
+            before = transactions[tx_id]
+            batch, after = [_write(before, sign=-1)], None
+
+        start = time.perf_counter()
+        store.apply(batch, transactions)
+        elapsed += time.perf_counter() - start
+        if after is None:
+            del transactions[tx_id]
+        else:
+            transactions[tx_id] = after
+
+        # Only periods holding the old or new date can have changed
+        touched = {
+            (budget.id, period_bounds(budget.period, version["when"])[0])
+            for budget in budgets for version in (before, after) if version is not None
+        }
+        for key in touched:
+            budget = store.budgets[key[0]]
+            expected_spent, expected_count = _recompute(budget, key[1], transactions)
+            if budget.is_active:
+                expected_alerts.update(
+                    (*key, threshold) for threshold in ALERT_THRESHOLDS
+                    if current[key] < budget.amount * threshold / 100 <= expected_spent
+                )
+            current[key] = expected_spent
+            if key in store.totals and store.totals[key] != [expected_spent, expected_count]:
+                mismatches += 1
+
+    for key, total in store.totals.items():
+        if total != list(_recompute(store.budgets[key[0]], key[1], transactions)):
+            mismatches += 1
+
+    return {
+        "periods": len(store.totals),
+        "alerts": len(store.alerts),
+        "total_mismatches": mismatches,
+        "alert_mismatches": len(store.alerts ^ expected_alerts),
+        "us_per_write": elapsed / writes * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--writes", type=int, default=1000)
+    parser.add_argument("--budgets", type=int, default=8)
+    parser.add_argument("--initial", type=int, default=100, help="Transactions that exist before the first write")
+    args = parser.parse_args()
+
+    print(f"{'seed':>6}{'periods':>9}{'alerts':>8}{'total diffs':>13}{'alert diffs':>13}{'us/write':>10}")
+    failures = 0
+    for seed in range(args.seeds):
+        report = _replay(seed, args.writes, args.budgets, args.initial)
+        failures += report["total_mismatches"] + report["alert_mismatches"]
+        print(f"{seed:>6}{report['periods']:>9}{report['alerts']:>8}{report['total_mismatches']:>13}"
+              f"{report['alert_mismatches']:>13}{report['us_per_write']:>10.1f}")
+    print("OK" if not failures else f"{failures} mismatches")
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Concurrency benchmark for GET /api/transactions/summary/dashboard.
+
+Registers a throwaway user against a running API, seeds a few transactions
+and then keeps ``--concurrency`` dashboard requests in flight for
+``--duration`` seconds, reporting requests per second and latency
+percentiles. Run it against a build before and after a change to compare::
+
+    python benchmarks/dashboard_concurrency.py --base-url http://localhost:8000 \
+        --concurrency 64 --duration 20
+
+Pass ``--bust-cache`` to write a transaction before every dashboard call so
+that each request reaches the database instead of the response cache.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+
+
+async def _register(client: httpx.AsyncClient) -> str:
+    suffix = uuid.uuid4().hex[:12]
+    response = await client.post("/api/auth/register", json={
+        "email": f"bench-{suffix}@example.com",
+        "username": f"bench-{suffix}",
+        "password": "benchmark-password"
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _seed(client: httpx.AsyncClient, count: int) -> None:
+    now = datetime.now()
+    for i in range(count):
+        response = await client.post("/api/transactions/", json={
+            "amount": 5 + i % 50,
+            "description": f"Seed transaction {i}",
+            "transaction_type": "income" if i % 10 == 0 else "expense",
+            "date": (now - timedelta(hours=i)).isoformat()
+        })
+        response.raise_for_status()
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    deadline: float,
+    latencies: list,
+    errors: list,
+    bust_cache: bool
+) -> None:
+    while time.perf_counter() < deadline:
+        if bust_cache:
+            await client.post("/api/transactions/", json={
+                "amount": 1,
+                "description": "Cache buster",
+                "transaction_type": "expense",
+                "date": datetime.now().isoformat()
+            })
+        start = time.perf_counter()
+        try:
+            response = await client.get("/api/transactions/summary/dashboard")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as exc:
+            errors.append(exc)
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=200)
+    parser.add_argument("--bust-cache", action="store_true")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        token = await _register(client)
+        client.headers["Authorization"] = f"Bearer {token}"
+        await _seed(client, args.seed)
+
+        latencies: list = []
+        errors: list = []
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(client, deadline, latencies, errors, args.bust_cache)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"No successful requests ({len(errors)} errors)")
+        return
+    print(f"concurrency:   {args.concurrency}")
+    print(f"requests:      {len(latencies)} ok, {len(errors)} errors")
+    print(f"throughput:    {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency mean:  {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 90, 99):
+        print(f"latency p{pct}:   {_percentile(latencies, pct) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
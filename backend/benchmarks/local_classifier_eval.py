@@ -0,0 +1,126 @@
+"""Offline evaluation of the per-user local classifier.
+
+Generates a synthetic transaction history for ``--users`` users: noisy bank
+descriptions (store numbers, dates, card suffixes, payment-processor
+prefixes) of merchants that each user labels with their own categories,
+including a few ambiguous merchants. Transactions are replayed in order.
+Each one is first offered to the local model:
+
+- When the model is confident enough, it answers and its answer is scored.
+- Otherwise the transaction counts as an LLM call. The user's label is then
+  learned, just as a hand-categorized row would be.
+
+The script reports local accuracy and the fraction of LLM calls avoided at
+several thresholds, plus prediction latency. Run it from ``backend/``::
+
+    python -m benchmarks.local_classifier_eval --users 20 --transactions 400
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Dict, List, Tuple
+
+from app.services.local_classifier import NaiveBayesModel
+
+MERCHANTS = {
+    "Food & Dining": ["STARBUCKS", "CHIPOTLE MEXICAN GRILL", "MCDONALD'S", "BLUE BOTTLE COFFEE",
+                      "DOMINO'S PIZZA", "PANERA BREAD", "SUBWAY", "DOORDASH"],
+    "Groceries": ["WHOLE FOODS MARKET", "TRADER JOE'S", "SAFEWAY", "KROGER", "ALDI"],
+    "Transportation": ["UBER TRIP", "LYFT RIDE", "SHELL OIL", "CHEVRON", "BART CLIPPER"],
+    "Shopping": ["AMAZON MKTPLACE", "TARGET", "BEST BUY", "IKEA", "ETSY"],
+    "Entertainment": ["AMC THEATRES", "STEAM GAMES", "TICKETMASTER", "BOWLERO"],
+    "Subscriptions": ["NETFLIX.COM", "SPOTIFY USA", "HULU", "ADOBE CREATIVE CLOUD", "ICLOUD STORAGE"],
+    "Utilities": ["PG&E WEB PAYMENT", "COMCAST XFINITY", "VERIZON WIRELESS", "CITY WATER DEPT"],
+    "Healthcare": ["CVS PHARMACY", "WALGREENS", "KAISER PERMANENTE"],
+}
+INCOME = {
+    "Salary": ["ACME CORP PAYROLL", "DIRECT DEP ACME CORP"],
+    "Freelance": ["UPWORK ESCROW", "STRIPE TRANSFER"],
+}
+# Merchants whose label depends on the purchase
+AMBIGUOUS = {"AMAZON MKTPLACE": ["Shopping", "Groceries"], "TARGET": ["Shopping", "Groceries"]}
+PREFIXES = ["", "", "", "POS ", "SQ *", "TST* ", "DEBIT CARD PURCHASE "]
+
+
+def _noisy(merchant: str, rng: random.Random) -> str:
+    parts = [rng.choice(PREFIXES) + merchant]
+    if rng.random() < 0.6:
+        parts.append(f"#{rng.randint(1, 9999):04d}")
+    if rng.random() < 0.4:
+        parts.append(f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}")
+    if rng.random() < 0.3:
+        parts.append(f"CARD {rng.randint(1000, 9999)}")
+    if rng.random() < 0.2:
+        parts.append(rng.choice(["SAN FRANCISCO CA", "NEW YORK NY", "AUSTIN TX", "ONLINE"]))
+    text = " ".join(parts)
+    return text.title() if rng.random() < 0.2 else text
+
+
+def _user_history(rng: random.Random, count: int) -> List[Tuple[str, str, str]]:
+    """(description, category, type) rows with a skewed merchant mix."""
+    merchants = [(m, c, "expense") for c, names in MERCHANTS.items() for m in names]
+    merchants += [(m, c, "income") for c, names in INCOME.items() for m in names]
+    # Each user shops at a subset of merchants, some of them much more often
+    chosen = rng.sample(merchants, k=min(len(merchants), rng.randint(12, 25)))
+    weights = [rng.paretovariate(1.2) for _ in chosen]
+    rows = []
+    for merchant, category, kind in rng.choices(chosen, weights=weights, k=count):
+        if merchant in AMBIGUOUS and rng.random() < 0.3:
+            category = rng.choice(AMBIGUOUS[merchant])
+        rows.append((_noisy(merchant, rng), category, kind))
+    return rows
+
+
+def _replay(history, threshold: float, dim: int, min_examples: int, latencies: List[float]) -> Dict[str, int]:
+    model = NaiveBayesModel(dim)
+    category_ids: Dict[str, int] = {}
+    counts = {"local": 0, "local_correct": 0, "llm": 0}
+    for description, category, kind in history:
+        prediction = None
+        if model.examples >= min_examples:
+            started = time.perf_counter()
+            prediction = model.predict(description, kind)
+            latencies.append(time.perf_counter() - started)
+        if prediction is not None and prediction.confidence >= threshold:
+            counts["local"] += 1
+            counts["local_correct"] += prediction.category_name == category
+        else:
+            counts["llm"] += 1
+            # The LLM suggestion is confirmed by the user, becoming a training label
+            category_id = category_ids.setdefault(category, len(category_ids) + 1)
+            model.partial_fit([(description, category_id, category, kind)])
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=400)
+    parser.add_argument("--hash-bits", type=int, default=13)
+    parser.add_argument("--min-examples", type=int, default=5)
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.9")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    histories = [_user_history(rng, args.transactions) for _ in range(args.users)]
+    print(f"{args.users} users x {args.transactions} transactions, {2 ** args.hash_bits} hashed features")
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        latencies: List[float] = []
+        totals = {"local": 0, "local_correct": 0, "llm": 0}
+        for history in histories:
+            for key, value in _replay(history, threshold, 2 ** args.hash_bits, args.min_examples, latencies).items():
+                totals[key] += value
+        answered = totals["local"] + totals["llm"]
+        accuracy = totals["local_correct"] / totals["local"] if totals["local"] else 0.0
+        print(
+            f"threshold={threshold:.2f} "
+            f"local accuracy={accuracy:.1%} "
+            f"LLM calls avoided={totals['local'] / answered:.1%} "
+            f"predict p50={statistics.median(latencies) * 1e6:.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Login storm benchmark.
+
+Fires ``--concurrency`` parallel logins at a running API for ``--duration``
+seconds while a probe repeatedly calls an unrelated endpoint, then reports
+login throughput and the probe's latency percentiles. With password hashing
+on the event loop the probe's p99 climbs to the length of the login queue;
+with hashing offloaded it should stay close to its idle latency::
+
+    python benchmarks/login_storm.py --base-url http://localhost:8000 \
+        --concurrency 50 --duration 20
+
+Logins rejected by admission control (HTTP 503) are counted separately.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(name: str, latencies: list) -> None:
+    if not latencies:
+        print(f"{name}: no successful requests")
+        return
+    print(
+        f"{name}: n={len(latencies)} "
+        f"mean={statistics.mean(latencies) * 1000:.1f}ms "
+        f"p50={_percentile(latencies, 50) * 1000:.1f}ms "
+        f"p99={_percentile(latencies, 99) * 1000:.1f}ms"
+    )
+
+
+async def _login_worker(client, credentials, deadline, latencies, counters) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/api/auth/login", json=credentials)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        elif response.status_code == 503:
+            counters["rejected"] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        else:
+            counters["errors"] += 1
+
+
+async def _probe(client, path, deadline, latencies) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(path)
+        if response.status_code < 500:
+            latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--probe-path", default="/health")
+    args = parser.parse_args()
+
+    suffix = uuid.uuid4().hex[:12]
+    credentials = {"email": f"storm-{suffix}@example.com", "password": "storm-password"}
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        response = await client.post("/api/auth/register", json={
+            **credentials, "username": f"storm-{suffix}"
+        })
+        response.raise_for_status()
+
+        # Idle baseline for the probe endpoint
+        idle: list = []
+        await _probe(client, args.probe_path, time.perf_counter() + 2, idle)
+
+        logins: list = []
+        probe: list = []
+        counters = {"rejected": 0, "errors": 0}
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(
+            _probe(client, args.probe_path, deadline, probe),
+            *[
+                _login_worker(client, credentials, deadline, logins, counters)
+                for _ in range(args.concurrency)
+            ]
+        )
+        elapsed = time.perf_counter() - started
+
+    print(f"login throughput: {len(logins) / elapsed:.1f}/s "
+          f"({counters['rejected']} rejected, {counters['errors']} errors)")
+    _report("logins", logins)
+    _report(f"{args.probe_path} idle", idle)
+    _report(f"{args.probe_path} during storm", probe)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
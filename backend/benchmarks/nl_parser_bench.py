@@ -0,0 +1,155 @@
+"""Latency and agreement of natural-language transaction parsing.
+
+Replays the golden corpus in ``nl_parser_corpus.json`` through three paths:
+
+- ``llm``: every input goes to the LLM, as before the rule-based parser;
+- ``rules``: the deterministic fast path only;
+- ``hybrid``: the fast path, falling back to the LLM below the threshold.
+
+The LLM is a stub that answers each input with the response recorded in the
+corpus after ``--llm-latency-ms``, so no API key is needed and runs are
+repeatable. For each path the script reports latency, LLM calls, agreement
+with the expected fields and agreement with the LLM's answer. Amount, type,
+currency and date must match exactly. Descriptions are compared by word
+overlap, since "Dinner at Luigi's" and "Dinner Luigi's" are the same entry.
+Run it from ``backend/``::
+
+    python -m benchmarks.nl_parser_bench --llm-latency-ms 800 --threshold 0.75
+"""
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.services import nl_parser
+
+CORPUS = Path(__file__).with_name("nl_parser_corpus.json")
+FIELDS = ("amount", "currency", "type", "date")
+
+
+class StubLLMClient:
+    """Answers parse prompts with the corpus's recorded LLM responses."""
+
+    configured = True
+
+    def __init__(self, answers: Dict[str, dict], latency: float):
+        self.answers = answers
+        self.latency = latency
+        self.calls = 0
+
+    async def complete(self, messages, max_tokens, temperature, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        text = re.search(r'Input: "(.*)"', messages[-1]["content"]).group(1)
+        return json.dumps(self.answers[text])
+
+
+def _fields(parsed: nl_parser.ParsedTransaction) -> dict:
+    return {
+        "amount": parsed.amount or None,
+        "currency": parsed.currency,
+        "type": parsed.transaction_type,
+        "date": parsed.date.isoformat() if parsed.date else None,
+        "description": parsed.description,
+    }
+
+
+def _normalized(answer: dict) -> dict:
+    return {**answer, "amount": answer.get("amount") or None}
+
+
+def _words(description: str) -> set:
+    return {word for word in re.findall(r"[a-z0-9']+", description.lower()) if word not in {"at", "the", "for", "and", "from", "to", "with"}}
+
+
+def _agrees(got: dict, want: dict) -> bool:
+    return all(got[field] == want.get(field) for field in FIELDS)
+
+
+def _description_agrees(got: dict, want: dict) -> bool:
+    mine, theirs = _words(got["description"]), _words(want.get("description") or "")
+    if not mine and not theirs:
+        return True
+    return len(mine & theirs) / len(mine | theirs) >= 0.5
+
+
+async def _run_path(path: str, cases: List[dict], today: date, stub: StubLLMClient) -> dict:
+    stub.calls = 0
+    latencies, results = [], []
+    for case in cases:
+        start = time.perf_counter()
+        if path == "llm":
+            parsed = await nl_parser.parse_with_llm(case["text"], today)
+        elif path == "rules":
+            parsed = nl_parser.parse_transaction_text(case["text"], today)
+        else:
+            parsed = await nl_parser.parse_natural_language(case["text"], today)
+        latencies.append(time.perf_counter() - start)
+        results.append(_fields(parsed))
+
+    count = len(cases)
+    expected = [_normalized(case["expected"]) for case in cases]
+    from_llm = [_normalized(case["llm"]) for case in cases]
+    ordered = sorted(latencies)
+    return {
+        "path": path,
+        "llm_calls": stub.calls,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": ordered[count // 2] * 1000,
+        "p95_ms": ordered[min(count - 1, int(count * 0.95))] * 1000,
+        "vs_expected": sum(_agrees(r, e) for r, e in zip(results, expected)) / count,
+        "vs_llm": sum(_agrees(r, e) for r, e in zip(results, from_llm)) / count,
+        "description": sum(_description_agrees(r, e) for r, e in zip(results, expected)) / count,
+        "results": results,
+    }
+
+
+def _print_disagreements(cases: List[dict], report: dict) -> None:
+    for case, got in zip(cases, report["results"]):
+        want = _normalized(case["expected"])
+        if not _agrees(got, want):
+            diff = {field: (got[field], want.get(field)) for field in FIELDS if got[field] != want.get(field)}
+            print(f"  {case['text']!r}: {diff}")
+
+
+async def _main(corpus: Path, latency: float, threshold: Optional[float], verbose: bool) -> None:
+    data = json.loads(corpus.read_text())
+    today = date.fromisoformat(data["today"])
+    cases = data["cases"]
+    if threshold is not None:
+        settings.NL_PARSER_CONFIDENCE = threshold
+
+    stub = StubLLMClient({case["text"]: case["llm"] for case in cases}, latency)
+    nl_parser.llm_client = stub
+
+    print(f"{len(cases)} inputs, stub LLM latency {latency * 1000:.0f} ms, "
+          f"threshold {settings.NL_PARSER_CONFIDENCE}")
+    print(f"{'path':<8}{'llm calls':>10}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'vs expected':>13}{'vs llm':>9}{'descr.':>9}")
+    for path in ("llm", "rules", "hybrid"):
+        report = await _run_path(path, cases, today, stub)
+        print(f"{path:<8}{report['llm_calls']:>10}{report['mean_ms']:>10.2f}{report['p50_ms']:>10.3f}"
+              f"{report['p95_ms']:>10.2f}{report['vs_expected']:>13.1%}{report['vs_llm']:>9.1%}"
+              f"{report['description']:>9.1%}")
+        if verbose and path != "llm":
+            _print_disagreements(cases, report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--threshold", type=float, default=None, help="Override NL_PARSER_CONFIDENCE")
+    parser.add_argument("--verbose", action="store_true", help="List inputs that disagree with the corpus")
+    args = parser.parse_args()
+    asyncio.run(_main(args.corpus, args.llm_latency_ms / 1000, args.threshold, args.verbose))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Accuracy and speed of recurring transaction detection.
+
+Generates synthetic merchant histories with known answers:
+
+- weekly, monthly and yearly charges with a few days of jitter, an
+  occasional skipped charge and an occasional small price change;
+- the same, mixed with one-off purchases at the same merchant;
+- irregular merchants with random dates and amounts, which must not match.
+
+Histories are capped to the latest ``RECURRING_HISTORY_LIMIT`` charges, as
+they are stored. All histories are analyzed with one ``detect_patterns``
+call, as a full rescan does, and then with one call per history, as a loop
+over merchants would. The script reports precision and recall of the
+detected cadences and both timings. Run it from ``backend/``::
+
+    python -m benchmarks.recurring_bench --merchants 5000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.recurring import detect_patterns
+
+START = date(2021, 1, 1)
+END = date(2024, 12, 31)
+PERIODS = {"weekly": 7, "monthly": None, "yearly": 365}
+# Days a charge may post early or late; weekly charges usually keep their weekday
+JITTER = {"weekly": (0, 0, 0, 1), "monthly": (-1, 0, 0, 0, 1, 2), "yearly": (-2, 0, 0, 1, 3)}
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    return date(year, month % 12 + 1, min(day.day, 28))
+
+
+def _periodic(rng: random.Random, cadence: str, mixed: bool) -> Tuple[List[date], List[float]]:
+    price = round(rng.uniform(3, 120), 2)
+    dates, amounts = [], []
+    first = START + timedelta(days=rng.randrange(365))
+    for step in range(400):
+        if cadence == "monthly":
+            day = _add_months(first, step)
+        else:
+            day = first + timedelta(days=PERIODS[cadence] * step)
+        if day > END:
+            break
+        if rng.random() < 0.03:
+            continue  # Skipped or refunded charge
+        if rng.random() < 0.02:
+            price = round(price * rng.uniform(1.02, 1.08), 2)  # Small price increase
+        dates.append(day + timedelta(days=rng.choice(JITTER[cadence])))
+        amounts.append(price)
+    if mixed:
+        for _ in range(rng.randrange(1, max(2, len(dates) // 4))):
+            dates.append(START + timedelta(days=rng.randrange((END - START).days)))
+            amounts.append(round(rng.uniform(5, 400), 2))
+    history = sorted(zip(dates, amounts))[-settings.RECURRING_HISTORY_LIMIT:]
+    return [day for day, _ in history], [amount for _, amount in history]
+
+
+def _irregular(rng: random.Random) -> Tuple[List[date], List[float]]:
+    count = rng.randrange(2, 40)
+    dates = [START + timedelta(days=rng.randrange((END - START).days)) for _ in range(count)]
+    return dates, [round(rng.uniform(5, 200), 2) for _ in range(count)]
+
+
+def _histories(merchants: int, seed: int) -> Tuple[list, List[Optional[str]]]:
+    rng = random.Random(seed)
+    histories, expected = [], []
+    for _ in range(merchants):
+        roll = rng.random()
+        if roll < 0.5:
+            cadence = rng.choice(("weekly", "monthly", "monthly", "yearly"))
+            histories.append(_periodic(rng, cadence, mixed=roll < 0.15))
+            expected.append(cadence)
+        else:
+            histories.append(_irregular(rng))
+            expected.append(None)
+    return histories, expected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--merchants", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    histories, expected = _histories(args.merchants, args.seed)
+    charges = sum(len(dates) for dates, _ in histories)
+
+    start = time.perf_counter()
+    detections = detect_patterns(histories)
+    batched = time.perf_counter() - start
+    start = time.perf_counter()
+    for history in histories:
+        detect_patterns([history])
+    looped = time.perf_counter() - start
+
+    found = [detection.cadence for detection in detections]
+    true_positive = sum(1 for got, want in zip(found, expected) if got and got == want)
+    predicted = sum(1 for got in found if got)
+    actual = sum(1 for want in expected if want)
+    print(f"{len(histories)} merchant histories, {charges} charges")
+    print(f"precision {true_positive / max(predicted, 1):.1%}  recall {true_positive / max(actual, 1):.1%}")
+    for cadence in ("weekly", "monthly", "yearly"):
+        hits = sum(1 for got, want in zip(found, expected) if want == cadence and got == cadence)
+        total = sum(1 for want in expected if want == cadence)
+        print(f"  {cadence:<8} recall {hits / max(total, 1):.1%} of {total}")
+    print(f"one batched call   {batched * 1000:8.1f} ms")
+    print(f"one call per merchant {looped * 1000:5.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
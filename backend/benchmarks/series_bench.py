@@ -0,0 +1,130 @@
+"""Cost of shaping /api/transactions/series responses after the SQL query.
+
+Generates the rows ``date_trunc`` bucketing returns for a heavy user, sparse
+(series, bucket) totals with gaps, and times two ways to turn them into
+gap-filled series with running totals and moving averages:
+
+- ``python``: per-series dictionaries and loops over every bucket;
+- ``numpy``: ``app.services.series.build_series``.
+
+Both results must agree. The serialization time of the NumPy path is shown
+separately. Run it from ``backend/``::
+
+    python -m benchmarks.series_bench --years 5 --categories 20 --interval day
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from app.services import series
+
+START = date(2020, 1, 6)  # A Monday
+
+
+def _rows(interval: str, years: int, categories: int, density: float, seed: int) -> List[tuple]:
+    rng = random.Random(seed)
+    end = START + timedelta(days=365 * years)
+    rows = []
+    day = START
+    while day <= end:
+        bucket = series.bucket_start(interval, day).astype(date)
+        for category_id in range(1, categories + 1):
+            if rng.random() < density:
+                kind = "income" if category_id == 1 else "expense"
+                rows.append((bucket, kind, category_id, f"Category {category_id}", round(rng.uniform(1, 500), 2)))
+        day += timedelta(days=1 if interval == "day" else 7 if interval == "week" else 31)
+    return rows
+
+
+def _python_series(rows: List[tuple], interval: str, first: date, last: date, window: int) -> Dict[tuple, tuple]:
+    """The loop-per-bucket version the NumPy path replaces."""
+    buckets = []
+    current = first
+    while current <= last:
+        buckets.append(current)
+        if interval == "month":
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current += timedelta(days=1 if interval == "day" else 7)
+    sparse: Dict[tuple, Dict[date, float]] = {}
+    for bucket, kind, category_id, _, total in rows:
+        line = sparse.setdefault((kind, category_id), {})
+        line[bucket] = line.get(bucket, 0.0) + total
+
+    result = {}
+    for key, line in sparse.items():
+        totals = [line.get(bucket, 0.0) for bucket in buckets]
+        cumulative, running = [], 0.0
+        for value in totals:
+            running += value
+            cumulative.append(running)
+        averages = []
+        for position in range(len(totals)):
+            chunk = totals[max(0, position - window + 1):position + 1]
+            averages.append(sum(chunk) / len(chunk))
+        result[key] = (totals, cumulative, averages)
+    return result
+
+
+def _serialize(result: series.Series) -> str:
+    return json.dumps({
+        "buckets": np.datetime_as_string(result.buckets.astype("datetime64[D]")).tolist(),
+        "series": [
+            {
+                "totals": np.round(line.totals, 2).tolist(),
+                "cumulative": np.round(line.cumulative, 2).tolist(),
+                "moving_average": np.round(line.moving_average, 2).tolist(),
+            }
+            for line in result.lines
+        ],
+    })
+
+
+def _timed(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", choices=series.INTERVALS, default="day")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--density", type=float, default=0.3, help="Chance a category has spending in a bucket")
+    parser.add_argument("--window", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = _rows(args.interval, args.years, args.categories, args.density, seed=1)
+    first = min(row[0] for row in rows)
+    last = max(row[0] for row in rows)
+    first64, last64 = series.bucket_start(args.interval, first), series.bucket_start(args.interval, last)
+
+    def numpy_path():
+        return series.build_series(rows, args.interval, first64, last64, args.window)
+
+    result = numpy_path()
+    reference = _python_series(rows, args.interval, first, last, args.window)
+    for line in result.lines:
+        totals, cumulative, averages = reference[(line.transaction_type, line.category_id)]
+        assert np.allclose(line.totals, totals) and np.allclose(line.cumulative, cumulative)
+        assert np.allclose(line.moving_average, averages)
+
+    print(f"{len(rows)} rows, {len(result.buckets)} {args.interval} buckets x {len(result.lines)} series")
+    print(f"python   {_timed(lambda: _python_series(rows, args.interval, first, last, args.window), args.repeat):8.2f} ms")
+    print(f"numpy    {_timed(numpy_path, args.repeat):8.2f} ms")
+    print(f"  + json {_timed(lambda: _serialize(result), args.repeat):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Fixtures for tests that run against a real PostgreSQL database.
+
+Set ``TEST_DATABASE_URL`` to a database the tests may wipe; its ``public``
+schema is dropped and migrated to head once per session. Without it, the
+database tests are skipped. Redis is turned off and Celery runs tasks
+eagerly over an in-memory broker, so the tests only need Postgres.
+Background categorization is off unless a test turns it on, so rows written
+by other tests stay as they were written::
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/financeflareai_test pytest
+"""
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["REDIS_URL"] = ""
+os.environ["CELERY_BROKER_URL"] = "memory://"
+os.environ["CELERY_TASK_ALWAYS_EAGER"] = "true"
+os.environ["BACKGROUND_CATEGORIZATION_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from app.api.routers.auth import get_current_user  # noqa: E402
+from app.core.auth_cache import CurrentUser  # noqa: E402
+from app.db.models import User  # noqa: E402
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    # The engine's pool is module-level, so every test shares one loop
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from alembic import command
+    from alembic.config import Config
+
+    sync_engine = create_engine(TEST_DATABASE_URL)
+    with sync_engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    sync_engine.dispose()
+
+    config = Config(str(BACKEND / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND / "alembic"))
+    command.upgrade(config, "head")
+    return TEST_DATABASE_URL
+
+
+@pytest.fixture
+async def db(migrated_database):
+    async with SessionLocal() as session:
+        yield session
+    # Ids keep growing across tests, so cache entries keyed by user never collide
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    async with engine.begin() as connection:
+        await connection.execute(text(f"TRUNCATE {tables} CASCADE"))
+
+
+@pytest.fixture
+async def user(db) -> CurrentUser:
+    row = User(email="test@example.com", username="test", hashed_password="not-a-real-hash")
+    db.add(row)
+    await db.commit()
+    return CurrentUser.from_user(row)
+
+
+@pytest.fixture
+async def client(user):
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://testserver") as http:
+            yield http
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,62 @@
+"""Streamed budgeting advice and its daily cache."""
+import json
+from datetime import date
+
+import pytest
+
+from app.api.routers import ai
+from app.core.cache import response_cache
+from app.services.advice import advice_cache_key
+
+
+class StubLLM:
+    """Streams the next scripted answer, one chunk per item."""
+
+    configured = True
+
+    def __init__(self):
+        self.answers = []
+
+    async def stream(self, messages, max_tokens, temperature, **kwargs):
+        for chunk in self.answers.pop(0):
+            yield chunk
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(ai, "llm_client", stub)
+    return stub
+
+
+async def _advice(client):
+    response = await client.get("/api/ai/advice")
+    assert response.status_code == 200, response.text
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines.get("event", "message"), json.loads(lines["data"])))
+    return events
+
+
+async def test_empty_answer_is_not_cached(client, user, llm):
+    llm.answers = [[], ["Spend ", "less."]]
+
+    events = await _advice(client)
+
+    assert [name for name, _ in events] == ["meta", "error"]
+    assert await response_cache.get(await advice_cache_key(user.id, date.today())) is None
+
+    events = await _advice(client)
+
+    assert events[0] == ("meta", {"cached": False, "date": date.today().isoformat()})
+    assert [name for name, _ in events[1:]] == ["message", "message", "done"]
+    assert await response_cache.get(await advice_cache_key(user.id, date.today())) == "Spend less."
+
+    events = await _advice(client)
+
+    assert events == [
+        ("meta", {"cached": True, "date": date.today().isoformat()}),
+        ("message", {"text": "Spend less."}),
+        ("done", {}),
+    ]
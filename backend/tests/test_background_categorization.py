@@ -0,0 +1,148 @@
+"""Background categorization with Celery running tasks eagerly and a stubbed LLM."""
+import json
+import re
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+from app.core.llm import LLMError
+from app.db.models import Category, CategorizationJob, Transaction
+from app.db.session import get_async_database_url
+from app.services import categorization
+from app.tasks import categorization as tasks
+
+_PROMPT_LINE = re.compile(r"^(\d+) \| (\w+) \| [^|]+ \| (.*)$", re.MULTILINE)
+
+
+class StubLLM:
+    """Answers every prompt line with a fixed category, or fails every call."""
+
+    configured = True
+
+    def __init__(self, category="Food & Dining", fail=False):
+        self.category = category
+        self.fail = fail
+        self.calls = 0
+
+    async def complete(self, messages, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise LLMError("upstream unavailable")
+        lines = _PROMPT_LINE.findall(messages[-1]["content"])
+        return json.dumps([
+            {"id": int(number), "suggested_category": self.category, "transaction_type": kind, "confidence": 0.9}
+            for number, kind, _ in lines
+        ])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(categorization, "llm_client", stub)
+    monkeypatch.setattr(tasks, "llm_client", stub)
+    monkeypatch.setattr(settings, "BACKGROUND_CATEGORIZATION_ENABLED", True)
+    monkeypatch.setattr(settings, "LOCAL_CLASSIFIER_ENABLED", False)
+    return stub
+
+
+async def _create(client, description, amount=12.0):
+    response = await client.post("/api/transactions/", json={
+        "amount": amount, "description": description, "transaction_type": "expense",
+        "date": "2026-10-05T12:00:00",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def test_new_transaction_is_categorized_in_the_background(client, db, user, llm):
+    transaction_id = await _create(client, "Corner Bistro")
+
+    transaction = await db.get(Transaction, transaction_id)
+    category = await db.get(Category, transaction.category_id)
+    assert transaction.ai_categorized is True
+    assert category.name == "Food & Dining"
+    jobs = (await db.scalars(select(CategorizationJob).where(CategorizationJob.user_id == user.id))).all()
+    assert [(job.status, job.processed, job.categorized) for job in jobs] == [("succeeded", 1, 1)]
+
+    status = (await client.get("/api/ai/categorize/status")).json()
+    assert status["pending"] == 0
+    assert status["running"] is False
+    assert [job["status"] for job in status["recent_jobs"]] == ["succeeded"]
+
+
+async def test_rerun_does_not_touch_categorized_rows(client, db, user, llm):
+    await _create(client, "Corner Bistro")
+    calls = llm.calls
+
+    summary = await tasks.categorize_pending(user.id)
+
+    assert (summary["processed"], summary["categorized"]) == (0, 0)
+    assert llm.calls == calls
+
+
+async def test_job_is_skipped_while_another_holds_the_user_lock(client, db, user, llm):
+    await tasks.response_cache.add(tasks._running_key(user.id), "other-task", ttl=60)
+    try:
+        assert await tasks.categorize_pending(user.id) is None
+    finally:
+        await tasks.response_cache.delete(tasks._running_key(user.id))
+
+
+@pytest.fixture
+def task_sessions(monkeypatch, migrated_database):
+    """Sessions for the Celery task, which runs on its own event loop.
+
+    The app's pooled connections belong to the test loop, so the task gets
+    an unpooled engine that opens connections on whichever loop uses it.
+    """
+    engine = create_async_engine(get_async_database_url(migrated_database), poolclass=NullPool)
+    monkeypatch.setattr(tasks, "SessionLocal", async_sessionmaker(engine, expire_on_commit=False))
+    return engine
+
+
+@pytest.fixture
+def dead_letters(monkeypatch):
+    entries = []
+
+    class DeadLetterList:
+        def lpush(self, key, value):
+            entries.append((key, json.loads(value)))
+
+        def ltrim(self, key, start, end):
+            pass
+
+    monkeypatch.setattr(tasks, "_dead_letter_client", lambda: DeadLetterList())
+    return entries
+
+
+def test_unavailable_llm_retries_then_dead_letters(
+    event_loop, monkeypatch, client, db, user, llm, task_sessions, dead_letters
+):
+    monkeypatch.setattr(settings, "BACKGROUND_CATEGORIZATION_ENABLED", False)
+    # A description no other test categorizes, so no cached suggestion answers for the LLM
+    transaction_id = event_loop.run_until_complete(_create(client, "Harbour Noodle Bar"))
+    llm.fail = True
+    # Eager retries only run when the task's errors are not propagated to the caller
+    monkeypatch.setattr(tasks.celery_app.conf, "task_eager_propagates", False)
+
+    result = tasks.categorize_user_transactions.apply(args=[user.id])
+
+    async def stored():
+        await db.rollback()
+        jobs = (await db.scalars(
+            select(CategorizationJob).where(CategorizationJob.user_id == user.id).order_by(CategorizationJob.id)
+        )).all()
+        return jobs, await db.get(Transaction, transaction_id)
+
+    jobs, transaction = event_loop.run_until_complete(stored())
+    assert result.state == "FAILURE"
+    assert isinstance(result.result, tasks.CategorizationUnavailable)
+    assert [job.attempts for job in jobs] == list(range(1, settings.CATEGORIZATION_TASK_MAX_RETRIES + 2))
+    assert {job.status for job in jobs} == {"dead"}
+    assert [(key, entry["user_id"]) for key, entry in dead_letters] == [
+        (settings.CATEGORIZATION_DEAD_LETTER_KEY, user.id)
+    ]
+    assert transaction.category_id is None and not transaction.ai_categorized
@@ -0,0 +1,213 @@
+"""Budget period totals and alerts against a from-scratch recomputation.
+
+Random creates, updates, deletes and statement imports are replayed through
+the endpoints, over budgets of every period with and without a category, an
+end date or the active flag. Some transactions exist before the budgets do,
+so periods are seeded from raw rows on their first write, and imports take
+the ``exclude_ids`` path. After every step, each stored period total must
+equal the sum recomputed from the raw transactions, and the stored alerts
+must be exactly the thresholds the recomputed totals crossed upward at some
+step. Amounts are whole dollars, so float sums are exact.
+"""
+import asyncio
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Set, Tuple
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models import Budget, BudgetAlert, BudgetPeriodTotal, Category, Transaction
+from app.services.budget_alerts import BudgetWrite, budget_matches, crossed_thresholds
+from app.services.budgets import period_bounds
+
+START = datetime(2026, 1, 1)
+DAYS = 90
+STEPS = 120
+
+
+async def _setup(db, user, rng: random.Random):
+    categories = [Category(name=name, user_id=user.id) for name in ("Groceries", "Dining", "Transport")]
+    db.add_all(categories)
+    await db.flush()
+    category_ids = [category.id for category in categories] + [None]
+    # Written before any budget exists, so the first write to a period seeds it
+    db.add_all(
+        Transaction(user_id=user.id, description="Existing", **_random_fields(rng, category_ids))
+        for _ in range(40)
+    )
+    db.add_all([
+        Budget(name="Weekly", amount=150.0, period="weekly", category_id=None, user_id=user.id,
+               start_date=START, is_active=True),
+        Budget(name="Groceries", amount=250.0, period="monthly", category_id=category_ids[0], user_id=user.id,
+               start_date=START + timedelta(days=10), is_active=True),
+        Budget(name="Dining", amount=120.0, period="monthly", category_id=category_ids[1], user_id=user.id,
+               start_date=START, end_date=START + timedelta(days=50), is_active=True),
+        Budget(name="Year", amount=2500.0, period="yearly", category_id=None, user_id=user.id,
+               start_date=START, is_active=True),
+        Budget(name="Paused", amount=100.0, period="monthly", category_id=category_ids[2], user_id=user.id,
+               start_date=START, is_active=False),
+    ])
+    await db.commit()
+    # Plain snapshots; the session is rolled back between steps, which expires ORM rows
+    budgets = [
+        SimpleNamespace(
+            id=budget.id, amount=budget.amount, period=budget.period, category_id=budget.category_id,
+            start_date=budget.start_date, end_date=budget.end_date, is_active=budget.is_active
+        )
+        for budget in await db.scalars(select(Budget).where(Budget.user_id == user.id))
+    ]
+    return budgets, [category.name for category in categories], category_ids
+
+
+def _random_fields(rng: random.Random, category_ids) -> dict:
+    return {
+        "date": START + timedelta(days=rng.randrange(DAYS), minutes=rng.randrange(24 * 60)),
+        "category_id": rng.choice(category_ids),
+        "transaction_type": "income" if rng.random() < 0.15 else "expense",
+        "amount": float(rng.randint(1, 60)),
+    }
+
+
+async def _true_totals(db, user_id: int, budgets) -> Dict[Tuple[int, datetime], Tuple[float, int]]:
+    """Every budget period's (spent, count), summed from the raw transactions."""
+    totals: Dict[Tuple[int, datetime], list] = defaultdict(lambda: [0.0, 0])
+    rows = await db.execute(select(
+        Transaction.date, Transaction.category_id, Transaction.transaction_type, Transaction.amount
+    ).where(Transaction.user_id == user_id))
+    for when, category_id, transaction_type, amount in rows:
+        write = BudgetWrite(when, category_id, transaction_type, amount, 1)
+        for budget in budgets:
+            if budget_matches(budget, write):
+                total = totals[(budget.id, period_bounds(budget.period, when)[0])]
+                total[0] += amount
+                total[1] += 1
+    return {key: (spent, count) for key, (spent, count) in totals.items()}
+
+
+async def _check(db, user_id: int, budgets, previous, expected_alerts: Set[tuple]):
+    """Compare the stored state with the recomputation; returns the new true totals."""
+    await db.rollback()  # Fresh reads of what the endpoints committed
+    current = await _true_totals(db, user_id, budgets)
+    for budget in budgets:
+        if not budget.is_active:
+            continue
+        for key in {key for key in set(previous) | set(current) if key[0] == budget.id}:
+            before, after = previous.get(key, (0.0, 0))[0], current.get(key, (0.0, 0))[0]
+            expected_alerts.update((*key, threshold) for threshold in crossed_thresholds(before, after, budget.amount))
+
+    stored = {
+        (row.budget_id, row.period_start): (row.spent, row.transaction_count)
+        for row in await db.scalars(select(BudgetPeriodTotal).join(Budget).where(Budget.user_id == user_id))
+    }
+    mismatched = {key: (total, current.get(key, (0.0, 0))) for key, total in stored.items()
+                  if total != current.get(key, (0.0, 0))}
+    assert not mismatched
+    alerts = set((await db.execute(select(
+        BudgetAlert.budget_id, BudgetAlert.period_start, BudgetAlert.threshold
+    ).where(BudgetAlert.user_id == user_id))).all())
+    assert alerts == expected_alerts
+    return current
+
+
+def _csv(rng: random.Random, category_names) -> bytes:
+    lines = ["date,description,amount,type,category"]
+    for _ in range(rng.randint(1, 6)):
+        fields = _random_fields(rng, category_names + [""])
+        category = fields["category_id"]
+        lines.append(
+            f"{fields['date']:%Y-%m-%d %H:%M},Statement row {rng.randrange(10 ** 6)},"
+            f"{fields['amount']},{fields['transaction_type']},{category}"
+        )
+    return "\n".join(lines).encode()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+async def test_replayed_writes_match_recomputation(client, db, user, seed):
+    rng = random.Random(seed)
+    budgets, category_names, category_ids = await _setup(db, user, rng)
+    transaction_ids = list((await db.scalars(select(Transaction.id).where(Transaction.user_id == user.id))).all())
+    expected_alerts: Set[tuple] = set()
+    totals = await _true_totals(db, user.id, budgets)
+
+    for _ in range(STEPS):
+        roll = rng.random()
+        if roll < 0.4 or not transaction_ids:
+            fields = _random_fields(rng, category_ids)
+            response = await client.post("/api/transactions/", json={
+                **fields, "date": fields["date"].isoformat(), "description": "Purchase",
+            })
+            transaction_ids.append(response.json()["id"])
+        elif roll < 0.7:
+            field = rng.choice(("amount", "date", "category_id", "transaction_type"))
+            value = _random_fields(rng, category_ids)[field]
+            response = await client.put(f"/api/transactions/{rng.choice(transaction_ids)}", json={
+                field: value.isoformat() if field == "date" else value
+            })
+        elif roll < 0.9:
+            transaction_id = transaction_ids.pop(rng.randrange(len(transaction_ids)))
+            response = await client.delete(f"/api/transactions/{transaction_id}")
+        else:
+            response = await client.post(
+                "/api/transactions/import", files={"file": ("statement.csv", _csv(rng, category_names), "text/csv")}
+            )
+            transaction_ids = list((await db.scalars(
+                select(Transaction.id).where(Transaction.user_id == user.id)
+            )).all())
+        assert response.status_code == 200, response.text
+        totals = await _check(db, user.id, budgets, totals, expected_alerts)
+
+    assert expected_alerts  # The replay must actually exercise the alerts
+
+
+async def test_concurrent_updates_keep_period_totals_exact(client, db, user):
+    rng = random.Random(0)
+    budgets, _, category_ids = await _setup(db, user, rng)
+    response = await client.post("/api/transactions/", json={
+        "amount": 10.0, "description": "Purchase", "transaction_type": "expense",
+        "category_id": category_ids[0], "date": (START + timedelta(days=20)).isoformat(),
+    })
+    transaction_id = response.json()["id"]
+
+    responses = await asyncio.gather(*(
+        client.put(f"/api/transactions/{transaction_id}", json={
+            "amount": float(40 * step), "date": (START + timedelta(days=20 + 9 * step)).isoformat(),
+        })
+        for step in range(1, 6)
+    ))
+
+    assert all(response.status_code == 200 for response in responses)
+    await db.rollback()
+    current = await _true_totals(db, user.id, budgets)
+    stored = await db.scalars(select(BudgetPeriodTotal).join(Budget).where(Budget.user_id == user.id))
+    for row in stored:
+        assert (row.spent, row.transaction_count) == current.get((row.budget_id, row.period_start), (0.0, 0))
+
+
+async def test_polling_after_id_pages_through_every_alert(client, db, user):
+    budget = Budget(name="Monthly", amount=100.0, period="monthly", category_id=None, user_id=user.id,
+                    start_date=START, is_active=True)
+    db.add(budget)
+    await db.flush()
+    alerts = [
+        BudgetAlert(user_id=user.id, budget_id=budget.id, period_start=START + timedelta(days=31 * month),
+                    threshold=threshold, spent=float(threshold), amount=100.0)
+        for month in range(3) for threshold in (50, 80, 100)
+    ]
+    db.add_all(alerts)
+    await db.commit()
+    alert_ids = sorted(alert.id for alert in alerts)
+
+    newest = (await client.get("/api/budgets/alerts", params={"limit": 4})).json()
+    assert [alert["id"] for alert in newest] == alert_ids[::-1][:4]
+
+    seen, after_id = [], alert_ids[0] - 1
+    while True:
+        page = (await client.get("/api/budgets/alerts", params={"after_id": after_id, "limit": 4})).json()
+        if not page:
+            break
+        seen.extend(alert["id"] for alert in page)
+        after_id = max(alert["id"] for alert in page)
+    assert seen == alert_ids
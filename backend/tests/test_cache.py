@@ -0,0 +1,73 @@
+"""Data versions across a Redis outage, with two workers sharing one Redis."""
+from redis.exceptions import ConnectionError
+
+from app.core.cache import ResponseCache
+
+
+class FakeRedis:
+    """The few Redis commands the data versions use, with an on/off switch."""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("Timeout reading from socket")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+
+def _worker(redis: FakeRedis) -> ResponseCache:
+    cache = ResponseCache("redis://localhost", default_ttl=60, max_local_entries=100, version_ttl=3600)
+    cache._redis = redis
+    cache.REDIS_RETRY_SECONDS = 0.0
+    return cache
+
+
+async def test_bump_during_outage_reaches_redis_when_it_recovers():
+    redis = FakeRedis()
+    writer, reader = _worker(redis), _worker(redis)
+    before = await writer.get_data_version(1)
+    assert await reader.get_data_version(1) == before
+
+    redis.down = True
+    await writer.bump_data_version(1)
+    during = await writer.get_data_version(1)
+    redis.down = False
+
+    assert during != before
+    # Neither the writer nor another worker goes back to the version from before the outage
+    assert await writer.get_data_version(1) == during
+    assert await reader.get_data_version(1) == during
+
+
+async def test_unsynced_user_keeps_local_version_while_redis_is_down():
+    redis = FakeRedis()
+    cache = _worker(redis)
+    before = await cache.get_data_version(1)
+    redis.down = True
+    cache.REDIS_RETRY_SECONDS = 60.0
+
+    await cache.bump_data_version(1)
+    redis.down = False  # Still inside the retry window, so Redis is not asked yet
+
+    assert await cache.get_data_version(1) not in (None, before)
+    assert redis.data[f"{cache.prefix}:ver:1"] == before
+
+
+async def test_versions_bumped_while_redis_was_up_are_not_resent():
+    redis = FakeRedis()
+    cache = _worker(redis)
+    await cache.bump_data_version(1)
+
+    assert not cache._unsynced_versions
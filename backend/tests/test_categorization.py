@@ -0,0 +1,36 @@
+"""Writing batch categorization results back keeps the rollups in step."""
+from datetime import datetime
+
+from app.db.models import Category, Transaction
+from app.services import rollups
+from app.services.categorization import BatchResult, write_back
+
+
+async def test_swapping_categories_updates_rollup_amounts(db, user):
+    groceries = Category(name="Groceries", user_id=user.id)
+    dining = Category(name="Dining", user_id=user.id)
+    db.add_all([groceries, dining])
+    await db.flush()
+    small = Transaction(
+        amount=10.0, description="Corner shop", transaction_type="expense", category_id=groceries.id,
+        user_id=user.id, date=datetime(2026, 10, 3), ai_categorized=True
+    )
+    large = Transaction(
+        amount=35.0, description="Bistro", transaction_type="expense", category_id=dining.id,
+        user_id=user.id, date=datetime(2026, 10, 9), ai_categorized=True
+    )
+    db.add_all([small, large])
+    await db.flush()
+    for transaction in (small, large):
+        await rollups.record_transaction(db, transaction)
+    await db.commit()
+
+    # Each category keeps one transaction, so only the amounts move
+    updated = await write_back(db, user.id, {
+        small.id: BatchResult("Dining", "expense", 0.9, "model"),
+        large.id: BatchResult("Groceries", "expense", 0.9, "model"),
+    })
+    await db.commit()
+
+    assert updated == 2
+    assert await rollups.verify_rollups(db, user.id) == []
@@ -0,0 +1,28 @@
+"""Health endpoints."""
+import httpx
+
+from app.db.session import engine
+from app.main import app
+
+
+async def test_health_is_public():
+    async with httpx.AsyncClient(app=app, base_url="http://testserver") as http:
+        response = await http.get("/health")
+
+    assert response.status_code == 200
+
+
+async def test_db_pool_metrics_require_authentication():
+    async with httpx.AsyncClient(app=app, base_url="http://testserver") as http:
+        anonymous = await http.get("/health/db-pool")
+        bad_token = await http.get("/health/db-pool", headers={"Authorization": "Bearer not-a-token"})
+
+    assert anonymous.status_code == 403
+    assert bad_token.status_code == 401
+
+
+async def test_db_pool_metrics_for_signed_in_user(client):
+    response = await client.get("/health/db-pool")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["pool"]["size"] == engine.sync_engine.pool.size()
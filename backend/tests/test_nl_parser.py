@@ -0,0 +1,85 @@
+"""Natural-language parsing against the golden corpus in ``benchmarks/``.
+
+The rules path may miss an entry, but only while it is unsure: every answer
+at or above ``NL_PARSER_CONFIDENCE`` must match the corpus exactly, since
+those never reach the LLM. With the LLM stubbed to answer with the corpus's
+recorded responses, the hybrid path must get every entry right.
+"""
+import json
+import re
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.services import nl_parser
+
+CORPUS = json.loads((Path(__file__).parents[1] / "benchmarks" / "nl_parser_corpus.json").read_text())
+TODAY = date.fromisoformat(CORPUS["today"])
+CASES = CORPUS["cases"]
+
+
+class StubLLM:
+    """Answers parse prompts with the corpus's recorded LLM responses."""
+
+    configured = True
+
+    def __init__(self):
+        self.answers = {case["text"]: case["llm"] for case in CASES}
+        self.calls = 0
+
+    async def complete(self, messages, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        text = re.search(r'Input: "(.*)"', messages[-1]["content"]).group(1)
+        return json.dumps(self.answers[text])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(nl_parser, "llm_client", stub)
+    return stub
+
+
+def _fields(parsed: nl_parser.ParsedTransaction) -> dict:
+    return {
+        "amount": parsed.amount or None,
+        "currency": parsed.currency,
+        "type": parsed.transaction_type,
+        "date": parsed.date.isoformat() if parsed.date else None,
+    }
+
+
+def _expected(case: dict) -> dict:
+    return {field: case["expected"][field] for field in ("amount", "currency", "type", "date")}
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"] for case in CASES])
+def test_confident_rules_match_the_corpus(case):
+    parsed = nl_parser.parse_transaction_text(case["text"], TODAY)
+
+    if parsed.confidence >= settings.NL_PARSER_CONFIDENCE:
+        assert _fields(parsed) == _expected(case)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"] for case in CASES])
+async def test_hybrid_matches_the_corpus(case, llm):
+    rules = nl_parser.parse_transaction_text(case["text"], TODAY)
+    parsed = await nl_parser.parse_natural_language(case["text"], TODAY)
+
+    assert _fields(parsed) == _expected(case)
+    assert llm.calls == (rules.confidence < settings.NL_PARSER_CONFIDENCE)
+
+
+def test_rules_answer_most_of_the_corpus():
+    parsed = [nl_parser.parse_transaction_text(case["text"], TODAY) for case in CASES]
+
+    confident = sum(result.confidence >= settings.NL_PARSER_CONFIDENCE for result in parsed)
+    assert confident / len(CASES) >= 0.85
+
+
+def test_slash_quantity_is_not_a_date():
+    parsed = nl_parser.parse_transaction_text("bought 3/4 lb cheese 6", TODAY)
+
+    assert (parsed.amount, parsed.date, parsed.description) == (6.0, None, "3/4 lb cheese")
@@ -0,0 +1,25 @@
+"""Validation of /api/transactions/series ranges."""
+
+
+async def test_start_after_end_is_rejected(client):
+    response = await client.get("/api/transactions/series", params={
+        "interval": "day", "start_date": "2026-10-17T00:00:00", "end_date": "2026-10-01T00:00:00",
+    })
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Start date must not be after end date"
+
+
+async def test_single_day_range(client):
+    await client.post("/api/transactions/", json={
+        "amount": 12.0, "description": "Lunch", "transaction_type": "expense", "date": "2026-10-17T12:00:00",
+    })
+
+    response = await client.get("/api/transactions/series", params={
+        "interval": "day", "start_date": "2026-10-17T00:00:00", "end_date": "2026-10-17T23:59:59",
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["buckets"] == ["2026-10-17"]
+    totals = {line["transaction_type"]: line["totals"] for line in response.json()["series"]}
+    assert totals == {"income": [0.0], "expense": [12.0]}
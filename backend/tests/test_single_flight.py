@@ -0,0 +1,61 @@
+"""Coalescing across workers, simulated with one SingleFlight per worker."""
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.cache import response_cache
+from app.core.single_flight import SingleFlight
+
+
+def _workers(count: int):
+    return [SingleFlight(lock_ttl=30, result_ttl=30, wait_timeout=5, poll_interval=0.01) for _ in range(count)]
+
+
+async def test_leader_does_not_release_a_lock_it_no_longer_owns():
+    key = uuid.uuid4().hex
+    lock_key = f"sf:lock:{key}"
+
+    async def slow_call():
+        # The leader's lock expired and another worker took it
+        await response_cache.set(lock_key, "another-leader")
+        return "result"
+
+    assert await _workers(1)[0].do(key, slow_call) == "result"
+    assert await response_cache.get(lock_key) == "another-leader"
+
+
+async def test_one_waiter_retries_after_the_leader_fails():
+    key = uuid.uuid4().hex
+    leader, *waiters = _workers(6)
+    calls = []
+
+    async def failing_call():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("upstream error")
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    leading = asyncio.ensure_future(leader.do(key, failing_call))
+    await asyncio.sleep(0)
+    results = await asyncio.gather(*(worker.do(key, call) for worker in waiters))
+
+    with pytest.raises(RuntimeError):
+        await leading
+    assert results == ["result"] * len(waiters)
+    assert len(calls) == 1
+    assert sum(worker.metrics.fallthrough_calls for worker in waiters) == 1
+    assert sum(worker.metrics.remote_coalesced for worker in waiters) == len(waiters) - 1
+
+
+async def test_delete_if_only_deletes_a_matching_value():
+    key = uuid.uuid4().hex
+    await response_cache.set(key, "mine")
+
+    assert not await response_cache.delete_if(key, "theirs")
+    assert await response_cache.get(key) == "mine"
+    assert await response_cache.delete_if(key, "mine")
+    assert await response_cache.get(key) is None
@@ -0,0 +1,70 @@
+"""Listing transactions costs a fixed number of statements, whatever the page size."""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.api.routers.transactions import NEXT_CURSOR_HEADER
+from app.db.models import Category, Transaction
+from app.db.session import engine
+
+# The page query itself; categories are joined into it, not loaded per row
+MAX_LIST_STATEMENTS = 1
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+async def transactions(db, user):
+    categories = [Category(name=f"Category {index}", color="#6B7280", user_id=user.id) for index in range(10)]
+    db.add_all(categories)
+    await db.flush()
+    start = datetime(2026, 1, 1)
+    db.add_all(
+        Transaction(
+            amount=index + 1,
+            description=f"Merchant {index % 20}",
+            transaction_type="income" if index % 5 == 0 else "expense",
+            category_id=None if index % 7 == 0 else categories[index % 10].id,
+            user_id=user.id,
+            date=start + timedelta(hours=index)
+        )
+        for index in range(300)
+    )
+    await db.commit()
+
+
+@pytest.mark.parametrize("limit", [1, 10, 100, 250])
+async def test_list_statement_count_does_not_grow_with_page_size(client, transactions, limit):
+    with count_statements() as statements:
+        response = await client.get("/api/transactions/", params={"limit": limit})
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == limit
+    assert len(statements) <= MAX_LIST_STATEMENTS, statements
+
+
+async def test_next_page_statement_count(client, transactions):
+    first = await client.get("/api/transactions/", params={"limit": 100})
+
+    with count_statements() as statements:
+        response = await client.get(
+            "/api/transactions/", params={"limit": 100, "cursor": first.headers[NEXT_CURSOR_HEADER]}
+        )
+
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 100
+    assert len(statements) <= MAX_LIST_STATEMENTS, statements
@@ -0,0 +1,67 @@
+"""Statement imports skip rows the user already has."""
+
+CSV = b"""date,description,amount,type
+2026-10-03,COFFEE HOUSE #1234 CARD 9876,4.50,expense
+2026-10-03,COFFEE HOUSE #1234 CARD 9876,4.50,expense
+2026-10-04,BOOKSHOP,20.00,expense
+"""
+
+
+async def _import(client, content: bytes):
+    response = await client.post(
+        "/api/transactions/import", files={"file": ("statement.csv", content, "text/csv")}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_reimport_skips_imported_rows(client):
+    first = await _import(client, CSV)
+    second = await _import(client, CSV)
+
+    assert (first["inserted"], first["skipped"]) == (3, 0)
+    assert (second["inserted"], second["skipped"]) == (0, 3)
+
+
+async def test_import_skips_rows_entered_by_hand(client):
+    # Entered by hand in the app, so it has no import hash
+    await client.post("/api/transactions/", json={
+        "amount": 4.5, "description": "Coffee House", "transaction_type": "expense",
+        "date": "2026-10-03T00:00:00.000Z",
+    })
+
+    first = await _import(client, CSV)
+    second = await _import(client, CSV)
+    listed = (await client.get("/api/transactions/")).json()
+
+    # The hand-entered coffee absorbs one of the two identical statement rows
+    assert (first["inserted"], first["skipped"]) == (2, 1)
+    assert (second["inserted"], second["skipped"]) == (0, 3)
+    assert len(listed) == 3
+
+
+async def test_import_keeps_rows_that_differ_from_hand_entered(client):
+    await client.post("/api/transactions/", json={
+        "amount": 4.5, "description": "Coffee House", "transaction_type": "expense",
+        "date": "2026-10-05T00:00:00",
+    })
+
+    summary = await _import(client, CSV)
+
+    assert (summary["inserted"], summary["skipped"]) == (3, 0)
+
+
+async def test_import_stores_offset_dates_as_utc(client):
+    content = b"""date,description,amount,type
+2026-01-05T10:00:00+02:00,TRAIN TICKET,12.00,expense
+2026-01-05T23:30:00-05:00,LATE DINNER,30.00,expense
+2026-01-06,BAKERY,3.00,expense
+"""
+
+    summary = await _import(client, content)
+    listed = (await client.get("/api/transactions/")).json()
+
+    assert (summary["inserted"], summary["failed"]) == (3, 0)
+    assert sorted(row["date"] for row in listed) == [
+        "2026-01-05T08:00:00", "2026-01-06T00:00:00", "2026-01-06T04:30:00",
+    ]
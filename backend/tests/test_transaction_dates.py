@@ -0,0 +1,61 @@
+"""Request datetimes with a UTC offset, as the frontend sends them."""
+
+
+async def test_create_accepts_iso_z_date(client):
+    response = await client.post("/api/transactions/", json={
+        "amount": 12.5,
+        "description": "Coffee",
+        "transaction_type": "expense",
+        "date": "2026-10-17T00:00:00.000Z",
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["date"] == "2026-10-17T00:00:00"
+
+
+async def test_offset_dates_are_stored_as_utc(client):
+    response = await client.post("/api/transactions/", json={
+        "amount": 40,
+        "description": "Dinner",
+        "transaction_type": "expense",
+        "date": "2026-10-17T01:30:00+02:00",
+    })
+    transaction_id = response.json()["id"]
+    assert response.json()["date"] == "2026-10-16T23:30:00"
+
+    response = await client.put(f"/api/transactions/{transaction_id}", json={"date": "2026-10-18T12:00:00Z"})
+
+    assert response.status_code == 200, response.text
+    assert response.json()["date"] == "2026-10-18T12:00:00"
+
+
+async def test_filters_accept_iso_z_dates(client):
+    for day in ("2026-10-01", "2026-10-15", "2026-11-02"):
+        await client.post("/api/transactions/", json={
+            "amount": 10, "description": "Lunch", "transaction_type": "expense", "date": f"{day}T12:00:00",
+        })
+    params = {"start_date": "2026-10-10T00:00:00.000Z", "end_date": "2026-10-31T23:59:59.999Z"}
+
+    listed = await client.get("/api/transactions/", params=params)
+    exported = await client.get("/api/transactions/export", params=params)
+    series = await client.get("/api/transactions/series", params={**params, "interval": "day"})
+
+    assert listed.status_code == 200, listed.text
+    assert [row["date"] for row in listed.json()] == ["2026-10-15T12:00:00"]
+    assert exported.status_code == 200, exported.text
+    assert series.status_code == 200, series.text
+    totals = {line["transaction_type"]: sum(line["totals"]) for line in series.json()["series"]}
+    assert totals == {"income": 0.0, "expense": 10.0}
+
+
+async def test_budget_accepts_iso_z_dates(client):
+    response = await client.post("/api/budgets/", json={
+        "name": "Groceries",
+        "amount": 300,
+        "period": "monthly",
+        "start_date": "2026-10-01T00:00:00.000Z",
+        "end_date": "2026-12-31T00:00:00.000Z",
+    })
+
+    assert response.status_code == 200, response.text
+    assert response.json()["start_date"] == "2026-10-01T00:00:00"
@@ -0,0 +1,83 @@
+"""Concurrent writes to one transaction keep the monthly rollups and budget totals exact."""
+import asyncio
+from datetime import datetime
+
+from app.db.models import Budget
+from app.db.session import SessionLocal
+from app.services import budget_alerts, rollups
+from app.services.categorization import BatchResult, write_back
+
+
+async def _create(client, amount=10.0):
+    response = await client.post("/api/transactions/", json={
+        "amount": amount, "description": "Groceries", "transaction_type": "expense", "date": "2026-10-05T12:00:00",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+async def test_concurrent_updates_keep_rollups_exact(client, db, user):
+    transaction_id = await _create(client)
+
+    responses = await asyncio.gather(*(
+        client.put(f"/api/transactions/{transaction_id}", json={"amount": amount})
+        for amount in (14.0, 18.0, 22.0, 26.0, 30.0)
+    ))
+
+    assert all(response.status_code == 200 for response in responses)
+    assert await rollups.verify_rollups(db, user.id) == []
+
+
+async def test_concurrent_deletes_remove_the_transaction_once(client, db, user):
+    transaction_id = await _create(client)
+    await _create(client, amount=5.0)
+
+    responses = await asyncio.gather(*(client.delete(f"/api/transactions/{transaction_id}") for _ in range(5)))
+
+    assert sorted(response.status_code for response in responses) == [200, 404, 404, 404, 404]
+    assert await rollups.verify_rollups(db, user.id) == []
+
+
+async def _budget(db, user):
+    db.add(Budget(
+        name="Everything", amount=100.0, period="monthly", user_id=user.id, start_date=datetime(2026, 1, 1),
+        is_active=True
+    ))
+    await db.commit()
+
+
+async def _write_back_then(client, user, request):
+    """Run ``request`` while a batch write-back of the same row is open, then commit the batch."""
+    transaction_id = await _create(client)
+    async with SessionLocal() as batch:
+        await write_back(batch, user.id, {transaction_id: BatchResult("Dining", "expense", 0.9, "model")})
+        pending = asyncio.ensure_future(request(transaction_id))
+        await asyncio.sleep(0.2)
+        await batch.commit()
+    return await pending
+
+
+async def test_update_during_batch_write_back_keeps_totals_exact(client, db, user):
+    await _budget(db, user)
+
+    response = await _write_back_then(
+        client, user, lambda transaction_id: client.put(f"/api/transactions/{transaction_id}", json={"amount": 50.0})
+    )
+
+    assert response.status_code == 200, response.text
+    await db.rollback()
+    assert await rollups.verify_rollups(db, user.id) == []
+    assert await budget_alerts.verify_totals(db, user.id) == []
+
+
+async def test_delete_during_batch_write_back_keeps_totals_exact(client, db, user):
+    await _budget(db, user)
+
+    response = await _write_back_then(
+        client, user, lambda transaction_id: client.delete(f"/api/transactions/{transaction_id}")
+    )
+
+    assert response.status_code == 200, response.text
+    await db.rollback()
+    assert await rollups.verify_rollups(db, user.id) == []
+    assert await budget_alerts.verify_totals(db, user.id) == []